@@ -3,8 +3,13 @@ import hashlib
 import logging
 import os
 import re
+import copy
 import socket
+import threading
+import time
 import traceback
+import urllib
+from collections import OrderedDict, namedtuple
 from itertools import izip_longest
 
 try:
@@ -12,15 +17,20 @@ try:
 except ImportError:
     import json
 
-try:
-    from hubspot.hsutils import get_setting, get_setting_default
-except ImportError:
-    from hscacheutils.setting_wrappers import get_setting, get_setting_default
-
-from hscacheutils.raw_cache import MAX_MEMCACHE_TIMEOUT
-from hscacheutils.generational_cache import CustomUseGenCache, DummyGenCache
+from asset_bender import AssetBenderException
+from asset_bender.config import get_config, on_config_reset, DEFAULT_COMBO_MAX_URL_LENGTH
 
-from asset_bender.http import fetch_ab_url_with_retries
+# Still importable from here, where it used to live
+from asset_bender.config import get_bender_or_static3_setting
+from asset_bender.daemon import fetch_batch, get_change_watcher
+from asset_bender.executors import get_executor
+from asset_bender.http import fetch_ab_url_with_retries, fetch_errors
+from asset_bender.json_store import get_static_json_store
+from asset_bender.metrics import record_cache_lookup, registry as metrics
+from asset_bender.pointer_index import get_pointer_index
+from asset_bender.profiling import profiled
+from asset_bender.tracing import start_trace, trace_event
+from asset_bender.versions import BuildVersion, VersionPointer, resolve_maximum_versions
 
 
 logger = logging.getLogger(__name__)
@@ -33,24 +43,25 @@ PRECOMPILED_EXTENSIONS = tuple([ext for ext in CSS_EXTENSIONS + JS_EXTENSIONS if
 TAG_FUNCTION_NAME = 'bender_asset_url_callback'
 SCAFFOLD_CONTEXT_NAME = 'bender_scaffold'
 BENDER_ASSETS_CONTEXT_NAME = 'bender_assets_instance'
+BENDER_ASSETS_REQUEST_ATTRIBUTE = 'bender_assets'
 STATIC_DOMAIN_CONTEXT_NAME = 'bender_domain'
 STATIC_DOMAIN_WITH_PREFIX_CONTEXT_NAME = 'bender_domain_with_prefix'
 HOST_PROJECT_CONTEXT_NAME = 'host_project_name'
 
 FORCE_BUILD_PARAM_PREFIX = "forceBuildFor-"
-HOST_NAME = socket.gethostname()
 
-def get_bender_or_static3_setting(setting_name, default_value):
-    static3_setting_name = setting_name.replace('BENDER_', 'STATIC3_')
-    return get_setting_default(setting_name, get_setting_default(static3_setting_name, default_value))
 
+def build_scaffold(request, included_bundles):
+    bender_assets = BenderAssets(included_bundles, request.GET)
 
-LOG_CACHE_MISSES = get_bender_or_static3_setting('BENDER_LOG_CACHE_MISSES', True)
-LOG_S3_FETCHES = get_bender_or_static3_setting('BENDER_LOG_S3_FETCHES', True)
+    # So that the preload middleware can find the scaffold for this request
+    setattr(request, BENDER_ASSETS_REQUEST_ATTRIBUTE, bender_assets)
 
+    # Imported here since the middleware module imports this one
+    from asset_bender.middleware import send_early_hints
+    send_early_hints(request, bender_assets)
 
-def build_scaffold(request, included_bundles):
-    return BenderAssets(included_bundles, request.GET).generate_scaffold()
+    return bender_assets.generate_scaffold()
 
 def get_static_url(full_asset_path, template_context=None, bender_assets=None):
     '''
@@ -70,6 +81,10 @@ def get_static_build_version(project_name, template_context=None, bender_assets=
     bender_assets = _extract_bender_assets_instance_from_template_context(template_context, bender_assets)
     return bender_assets.get_static3_build_version(project_name)
 
+def get_dependency_js_config(template_context=None, bender_assets=None):
+    bender_assets = _extract_bender_assets_instance_from_template_context(template_context, bender_assets)
+    return bender_assets.get_dependency_js_config()
+
 def _extract_bender_assets_instance_from_template_context(template_context, bender_assets=None):
     if template_context == None and bender_assets == None:
         logger.warning("No template_context or bender_assets instance passed, that will probably cause lots of excess memcache requests")
@@ -86,30 +101,93 @@ def _extract_bender_assets_instance_from_template_context(template_context, bend
 
 
 def _is_only_on_qa():
-    return get_setting('ENV') == 'qa'
+    return get_config().is_qa
 
 
 # This will force different cache keys per build, which is desirable,
 # because new builds may have different versions set in static_conf.json
 _key_base = os.environ.get('BUILD_NUM', '') or os.environ.get('HS_JENKINS_BUILD_NUM', '')
 
-project_version_cache = CustomUseGenCache([
-    'static_build_name_for:project',
-    'static_deps_for_project:host_project',
-    'static_deps_for_project_%s:host_project' % _key_base
-    ],
-    timeout=MAX_MEMCACHE_TIMEOUT)
+# The caches are created on first use (see _create_caches), so importing this module doesn't
+# read any settings or set up the memcache client
+project_version_cache = None
+scaffold_cache = None
+last_complete_scaffold_cache = None
+_caches_lock = threading.Lock()
+
+def get_project_version_cache():
+    if project_version_cache is None:
+        _create_caches()
+
+    return project_version_cache
+
+def get_scaffold_cache():
+    if scaffold_cache is None:
+        _create_caches()
+
+    return scaffold_cache
+
+def get_last_complete_scaffold_cache():
+    if last_complete_scaffold_cache is None:
+        _create_caches()
+
+    return last_complete_scaffold_cache
+
+def _create_caches():
+    global project_version_cache, scaffold_cache, last_complete_scaffold_cache
+
+    # Resolving the config first also makes sure the settings are loaded before hscacheutils
+    # sets up the memcache client
+    no_cache = get_config().no_cache
+
+    from hscacheutils.raw_cache import MAX_MEMCACHE_TIMEOUT
+    from asset_bender.gencache import BatchingGenCache, DummyBatchingGenCache
+
+    with _caches_lock:
+
+        if project_version_cache is None:
+            project_version_cache = DummyBatchingGenCache() if no_cache else BatchingGenCache([
+                'static_build_name_for:project',
+                'static_deps_for_project:host_project',
+                'static_deps_for_project_%s:host_project' % _key_base
+                ],
+                timeout=MAX_MEMCACHE_TIMEOUT)
+
+        if scaffold_cache is None:
+            scaffold_cache = DummyBatchingGenCache() if no_cache else BatchingGenCache([
+                'bender_all_scaffolds',
+                'bender_scaffold_for_project:scaffold_key',
+                'static3_scaffold_for_project_%s:scaffold_key' % _key_base
+                ],
+                timeout=MAX_MEMCACHE_TIMEOUT)
+
+        # The last complete scaffold for each key, which isn't invalidated on deploy (the key already
+        # changes with every deploy of the app). Served if a scaffold can't be fully built.
+        if last_complete_scaffold_cache is None:
+            last_complete_scaffold_cache = DummyBatchingGenCache() if no_cache else BatchingGenCache([
+                'bender_last_complete_scaffold:scaffold_key',
+                ],
+                timeout=MAX_MEMCACHE_TIMEOUT)
+
+def _transient_fetch_errors():
+    '''
+    Errors that (probably) mean the origin is having trouble, and not that the bundle is wrong
+    '''
+    return (AssetBenderException,) + fetch_errors()
+
+_host_name = None
 
-scaffold_cache = CustomUseGenCache([
-    'bender_all_scaffolds',
-    'bender_scaffold_for_project:scaffold_key',
-    'static3_scaffold_for_project_%s:scaffold_key' % _key_base
-    ],
-    timeout=MAX_MEMCACHE_TIMEOUT)
+def _get_host_name():
+    global _host_name
 
-if get_bender_or_static3_setting('BENDER_NO_CACHE', False):
-    project_version_cache = DummyGenCache()
-    scaffold_cache = DummyGenCache()
+    if _host_name is None:
+        _host_name = socket.gethostname()
+
+    return _host_name
+
+# The keys of the scaffolds being rebuilt in the background (in this process)
+_scaffolds_being_rebuilt = set()
+_scaffolds_being_rebuilt_lock = threading.Lock()
 
 def invalidate_cache_for_deploy(project_name):
     '''
@@ -117,82 +195,219 @@ def invalidate_cache_for_deploy(project_name):
     and/or deploy scripts to force a live running app to resolve its versions anew (and run against
     the latest front-end code).
     '''
-    project_version_cache.invalidate('static_build_name_for:project', project=project_name)
-    project_version_cache.invalidate('static_deps_for_project:host_project', host_project=project_name)  # For backwards compatibility
-    project_version_cache.invalidate('static_deps_for_project_%s:host_project' % _key_base, host_project=project_name)
-    scaffold_cache.invalidate('bender_all_scaffolds')
+    get_project_version_cache().invalidate('static_build_name_for:project', project=project_name)
+    get_project_version_cache().invalidate('static_deps_for_project:host_project', host_project=project_name)  # For backwards compatibility
+    get_project_version_cache().invalidate('static_deps_for_project_%s:host_project' % _key_base, host_project=project_name)
+    get_scaffold_cache().invalidate('bender_all_scaffolds')
 
 
 class BenderAssets(object):
-    def __init__(self, bundle_paths=(), http_get_params=None, exclude_default_bundles=False):
+    def __init__(self, bundle_paths=(), http_get_params=None, exclude_default_bundles=False, dedupe_assets=None, use_combo_urls=None):
         '''
         @bundle_paths - a list containing the paths of the bundles to include
         @http_get_params - the request.GET query dictionary
+        @dedupe_assets - drop script/link includes whose url was already included by an earlier
+                         bundle (defaults to the BENDER_DEDUPE_ASSETS setting, which defaults to True)
+        @use_combo_urls - collapse consecutive includes into combo handler urls (defaults to the
+                          BENDER_USE_COMBO_URLS setting, which defaults to False)
         '''
         http_get_params = http_get_params if http_get_params else {}
+        config = get_config()
+
         self.is_debug = self._check_is_debug_mode(http_get_params)
         self.use_local_daemon = self._check_use_local_daemon(http_get_params)
         self.skip_scaffold_cache = False
 
+        if dedupe_assets is None:
+            dedupe_assets = config.dedupe_assets
+
+        self.dedupe_assets = dedupe_assets
+
+        if use_combo_urls is None:
+            use_combo_urls = config.use_combo_urls
+        elif use_combo_urls and not config.combo_url_template:
+            raise AssetBenderException("use_combo_urls needs BENDER_COMBO_URL_TEMPLATE to be set to the url of your combo handler")
+
+        self.use_combo_urls = use_combo_urls
+        self._dependency_versions = None
+
         self.included_bundle_paths = []
 
         # Used for the cases when you don't want to include the default bundles (style_guide)
         if not exclude_default_bundles:
-            self.included_bundle_paths.extend(get_setting_default('DEFAULT_ASSET_BENDER_BUNDLES', get_setting_default('DEFAULT_BUNDLES_V3', [])))
+            self.included_bundle_paths.extend(config.default_bundles)
 
         self.included_bundle_paths.extend(bundle_paths)
 
         # strip first slashes for consistency
         self.included_bundle_paths = [path.lstrip('/') for path in self.included_bundle_paths]
 
-        self.host_project_name = get_setting_default('PROJ_NAME', None)
+        self.host_project_name = config.project_name
+
+        self.forced_build_version_by_project = self._extract_forced_versions_from_params(http_get_params)
+
+        # The fetchers (and the scaffold) are only created when first used, so requests that
+        # never render any assets don't pay for them
+        self._s3_fetcher = None
+        self._local_daemon_fetcher = None
+        self._scaffold = None
+
+        start_trace(self, http_get_params)
+
+    @property
+    def s3_fetcher(self):
+        if self._s3_fetcher is None:
+            self._s3_fetcher = S3BundleFetcher(self.host_project_name, self.is_debug, self.forced_build_version_by_project,
+                                               prefetch_project_names=self._get_bundle_project_names())
+
+        return self._s3_fetcher
 
-        forced_build_version_by_project = self._extract_forced_versions_from_params(http_get_params)
-        self.s3_fetcher = S3BundleFetcher(self.host_project_name, self.is_debug, forced_build_version_by_project)
-        is_local_debug = self.is_debug
+    @property
+    def local_daemon_fetcher(self):
+        if self._local_daemon_fetcher is None:
+            is_local_debug = self.is_debug
 
-        if get_bender_or_static3_setting('BENDER_LOCAL_PROJECT_MODE', False):
-            is_local_debug = True
+            if get_config().local_project_mode:
+                is_local_debug = True
 
-        self.local_daemon_fetcher = LocalDaemonBundleFetcher(self.host_project_name, is_local_debug, forced_build_version_by_project)
+            self._local_daemon_fetcher = LocalDaemonBundleFetcher(self.host_project_name, is_local_debug, self.forced_build_version_by_project)
+
+        return self._local_daemon_fetcher
+
+    def _get_bundle_project_names(self):
+        '''
+        The projects of the included bundles (except the ones with a hardcoded build)
+        '''
+        project_names = [_extract_project_name_from_path(bundle_path) for bundle_path in self.included_bundle_paths]
+        return [project_name for project_name in project_names if project_name]
 
     def generate_context_dict(self):
         '''
         Helper to get the variables you need to exist in your request context for Asset Bender
+
+        The scaffold is a LazyScaffold, so it is only built (or fetched from the cache) once a
+        template or your code uses it.
         '''
         return {
-            SCAFFOLD_CONTEXT_NAME: self.generate_scaffold(),
+            SCAFFOLD_CONTEXT_NAME: LazyScaffold(self),
             STATIC_DOMAIN_CONTEXT_NAME: self.get_domain(),
             BENDER_ASSETS_CONTEXT_NAME: self,
             STATIC_DOMAIN_WITH_PREFIX_CONTEXT_NAME: self.get_prefixed_domain(),
             HOST_PROJECT_CONTEXT_NAME: self.host_project_name,
         }
 
+    @profiled('generate_scaffold', describe=lambda self, args, result: self._describe_for_profile())
     def generate_scaffold(self):
         '''
         The primary public method that will be called from the project's context_processor
 
         Either gets the Scaffold object from the cache or dispatches to actually building
-        the scaffold from the the included bundles
+        the scaffold from the the included bundles. The result is kept on this instance, so
+        calling it again is free.
         '''
-        cache_key = self._get_scaffold_cache_key()
-        scaffold = None
+        if self._scaffold is not None:
+            return self._scaffold
 
         # We don't cache the scaffold during local development or when ?forceBuildFor-<project> params are used
-        if not self.use_local_daemon and not self.skip_scaffold_cache:
-            scaffold = scaffold_cache.get(scaffold_key=cache_key)
+        if self.use_local_daemon or self.skip_scaffold_cache:
+            self._scaffold = self._build_scaffold()
+            return self._scaffold
 
-            if not scaffold and LOG_CACHE_MISSES:
+        cache_key = self._get_scaffold_cache_key()
+        scaffold = get_scaffold_cache().get(scaffold_key=cache_key)
+        record_cache_lookup('scaffold_cache', scaffold)
+
+        if scaffold:
+            # Incomplete or expired scaffolds are only served until a rebuild replaces them
+            if not scaffold.is_complete or self._is_scaffold_expired(scaffold):
+                metrics.inc('asset_bender_stale_scaffolds_served_total', reason='incomplete' if not scaffold.is_complete else 'expired')
+                self._rebuild_scaffold_in_background(cache_key)
+        else:
+            if get_config().log_cache_misses:
                 logger.debug("Asset Bender scaffold cache miss: %s" % cache_key)
 
-        if not scaffold:
-            scaffold = self._generate_scaffold_without_cache()
+            scaffold = self._build_and_cache_scaffold(cache_key)
 
-        if not self.use_local_daemon and not self.skip_scaffold_cache:
-            scaffold_cache.set(scaffold, scaffold_key=cache_key)
+        self._scaffold = scaffold
+        return scaffold
 
+    def _build_scaffold(self):
+        start = time.time()
+        scaffold = self._generate_scaffold_without_cache()
+        elapsed = time.time() - start
+        metrics.observe('asset_bender_scaffold_build_seconds', elapsed)
+        metrics.observe('asset_bender_scaffold_bytes', scaffold.html_size())
+        trace_event('build', round(elapsed, 5), int(scaffold.is_complete))
         return scaffold
 
+    def _build_and_cache_scaffold(self, cache_key, replace_complete_scaffold=True):
+        '''
+        Builds the scaffold and caches it. If some bundles couldn't be fetched, the last complete
+        scaffold is used instead (or, if there isn't one, the incomplete scaffold is cached only
+        briefly). Returns the scaffold that was cached.
+        '''
+        scaffold = self._build_scaffold()
+        config = get_config()
+
+        if scaffold.is_complete:
+            get_scaffold_cache().set(scaffold, scaffold_key=cache_key)
+            get_last_complete_scaffold_cache().set(scaffold, scaffold_key=cache_key)
+            return scaffold
+
+        logger.warning("Asset Bender couldn't fetch every bundle for the scaffold (missing %s)" % ', '.join(scaffold.missing_bundles))
+
+        if not replace_complete_scaffold:
+            return scaffold
+
+        previous_scaffold = get_last_complete_scaffold_cache().get(scaffold_key=cache_key)
+
+        if previous_scaffold:
+            metrics.inc('asset_bender_stale_scaffolds_served_total', reason='previous_complete')
+            scaffold = previous_scaffold
+
+        # Either way, try again soon
+        get_scaffold_cache().set(scaffold, scaffold_key=cache_key, timeout=config.incomplete_scaffold_timeout)
+        return scaffold
+
+    def _is_scaffold_expired(self, scaffold):
+        max_age = get_config().scaffold_max_age
+        return bool(max_age and scaffold.built_at and time.time() - scaffold.built_at > max_age)
+
+    def _rebuild_scaffold_in_background(self, cache_key):
+        '''
+        Rebuilds (and caches) the scaffold in a background thread, unless this process is
+        already rebuilding it
+        '''
+        if not get_config().background_scaffold_rebuilds:
+            return
+
+        with _scaffolds_being_rebuilt_lock:
+            if cache_key in _scaffolds_being_rebuilt:
+                return
+
+            _scaffolds_being_rebuilt.add(cache_key)
+
+        # A fresh copy, so the rebuild doesn't share per-request state with this request
+        bender_assets = copy.copy(self)
+        bender_assets._s3_fetcher = None
+        bender_assets._local_daemon_fetcher = None
+        bender_assets._scaffold = None
+        bender_assets._dependency_versions = None
+
+        def rebuild():
+            try:
+                # A stale but complete scaffold is better than a new incomplete one
+                bender_assets._build_and_cache_scaffold(cache_key, replace_complete_scaffold=False)
+            except Exception:
+                logger.exception("Asset Bender couldn't rebuild the scaffold in the background")
+            finally:
+                with _scaffolds_being_rebuilt_lock:
+                    _scaffolds_being_rebuilt.discard(cache_key)
+
+        thread = threading.Thread(target=rebuild, name='asset-bender-scaffold-rebuild')
+        thread.daemon = True
+        thread.start()
+
     def _get_scaffold_cache_key(self):
         '''
         The key is a hash of all the data the scaffold needs to be uniqued by
@@ -201,7 +416,7 @@ class BenderAssets(object):
         # of the static bundles that is ahead of nodes that have not recieved a deploy yet
         # we include the __file__ name so that every deploy will clear the cache (since it will have a new virtuvalenv path)
         args = self.included_bundle_paths + [self.host_project_name] + [str(self.is_debug)] + [str(self.use_local_daemon)] \
-               + [HOST_NAME] + [__file__]
+               + [str(self.dedupe_assets)] + [str(self.use_combo_urls)] + [_get_host_name()] + [__file__]
 
         long_key = '-'.join(args)
         key = hashlib.md5(long_key).hexdigest()
@@ -209,38 +424,128 @@ class BenderAssets(object):
 
     def _generate_scaffold_without_cache(self):
         self._validate_configuration()
-        scaffold = Scaffold()
 
-        for bundle_path in self.included_bundle_paths:
-            self._add_bundle_to_scaffold(bundle_path, scaffold)
+        if self.use_combo_urls:
+            config = get_config()
+            scaffold = Scaffold(
+                combo_url_template=config.combo_url_template,
+                combo_max_url_length=config.combo_max_url_length)
+        else:
+            scaffold = Scaffold()
+
+        self._prefetch_from_local_daemon()
+
+        if self.use_local_daemon:
+            self._prefetch_s3_build_versions()
+            fetch_bundle_html = self._fetch_bundle_html
+        else:
+            try:
+                self._prefetch_s3_build_versions()
+            except _transient_fetch_errors() as e:
+                logger.warning("Asset Bender couldn't resolve the versions of the bundles: %s" % e)
+
+            # In production a bundle that can't be fetched doesn't break the request, the scaffold is
+            # just marked incomplete (during local development you want to see the error)
+            fetch_bundle_html = self._fetch_bundle_html_or_none
+
+        # The bundles are fetched in parallel, but added to the scaffold in order
+        html_by_bundle = get_executor().map(fetch_bundle_html, self.included_bundle_paths)
+
+        # Normalized urls of every asset included so far (across all the bundles)
+        seen_asset_urls = set() if self.dedupe_assets else None
+
+        for bundle_path, html in zip(self.included_bundle_paths, html_by_bundle):
+            self._add_bundle_html_to_scaffold(bundle_path, html, scaffold, seen_asset_urls=seen_asset_urls)
+
+        if scaffold.dropped_duplicates and get_config().log_dropped_duplicates:
+            logger.info("Asset Bender dropped %s duplicate asset(s) from the scaffold: %s" % (
+                len(scaffold.dropped_duplicates),
+                ', '.join(["%s (from %s)" % (url, bundle_path) for bundle_path, url in scaffold.dropped_duplicates])))
 
         return scaffold
 
-    def _add_bundle_to_scaffold(self, bundle_path, scaffold, wrapper_template=None):
-            html = ''
-            contains_hardcoded_version = '/static-' in bundle_path
+    def _prefetch_from_local_daemon(self):
+        '''
+        Gets everything the scaffold (and the boilerplate js) needs from the daemon in
+        one batch request, if the daemon supports it
+        '''
+        daemon_bundle_paths = [path for path in self.included_bundle_paths if self._should_fetch_bundle_from_local_daemon(path)]
 
-            if not contains_hardcoded_version and (self.use_local_daemon or self._check_use_local_daemon_for_project(bundle_path)):
-                html = self.local_daemon_fetcher.fetch_include_html(bundle_path)
+        if not daemon_bundle_paths:
+            return
 
-                if not html:
-                    logger.error("Couldn't find bundle in local daemon: %s" % bundle_path)
+        if self.use_local_daemon:
+            project_names = self.local_daemon_fetcher._get_dependency_project_names()
+        else:
+            project_names = []
+
+        self.local_daemon_fetcher.prefetch(daemon_bundle_paths, project_names)
+
+    def _prefetch_s3_build_versions(self):
+        '''
+        Resolves the versions of every project whose bundles come from S3 up front, so that
+        the parallel bundle fetches don't each resolve (and download) the same pointers
+        '''
+        s3_bundle_paths = [path for path in self.included_bundle_paths if not self._should_fetch_bundle_from_local_daemon(path)]
+
+        if not s3_bundle_paths:
+            return
+
+        project_names = []
+
+        for bundle_path in s3_bundle_paths:
+            project_name = _extract_project_name_from_path(bundle_path)
+
+            if project_name and project_name not in project_names:
+                project_names.append(project_name)
+
+        # Also makes sure the (lazily created) fetcher exists before it is shared by the parallel fetches
+        self.s3_fetcher._fetch_build_versions(project_names)
+
+    def _should_fetch_bundle_from_local_daemon(self, bundle_path):
+        contains_hardcoded_version = '/static-' in bundle_path
+        return not contains_hardcoded_version and (self.use_local_daemon or self._check_use_local_daemon_for_project(bundle_path))
+
+    def _add_bundle_to_scaffold(self, bundle_path, scaffold, wrapper_template=None, seen_asset_urls=None):
+        html = self._fetch_bundle_html(bundle_path)
+
+        if wrapper_template:
+            html = wrapper_template % html
+
+        self._add_bundle_html_to_scaffold(bundle_path, html, scaffold, seen_asset_urls=seen_asset_urls)
+
+    def _fetch_bundle_html(self, bundle_path):
+        html = ''
+
+        if self._should_fetch_bundle_from_local_daemon(bundle_path):
+            html = self.local_daemon_fetcher.fetch_include_html(bundle_path)
 
-            # If not using daemon, or if the html was not found in the daemon, then we check S3
             if not html:
-                html = self.s3_fetcher.fetch_include_html(bundle_path)
+                logger.error("Couldn't find bundle in local daemon: %s" % bundle_path)
 
-            if wrapper_template:
-                html = wrapper_template % html
+        # If not using daemon, or if the html was not found in the daemon, then we check S3
+        if not html:
+            html = self.s3_fetcher.fetch_include_html(bundle_path)
 
-            if html:
-                scaffold.add_html_by_file_name(bundle_path, html)
-            else:
-                logger.error("Unknown bundle couldn't be added to scaffold: %s" % bundle_path)
+        return html
+
+    def _fetch_bundle_html_or_none(self, bundle_path):
+        try:
+            return self._fetch_bundle_html(bundle_path)
+        except _transient_fetch_errors() as e:
+            logger.error("Couldn't fetch the bundle %s: %s" % (bundle_path, e))
+            return None
+
+    def _add_bundle_html_to_scaffold(self, bundle_path, html, scaffold, seen_asset_urls=None):
+        if html:
+            scaffold.add_html_by_file_name(bundle_path, html, seen_asset_urls=seen_asset_urls)
+        else:
+            logger.error("Unknown bundle couldn't be added to scaffold: %s" % bundle_path)
+            scaffold.missing_bundles.append(bundle_path)
 
     def invalidate_scaffold_cache(self):
         cache_key = self._get_scaffold_cache_key()
-        scaffold_cache.invalidate('bender_scaffold_for_project:scaffold_key', scaffold_key=cache_key)
+        get_scaffold_cache().invalidate('bender_scaffold_for_project:scaffold_key', scaffold_key=cache_key)
 
     def get_bender_asset_url(self, full_asset_path):
         '''
@@ -248,24 +553,14 @@ class BenderAssets(object):
         part of project_name.  The URL includes the proper domain and build information.
 
         '''
-        project_name = _extract_project_name_from_path(full_asset_path)
-        if not project_name:
-            raise Exception('Your path must be of the form: "<project_name>/static/js/whatever.js"')
-
-        # Break the full path down to just the asset path (everything under static/)
-        asset_path = full_asset_path.replace("%s/static/" % project_name, '')
-
-        # Make sure the path doesn't refer to a precompiled extension (since that won't actually exist on s3)
-        extension = _find_extension(full_asset_path, also_search_folder_name=False)
-
-        if extension in PRECOMPILED_EXTENSIONS:
-            message = "You cannot use the '%s' extension in this static path: %s.\n You must use 'js' or 'css' (It will work locally, but it won't work on QA/prod)." % (extension, full_asset_path)
-
-            if get_setting('ENV') == 'prod':
-                logger.error(message)
-            else:
-                raise Exception(message)
+        project_name, asset_path = split_bender_asset_path(full_asset_path)
+        return self.get_project_asset_url(project_name, asset_path)
 
+    def get_project_asset_url(self, project_name, asset_path):
+        '''
+        Like `get_bender_asset_url`, but for a path that was already split (and checked)
+        with `split_bender_asset_path`
+        '''
         # Dispatch to the correct fetcher
         if self.use_local_daemon:
             return self.local_daemon_fetcher.get_asset_url(project_name, asset_path)
@@ -308,47 +603,85 @@ class BenderAssets(object):
             elif extension in PRECOMPILED_EXTENSIONS:
                 raise Exception("You cannot use the '%s' extension in a bundle path (%s), you must use 'js' or 'css' (It can work locally, but it won't work on QA/prod)." % (bundle_path, extension))
 
+    @profiled('get_all_dependency_versions', describe=lambda self, args, result: self._describe_for_profile())
     def get_all_dependency_versions(self):
         '''
         Similar to `get_dependency_version_snapshot`, but doesn't only use the s3 fetcher
         and automatically adds "-debug" if in ?hsDebug=true and prod/QA
         '''
-        if self.use_local_daemon:
-            dep_versions = self.local_daemon_fetcher._fetch_all_dependency_versions()
-        else:
-            dep_versions = self.s3_fetcher._fetch_all_dependency_versions()
+        # Only resolved once per instance (the boilerplate js and the url prefixes both need them)
+        if self._dependency_versions is None:
+            if self.use_local_daemon:
+                dep_versions = self.local_daemon_fetcher._fetch_all_dependency_versions()
+            else:
+                dep_versions = self.s3_fetcher._fetch_all_dependency_versions()
+
+            if self.is_debug and not self.use_local_daemon:
+                for dep, version in dep_versions.items():
+                    dep_versions[dep] = version + "-debug"
+
+            self._dependency_versions = dep_versions
+
+        return dict(self._dependency_versions)
 
-        if self.is_debug and not self.use_local_daemon:
-            for dep, version in dep_versions.items():
-                dep_versions[dep] = version + "-debug"
+    def _describe_for_profile(self):
+        '''
+        What gets saved alongside a slow call's profile
+        '''
+        resolved_versions = {}
+
+        for fetcher in (self._local_daemon_fetcher, self._s3_fetcher):
+            if fetcher is not None:
+                resolved_versions.update(fetcher._per_request_project_build_version_cache)
 
-        return dep_versions
+        return {
+            'bundle_paths': self.included_bundle_paths,
+            'host_project_name': self.host_project_name,
+            'is_debug': self.is_debug,
+            'use_local_daemon': self.use_local_daemon,
+            'skip_scaffold_cache': self.skip_scaffold_cache,
+            'resolved_versions': resolved_versions,
+        }
 
     def get_all_dependency_url_prefixes(self):
         '''
         Similar to `get_dependency_version_snapshot`, but appends "/<project>/static-" to each
         version so it is ready to be directly inserted into an URL
         '''
-        dep_versions_with_static = self.get_all_dependency_versions()
-        dep_versions_with_prefix = {}
+        return _build_dependency_url_prefixes(self.get_all_dependency_versions())
+
+    def get_dependency_js_config(self):
+        '''
+        The "depVersions: {...}, depPathPrefixes: {...}" snippet for the boilerplate js, ready to be
+        inlined in a <script>. The serialized string is cached in local memory by the resolved
+        versions (and debug flag), so it is only built once per distinct set of versions.
+        '''
+        dep_versions = self.get_all_dependency_versions()
+        key = (frozenset(dep_versions.items()), self.is_debug)
+
+        js_config = _dependency_js_config_cache.get(key)
 
-        for dep, version in dep_versions_with_static.items():
-            dep_versions_with_prefix[dep] = "/" + dep + "/" + version
+        if js_config is None:
+            js_config = "depVersions: %s,\n    depPathPrefixes: %s" % (
+                _json_for_script(dep_versions),
+                _json_for_script(_build_dependency_url_prefixes(dep_versions)))
 
-        return dep_versions_with_prefix
+            _dependency_js_config_cache.set(key, js_config)
+
+        return js_config
 
     def _check_use_local_daemon_for_project(self, bundle_path):
-        if not get_bender_or_static3_setting('BENDER_LOCAL_PROJECT_MODE', False):
+        if not get_config().local_project_mode:
             return False
         if bundle_path.startswith(self.host_project_name + '/'):
             return True
         return False
 
     def _check_use_local_daemon(self, request):
-        use_local = get_bender_or_static3_setting('BENDER_LOCAL_MODE', None)
-        if use_local != None:
-            return use_local
-        if get_setting('ENV') in ('local',):
+        config = get_config()
+        if config.local_mode != None:
+            return config.local_mode
+        if config.is_local:
             return True
         return False
 
@@ -361,15 +694,15 @@ class BenderAssets(object):
         if hs_debug:
             return hs_debug != 'false'
 
-        local_mode = get_bender_or_static3_setting('BENDER_LOCAL_MODE', None)
-        if local_mode != None:
-            return local_mode
+        config = get_config()
+
+        if config.local_mode != None:
+            return config.local_mode
 
-        debug_mode = get_bender_or_static3_setting('BENDER_DEBUG_MODE', None)
-        if debug_mode != None:
-            return debug_mode
+        if config.debug_mode != None:
+            return config.debug_mode
 
-        return  get_setting('ENV') in ('local',)
+        return config.is_local
 
     def _extract_forced_versions_from_params(self, http_get_params):
         """
@@ -386,13 +719,20 @@ class BenderAssets(object):
         (Eg. test major version 2 while 1 is still the one running by default on QA/prod).
 
         For <build_name> you can specify generic values (like "current", "latest", or "3") as well as specific
-        build names (like "static-4.59").
+        build names (like "static-4.59"). Values that can't be parsed (like "static-x") are ignored.
         """
         forced_build_version_by_project = dict()
 
         for param, value in http_get_params.items():
             if param.startswith(FORCE_BUILD_PARAM_PREFIX):
                 project_name = param[len(FORCE_BUILD_PARAM_PREFIX):]
+
+                try:
+                    VersionPointer.parse(value)
+                except ValueError:
+                    logger.warning("Ignoring invalid build in %s=%s" % (param, value))
+                    continue
+
                 forced_build_version_by_project[project_name] = value
 
                 # Always skip the scaffold cache if we are forcing a version
@@ -425,12 +765,27 @@ class BundleFetcherBase(object):
         '''
         self.host_project_name = host_project_name
         self.is_debug = is_debug
-        self.project_directory = get_setting('PROJ_DIR')
+        self.project_directory = get_config().project_directory
 
         # We store the build versions locally in this object so we don't have to
         # hit memcached dozens of times per request every time we call get_asset_url.
-        self.per_request_project_build_version_cache = {}
-        self._add_forced_versions_to_per_request_cache(forced_build_version_by_project)
+        self._per_request_project_build_version_cache = {}
+
+        # Resolved on first use of the per-request cache (resolving a forced pointer
+        # means downloading it). The first use can be from several executor threads at
+        # once, the others wait until the forced versions are in the cache.
+        self._unresolved_forced_build_version_by_project = forced_build_version_by_project
+        self._forced_versions_lock = threading.Lock()
+
+    @property
+    def per_request_project_build_version_cache(self):
+        if self._unresolved_forced_build_version_by_project:
+            with self._forced_versions_lock:
+                if self._unresolved_forced_build_version_by_project:
+                    self._add_forced_versions_to_per_request_cache(self._unresolved_forced_build_version_by_project)
+                    self._unresolved_forced_build_version_by_project = None
+
+        return self._per_request_project_build_version_cache
 
     def fetch_include_html(self, bundle_path):
         raise NotImplementedError("Implement me in a subclass")
@@ -465,22 +820,24 @@ class BundleFetcherBase(object):
         request (via FORCE_BUILD_PARAM_PREFIX)
         """
         if forced_build_version_by_project:
+            # Called while resolving the per_request_project_build_version_cache property, so
+            # this writes to the underlying dict
             for dep_name, dep_value in forced_build_version_by_project.items():
-                if self._is_specific_build_name(dep_value):
-                    self.per_request_project_build_version_cache[dep_name] = dep_value
+                if VersionPointer.parse(dep_value).is_specific_build:
+                    self._per_request_project_build_version_cache[dep_name] = dep_value
                 else:
-                    self.per_request_project_build_version_cache[dep_name] = self._fetch_version_from_version_pointer(dep_value, dep_name)
+                    self._per_request_project_build_version_cache[dep_name] = self._fetch_version_from_version_pointer(dep_value, dep_name)
 
-    def _is_specific_build_name(self, build_name):
-       return isinstance(build_name, basestring) and build_name.startswith('static-')
+    def _get_dependency_project_names(self):
+        '''
+        Every project in static_conf.json plus the host project
+        '''
+        return self._get_static_conf_data().get('deps', {}).keys() + [self.host_project_name]
 
     def _fetch_all_dependency_versions(self):
-        project_name_to_version = {}
-        project_names = self._get_static_conf_data().get('deps', {}).keys() + [self.host_project_name]
-        for project_name in project_names:
-            version = self._fetch_build_version(project_name)
-            project_name_to_version[project_name] = version
-        return project_name_to_version
+        project_names = self._get_dependency_project_names()
+        versions = get_executor().map(self._fetch_build_version, project_names)
+        return dict(zip(project_names, versions))
 
     def _get_version_from_static_conf(self, project_name):
         deps = self._get_static_conf_data().get('deps', {})
@@ -491,8 +848,9 @@ class BundleFetcherBase(object):
         return deps.get(project_name, 'current')
 
     def _get_static_conf_data(self):
-        path = os.path.join(self.project_directory, 'static/static_conf.json')
-        parents_path = os.path.join(self.project_directory, '../static/static_conf.json')
+        config = get_config()
+        path = config.static_conf_path
+        parents_path = config.parent_static_conf_path
 
         if os.path.isfile(path):
             return _load_json_file_with_cache(path, throw_exception_if=_is_only_on_qa)
@@ -502,18 +860,69 @@ class BundleFetcherBase(object):
             return {}
 
 class LocalDaemonBundleFetcher(BundleFetcherBase):
+    def __init__(self, *args, **kwargs):
+        super(LocalDaemonBundleFetcher, self).__init__(*args, **kwargs)
+
+        # Responses from a batch request (by the url of the individual request)
+        self._prefetched_responses = {}
+
     def fetch_include_html(self, bundle_path):
-        url = "http://%s/bundle%s/%s.html?from=%s" % \
+        html = self._fetch_from_daemon(self._include_html_url(bundle_path), request_type='daemon_bundle')
+        return self._append_static_domain_to_links(html)
+
+    def prefetch(self, bundle_paths, project_names=()):
+        '''
+        Fetches the include html of the bundles and the build versions of the projects in a single
+        batch request to the daemon, so that the following fetch_include_html/_fetch_build_version
+        calls don't each need a round trip. Does nothing if the daemon doesn't support batching
+        (they will just be fetched individually).
+        '''
+        watcher = self._get_change_watcher()
+
+        def is_uncached(url):
+            return url not in self._prefetched_responses and (watcher is None or watcher.get(url) is None)
+
+        url_by_bundle_path = dict([(bundle_path, self._include_html_url(bundle_path)) for bundle_path in bundle_paths])
+        url_by_project_name = dict([(project_name, self._build_version_url(project_name)) for project_name in project_names
+                                    if not self.per_request_project_build_version_cache.get(project_name)])
+
+        url_by_bundle_path = dict([(key, url) for key, url in url_by_bundle_path.items() if is_uncached(url)])
+        url_by_project_name = dict([(key, url) for key, url in url_by_project_name.items() if is_uncached(url)])
+
+        # Not worth a batch request for a single item
+        if len(url_by_bundle_path) + len(url_by_project_name) <= 1:
+            return
+
+        generation = watcher.generation if watcher else None
+        batch = fetch_batch(self.get_domain(), self.host_project_name, url_by_bundle_path.keys(), url_by_project_name.keys(),
+                            expanded=self.is_debug)
+
+        if not batch:
+            return
+
+        for results, url_by_key in ((batch['bundles'], url_by_bundle_path), (batch['builds'], url_by_project_name)):
+            for key, text in results.items():
+                url = url_by_key.get(key)
+
+                if url and text is not None:
+                    self._prefetched_responses[url] = text
+
+                    if watcher:
+                        watcher.set(url, text, generation)
+
+    def _include_html_url(self, bundle_path):
+        return "http://%s/bundle%s/%s.html?from=%s" % \
             (self.get_domain(),
              '-expanded' if self.is_debug else '',
              bundle_path,
              self.host_project_name
              )
 
-        result = fetch_ab_url_with_retries(url, timeouts=[1, 5, 25])
-        html = self._append_static_domain_to_links(result.text)
-
-        return html
+    def _build_version_url(self, project_name):
+        return "http://%s/builds/%s?from=%s" % \
+            (self.get_domain(),
+             project_name,
+             self.host_project_name)
 
     def get_asset_url(self, project_name, asset_path):
         try:
@@ -526,7 +935,7 @@ class LocalDaemonBundleFetcher(BundleFetcherBase):
         return url
 
     def get_domain(self):
-        return get_bender_or_static3_setting('BENDER_DAEMON_DOMAIN', 'localhost:3333')
+        return get_config().daemon_domain
 
     def _fetch_build_version(self, project_name):
         """
@@ -543,20 +952,54 @@ class LocalDaemonBundleFetcher(BundleFetcherBase):
         return build_version
 
     def _fetch_build_version_from_daemon(self, project_name):
-        url = "http://%s/builds/%s?from=%s" % \
-            (self.get_domain(),
-             project_name,
-             self.host_project_name)
-
-        result = fetch_ab_url_with_retries(url, timeouts=[1, 2, 5])
-        return result.text
+        return self._fetch_from_daemon(self._build_version_url(project_name), request_type='daemon')
 
     def fetch_static_file_contents(self, static_path):
         url = "http://%s/%s" % (self.get_domain(), static_path)
-        result = fetch_ab_url_with_retries(url, timeouts=[1, 2, 5])
-        return json.loads(result.text)
+        return json.loads(self._fetch_from_daemon(url, request_type='daemon'))
+
+    def _fetch_from_daemon(self, url, request_type):
+        '''
+        Fetches the text at url from the daemon. If the daemon has a change feed, responses
+        are kept in local memory until the daemon reports that something was rebuilt.
+        '''
+        text = self._prefetched_responses.get(url)
+
+        if text is not None:
+            return text
+
+        watcher = self._get_change_watcher()
+
+        if watcher is None:
+            return fetch_ab_url_with_retries(url, request_type=request_type).text
+
+        text = watcher.get(url)
+
+        if text is None:
+            generation = watcher.generation
+            text = fetch_ab_url_with_retries(url, request_type=request_type).text
+            watcher.set(url, text, generation)
+
+        return text
+
+    def _get_change_watcher(self):
+        config = get_config()
+
+        if config.daemon_change_feed:
+            return get_change_watcher(self.get_domain(), config.daemon_change_feed_path)
 
 class S3BundleFetcher(BundleFetcherBase):
+    def __init__(self, *args, **kwargs):
+        '''
+        @prefetch_project_names - projects (besides the static_conf.json deps) whose cached
+                                  build versions are looked up in the first memcache batch
+        '''
+        self._prefetch_project_names = kwargs.pop('prefetch_project_names', ())
+        super(S3BundleFetcher, self).__init__(*args, **kwargs)
+
+        # The projects that were looked up in the batch (None until it is done)
+        self._prefetched_project_names = None
+
     def fetch_include_html(self, bundle_path):
         project_name, hardcoded_version, bundle_postfix_path = self._split_bundle_path(bundle_path)
 
@@ -572,10 +1015,10 @@ class S3BundleFetcher(BundleFetcherBase):
             bundle_postfix_path,
             '-expanded' if self.is_debug else '')
 
-        if LOG_S3_FETCHES:
+        if get_config().log_s3_fetches:
             logger.info("Fetching the bundle html (static versions) for %(bundle_path)s" % locals())
 
-        result = fetch_ab_url_with_retries(url, timeouts=[1,2,5])
+        result = fetch_ab_url_with_retries(url, request_type='bundle')
         return self._append_static_domain_to_links(result.text)
 
 
@@ -594,17 +1037,18 @@ class S3BundleFetcher(BundleFetcherBase):
         return self._fetch_all_dependency_versions()
 
     def make_url_to_pointer(self, pointer, project_name):
-        # if the version is just an integer, that represents a major version, and so we create
-        # the major version pointer
-        if str(pointer).isdigit():
-            pointer = 'latest-version-%s' % str(pointer)
-
-        url = 'http://%s/%s/%s' % (self._get_non_cdn_domain(), project_name, pointer)
-        if get_setting('ENV') not in ('prod',):
-            url += '-qa'
-        return url
+        return 'http://%s/%s/%s' % (self._get_non_cdn_domain(), project_name, self._pointer_file_name(pointer))
+
+    def _pointer_file_name(self, pointer):
+        # if the version is just an integer, that represents a major version, and so
+        # the pointer name is the major version pointer (latest-version-<major>)
+        pointer_name = VersionPointer.parse(pointer).pointer_name
+
+        if not get_config().is_prod:
+            pointer_name += '-qa'
+        return pointer_name
 
-    project_name_re = re.compile(r'^/?([^/]+)/(static(?:-\d+.\d+)?)/(.*)')
+    project_name_re = re.compile(r'^/?([^/]+)/(static(?:-\d+(?:\.\d+)*)?)/(.*)')
 
     def _split_bundle_path(self, bundle_path):
         match = self.project_name_re.match(bundle_path)
@@ -617,6 +1061,62 @@ class S3BundleFetcher(BundleFetcherBase):
         return match.group(1), hardcoded_version, match.group(3)
 
     def _fetch_build_version(self, project_name):
+        build_version = self._fetch_cached_build_version(project_name)
+
+        if build_version:
+            return build_version
+
+        # Next try fetching directly from s3
+        build_version = self._fetch_build_version_without_cache(project_name)
+
+        if not build_version:
+            raise AssetBenderException("Could not find a build version for %s" % project_name)
+
+        self._cache_build_version(project_name, build_version)
+        return build_version
+
+    def _fetch_all_dependency_versions(self):
+        '''
+        Like the base implementation, but all the projects that aren't already cached
+        are resolved together in a single pass.
+        '''
+        return self._fetch_build_versions(self._get_dependency_project_names())
+
+    def _fetch_build_versions(self, project_names):
+        '''
+        Like _fetch_build_version for many projects, returns a dict of project name -> build version
+        '''
+        project_name_to_version = {}
+        uncached_project_names = []
+
+        for project_name in project_names:
+            build_version = self._fetch_cached_build_version(project_name)
+
+            if build_version:
+                project_name_to_version[project_name] = build_version
+            else:
+                uncached_project_names.append(project_name)
+
+        if uncached_project_names:
+            resolved_versions = self._fetch_build_versions_without_cache(uncached_project_names)
+
+            for project_name in uncached_project_names:
+                build_version = resolved_versions.get(project_name)
+
+                if not build_version:
+                    raise AssetBenderException("Could not find a build version for %s" % project_name)
+
+                self._cache_build_version(project_name, build_version)
+                project_name_to_version[project_name] = build_version
+
+        trace_event('versions', project_name_to_version)
+        return project_name_to_version
+
+    def _fetch_cached_build_version(self, project_name):
+        '''
+        Looks for the build version in the fixed local versions, the per-request mini-cache,
+        and then memcache. Returns None if it isn't in any of them.
+        '''
         # Are there any fixed local versions?
         build_version = self._fetch_local_project_build_version(project_name)
 
@@ -629,28 +1129,63 @@ class S3BundleFetcher(BundleFetcherBase):
         if build_version:
             return build_version
 
+        # The first time, every project this request will need is looked up in memcache at once
+        if self._prefetched_project_names is None:
+            self._prefetch_cached_build_versions()
+            build_version = self.per_request_project_build_version_cache.get(project_name)
+
+            if build_version:
+                return build_version
+
+        # Already missed in the batch
+        if project_name in self._prefetched_project_names:
+            return None
+
         # Try memcache
-        build_version = project_version_cache.get(
+        build_version = get_project_version_cache().get(
             project=project_name,
             host_project=self.host_project_name)
+        record_cache_lookup('project_version_cache', build_version)
 
-        if not build_version:
-            if LOG_CACHE_MISSES:
-                logger.debug("Asset Bender build version cache miss: %s from %s" % (project_name, self.host_project_name))
+        if build_version:
+            self.per_request_project_build_version_cache[project_name] = build_version
+        elif get_config().log_cache_misses:
+            logger.debug("Asset Bender build version cache miss: %s from %s" % (project_name, self.host_project_name))
 
-            # Next try fetching directly from s3
-            build_version = self._fetch_build_version_without_cache(project_name)
+        return build_version
 
-        if not build_version:
-            raise BundleException("Could not find a build version for %s" % project_name)
+    def _prefetch_cached_build_versions(self):
+        '''
+        Warms the per-request cache with the cached build versions of all the static_conf.json
+        deps, the host project, and the included bundles' projects in one batch
+        '''
+        project_names = []
+
+        for project_name in list(self._prefetch_project_names) + self._get_dependency_project_names():
+            if project_name not in project_names and not self.per_request_project_build_version_cache.get(project_name) \
+                    and not self._fetch_local_project_build_version(project_name):
+                project_names.append(project_name)
+
+        self._prefetched_project_names = set(project_names)
+
+        build_versions = get_project_version_cache().get_many([
+            dict(project=project_name, host_project=self.host_project_name) for project_name in project_names])
+
+        for project_name, build_version in zip(project_names, build_versions):
+            record_cache_lookup('project_version_cache', build_version)
+
+            if build_version:
+                self.per_request_project_build_version_cache[project_name] = build_version
+            elif get_config().log_cache_misses:
+                logger.debug("Asset Bender build version cache miss: %s from %s" % (project_name, self.host_project_name))
 
-        project_version_cache.set(
+    def _cache_build_version(self, project_name, build_version):
+        get_project_version_cache().set(
             build_version,
             project=project_name,
             host_project=self.host_project_name)
 
         self.per_request_project_build_version_cache[project_name] = build_version
-        return build_version
 
     def _fetch_local_project_build_version(self, project_name):
         '''
@@ -667,21 +1202,91 @@ class S3BundleFetcher(BundleFetcherBase):
         return build_version
 
     def _fetch_build_version_without_cache(self, project_name):
-        static_conf_version = self._get_version_from_static_conf(project_name)
-        if self._is_specific_build_name(static_conf_version):
-            return static_conf_version
-        pointer_build_version = self._fetch_version_from_version_pointer(static_conf_version, project_name)
-        prebuilt_build_version = self._get_prebuilt_version(project_name)
-        frozen_by_deploy_version = self._get_frozen_at_deploy_version(project_name)
-        build_version = self._maximum_version_of(
-            pointer_build_version,
-            prebuilt_build_version,
-            frozen_by_deploy_version)
-
-        if LOG_S3_FETCHES:
-            logger.info("Fetched static version for %(project_name)s: %(build_version)s (max of %(pointer_build_version)s, %(prebuilt_build_version)s, and %(frozen_by_deploy_version)s)" % locals())
+        return self._fetch_build_versions_without_cache([project_name]).get(project_name)
+
+    @profiled('fetch_build_versions', describe=lambda self, args, result: {
+        'host_project_name': self.host_project_name,
+        'project_names': list(args[0]),
+        'resolved_versions': result,
+    })
+    def _fetch_build_versions_without_cache(self, project_names):
+        '''
+        Resolves the build versions of all the passed projects in one pass. Each one is the
+        maximum of its version pointer, prebuilt version, and frozen at deploy version (unless
+        static_conf.json specifies an exact build).
 
-        return build_version
+        Returns a dict of project name -> build version.
+        '''
+        candidates_by_project = {}
+        pointer_by_project = {}
+
+        for project_name in project_names:
+            pointer = VersionPointer.parse(self._get_version_from_static_conf(project_name))
+
+            if pointer.is_specific_build:
+                candidates_by_project[project_name] = (pointer.value,)
+            else:
+                pointer_by_project[project_name] = pointer
+
+        pointer_version_by_project = self._lookup_pointers_in_index(pointer_by_project)
+
+        # The rest of the pointers are downloaded in parallel
+        pointer_project_names = [project_name for project_name in pointer_by_project if project_name not in pointer_version_by_project]
+        pointer_versions = get_executor().map(
+            lambda project_name: self._fetch_version_from_version_pointer(pointer_by_project[project_name].value, project_name),
+            pointer_project_names)
+
+        pointer_version_by_project.update(zip(pointer_project_names, pointer_versions))
+
+        for project_name, pointer_version in pointer_version_by_project.items():
+            candidates_by_project[project_name] = (
+                pointer_version,
+                self._get_prebuilt_version(project_name),
+                self._get_frozen_at_deploy_version(project_name))
+
+        resolved_versions = resolve_maximum_versions(candidates_by_project)
+
+        if get_config().log_s3_fetches:
+            for project_name, candidates in candidates_by_project.items():
+                logger.info("Fetched static version for %s: %s (max of %s)" % (
+                    project_name, resolved_versions.get(project_name), ', '.join([str(c) for c in candidates])))
+
+        trace_event('resolve', resolved_versions)
+        return resolved_versions
+
+    def _lookup_pointers_in_index(self, pointer_by_project):
+        '''
+        Returns a dict of project name -> build for the pointers that are in the pointer
+        index (if BENDER_POINTER_INDEX_URL is set). Entries that aren't build names are skipped,
+        so those pointers are fetched instead.
+        '''
+        config = get_config()
+
+        if not config.pointer_index_url or not pointer_by_project:
+            return {}
+
+        index = get_pointer_index(config.pointer_index_url, config.pointer_index_revalidate_seconds)
+        pointer_version_by_project = {}
+
+        for project_name, pointer in pointer_by_project.items():
+            pointer_file_name = self._pointer_file_name(pointer.value)
+            build_version = index.lookup(project_name, pointer_file_name)
+
+            if build_version is None:
+                continue
+
+            try:
+                is_valid = isinstance(build_version, basestring) and BuildVersion.parse(build_version) is not None
+            except ValueError:
+                is_valid = False
+
+            if not is_valid:
+                logger.warning("Ignoring invalid build %r for %s/%s in the pointer index" % (build_version, project_name, pointer_file_name))
+                continue
+
+            pointer_version_by_project[project_name] = build_version
+
+        return pointer_version_by_project
 
     def _fetch_version_from_version_pointer(self, pointer, project_name):
         '''
@@ -689,7 +1294,7 @@ class S3BundleFetcher(BundleFetcherBase):
         from S3 and gets the actual build version from it (ex. 1.4.123 )
         '''
         url = self.make_url_to_pointer(pointer, project_name)
-        result = fetch_ab_url_with_retries(url, timeouts=[1, 2, 5])
+        result = fetch_ab_url_with_retries(url, request_type='pointer')
 
         if not result.text:
             self._check_for_fetch_html_errors_and_raise_exception(result, url)
@@ -702,7 +1307,7 @@ class S3BundleFetcher(BundleFetcherBase):
         When a project is built in Jenkins to QA, we store the version of the bundle that existed
         when it was built
         '''
-        path = os.path.join(self.project_directory, 'static/prebuilt_recursive_static_conf.json')
+        path = get_config().prebuilt_static_conf_path
         data = _load_json_file_with_cache(path, throw_exception_if=_is_only_on_qa)
 
         # If this is the host project, get the build from the "build" key instead of the deps dict
@@ -722,47 +1327,48 @@ class S3BundleFetcher(BundleFetcherBase):
         of the snapshot.  So there is never any danger of having working code on QA, then deploying
         to prod only to find you are importing an old, buggy version of a dependency
         '''
-        path = os.path.join(self.project_directory, 'static/frozen_at_deploy_version_snapshot.json')
+        path = get_config().frozen_snapshot_path
         return _load_json_file_with_cache(path).get(project_name, '')
 
-    def _maximum_version_of(self, *args):
-        args = [a for a in args if a]
-        return sorted(args, cmp=self._compare_build_names).pop()
-
-    def _compare_build_names(self, x_build, y_build):
-        """
-        Implementation of cmp() for build names. So:
-
-        >>> compare_build_names('static-1.0', 'static-1.1')
-        -1
-        >>> compare_build_names('static-2.0', 'static-1.1')
-        1
-        >>> compare_build_names('static-3.4', 'static-3.4')
-        0
-
-        """
-        # Convert each build name to a two element tuple
-        x, y = [tuple(map(int, build.replace('static-', '').split('.'))) for build in (x_build, y_build)]
-        major_cmp = cmp(x[0], y[0])
-        if major_cmp != 0:
-          return major_cmp
-        else:
-          return cmp(x[1], y[1])
-
     def get_domain(self):
-        return get_bender_or_static3_setting('BENDER_CDN_DOMAIN', 'static.hsappstatic.net')
+        return get_config().cdn_domain
 
     def _get_non_cdn_domain(self):
         '''
         When downloading the version pointer, we need to skip the CDN and go direct to avoid problems with caching
         '''
-        return get_bender_or_static3_setting('BENDER_S3_DOMAIN', 'hubspot-static2cdn.s3.amazonaws.com')
+        return get_config().s3_domain
 
     # Assumes that the build has placed the precomplied file in the python egg
     # (oh and that it is a JSON file)
     def fetch_static_file_contents(self, static_path):
-        filename = os.path.basename(static_path)
-        return _load_json_file_with_cache(filename)
+        # Under its full path if the build put it there, otherwise just the file name
+        return get_static_json_store().get((static_path, os.path.basename(static_path)))
+
+
+class AssetRecord(namedtuple('AssetRecord', 'kind url attrs html')):
+    """
+    A single parsed include from a bundle's html.
+
+    @kind - one of SCRIPT_KIND, STYLESHEET_KIND or RAW_KIND
+    @url - the src/href of the include, unescaped (None for raw html)
+    @attrs - a tuple of (name, value) pairs for the rest of the tag's attributes (unescaped)
+    @html - the original html, only kept for RAW_KIND records (anything that isn't
+            a plain <script> or stylesheet <link>)
+    """
+    __slots__ = ()
+
+    SCRIPT_KIND = 'script'
+    STYLESHEET_KIND = 'stylesheet'
+    RAW_KIND = 'raw'
+
+    def render(self):
+        if self.kind == self.SCRIPT_KIND:
+            return '<script src="%s"%s></script>' % (_escape_attr(self.url), _render_attrs(self.attrs))
+        elif self.kind == self.STYLESHEET_KIND:
+            return '<link href="%s"%s />' % (_escape_attr(self.url), _render_attrs(self.attrs))
+        else:
+            return self.html
 
 
 class Scaffold(object):
@@ -780,49 +1386,113 @@ class Scaffold(object):
     # single <style> element: http://blogs.msdn.com/b/ieinternals/archive/2011/05/14/internet-explorer-stylesheet-rule-selector-import-sheet-limit-maximum.aspx
     MAX_IMPORTS_PER_STYLE_ELEMENT = 25
 
+    # Defaults for scaffolds that were pickled before these existed
+    missing_bundles = ()
+    built_at = None
+
+    # The combined records of each section in combo mode, by section name (see _rendered_records)
+    _combined_records = None
+
     head_template = "asset_bender/scaffold/head.html"
     end_of_body_template = "asset_bender/scaffold/end_of_body.html"
 
-    def __init__(self, force_normal_include=False):
+    def __init__(self, force_normal_include=False, combo_url_template=None, combo_max_url_length=DEFAULT_COMBO_MAX_URL_LENGTH):
         '''
-        @head_js - a collection of javascript src files
-        @head_css - a collection of css files for the head
-        @footer_js - a collection of js files for the footer
+        @combo_url_template - if set, consecutive includes of the same type and domain are rendered
+                              as a single combo handler url built from this template
+        @combo_max_url_length - the longest combo url to generate before starting a new one
+        @head_js - a list of AssetRecords for the javascript in the head
+        @head_css - a list of AssetRecords for the css in the head
+        @footer_js - a list of AssetRecords for the javascript in the footer
+        @dropped_duplicates - a list of (file_name, url) tuples for the includes that were
+                              dropped because an earlier bundle already included them
+        @missing_bundles - the bundles that couldn't be fetched
+        @built_at - when the scaffold was built (a unix timestamp)
         '''
         self.head_js = []
         self.head_css = []
         self.footer_js = []
+        self.dropped_duplicates = []
+        self.missing_bundles = []
+        self.built_at = time.time()
 
         self.force_normal_include = force_normal_include
+        self.combo_url_template = combo_url_template
+        self.combo_max_url_length = combo_max_url_length
+
+    @property
+    def is_complete(self):
+        return not self.missing_bundles
 
     def total_css_files(self):
-        return len(self.head_css)
+        return len(self._rendered_records('head_css'))
 
-    def add_head_css_html(self, html):
-        self.head_css += html.split('\n')
+    def add_head_css_html(self, html, file_name=None, seen_asset_urls=None):
+        self.head_css += self._parse_and_dedupe(html, file_name, seen_asset_urls)
+        self._combined_records = None
 
-    def add_head_js_html(self, html):
-        self.head_js += html.split('\n')
+    def add_head_js_html(self, html, file_name=None, seen_asset_urls=None):
+        self.head_js += self._parse_and_dedupe(html, file_name, seen_asset_urls)
+        self._combined_records = None
 
-    def add_footer_js_html(self, html):
-        self.footer_js += html.split('\n')
+    def add_footer_js_html(self, html, file_name=None, seen_asset_urls=None):
+        self.footer_js += self._parse_and_dedupe(html, file_name, seen_asset_urls)
+        self._combined_records = None
 
-    def add_html_by_file_name(self, file_name, html):
+    def add_html_by_file_name(self, file_name, html, seen_asset_urls=None):
         '''
         Adds the html to the proper section based on the name and extension of 'file_name'
+
+        If a set is passed as seen_asset_urls, any include whose (normalized) url is already in
+        it is dropped (and recorded in dropped_duplicates), and the new urls are added to it.
         '''
         if _find_extension(file_name) in CSS_EXTENSIONS:
-            self.add_head_css_html(html)
+            self.add_head_css_html(html, file_name, seen_asset_urls)
         else:
             if '_head.js' in file_name or '-head.js' in file_name:
-                self.add_head_js_html(html)
+                self.add_head_js_html(html, file_name, seen_asset_urls)
             else:
-                self.add_footer_js_html(html)
+                self.add_footer_js_html(html, file_name, seen_asset_urls)
+
+    def _parse_and_dedupe(self, html, file_name, seen_asset_urls):
+        records = parse_bundle_html(html)
 
+        if seen_asset_urls is None:
+            return records
+
+        unique_records = []
+
+        for record in records:
+            if record.url:
+                normalized_url = _normalize_asset_url(record.url)
+
+                if normalized_url in seen_asset_urls:
+                    self.dropped_duplicates.append((file_name, record.url))
+                    continue
+
+                seen_asset_urls.add(normalized_url)
+
+            unique_records.append(record)
+
+        return unique_records
+
+    def head_preload_urls(self):
+        '''
+        Returns a list of (url, type) tuples for the critical head assets (the combo urls in
+        combo mode), where type is the "as" value of a preload link ('style' or 'script')
+        '''
+        return [(record.url, 'style') for record in self._rendered_records('head_css') if record.kind == AssetRecord.STYLESHEET_KIND] + \
+               [(record.url, 'script') for record in self._rendered_records('head_js') if record.kind == AssetRecord.SCRIPT_KIND]
+
+    def html_size(self):
+        '''
+        Roughly how many bytes of html the scaffold renders to (for metrics)
+        '''
+        return sum([len(record.render()) for record in self.head_js + self.head_css + self.footer_js])
 
     # Methods used by the layout templates to output scaffold files
     def header_js_html(self):
-        html = "\n".join(self.head_js)
+        html = _render_records(self._rendered_records('head_js'))
 
         # JS only for IE
         html += """
@@ -831,13 +1501,15 @@ class Scaffold(object):
         return html
 
     def footer_js_html(self):
-        return "\n".join(self.footer_js)
+        return _render_records(self._rendered_records('footer_js'))
 
     def header_css_html(self):
+        head_css = self._rendered_records('head_css')
+
         if self.force_normal_include:
-            return "\n".join(self.head_css)
+            return _render_records(head_css)
         else:
-            return "\n".join(self.head_css[:self.MAX_IE_CSS_INCLUDES])
+            return _render_records(head_css[:self.MAX_IE_CSS_INCLUDES])
 
     def has_excess_stylesheets_for_IE(self):
         return self.total_css_files() > self.MAX_IE_CSS_INCLUDES and not self.force_normal_include
@@ -854,7 +1526,7 @@ class Scaffold(object):
         if self.has_excess_stylesheets_for_IE():
 
             # Convert all the excess <link> elements into @imports
-            import_lines = map(self._convert_link_to_import, self.head_css[self.MAX_IE_CSS_INCLUDES:])
+            import_lines = map(self._convert_link_to_import, self._rendered_records('head_css')[self.MAX_IE_CSS_INCLUDES:])
 
             # Chunk those @imports by MAX_IMPORTS_PER_STYLE_ELEMENT, and then
             # turn each chunk into a single string separated by newlines
@@ -869,25 +1541,274 @@ class Scaffold(object):
         else:
             return ""
 
-    def _convert_link_to_import(self, link_html):
+    def _rendered_records(self, section):
+        '''
+        The records of a section ('head_css', 'head_js' or 'footer_js') that are actually output,
+        which are the combined records in combo mode. Those are only combined once (until more
+        html is added to the scaffold).
+        '''
+        records = getattr(self, section)
+
+        if not self.combo_url_template:
+            return records
+
+        if self._combined_records is None:
+            self._combined_records = {}
+
+        combined = self._combined_records.get(section)
+
+        if combined is None:
+            combined = self._combined_records[section] = combine_records(records, self.combo_url_template, self.combo_max_url_length)
+
+        return combined
+
+    def _convert_link_to_import(self, record):
         """
-        Converts:
+        Converts the record for:
             <link href="/style_guide/static/sass/style_guide_plus_layout.css?body=1" media="screen" rel="stylesheet" type="text/css" />
         To:
             @import "/style_guide/static/sass/style_guide_plus_layout.css?body=1";
         """
-
-        try:
-            # Get the URL via indexes
-            left_index = link_html.index('href=') + 6
-            quote_char = link_html[left_index - 1]
-            right_index = link_html.index(quote_char, left_index)
-            url = link_html[left_index:right_index]
-        except:
-            print "Warning, trying to add a non css file (link element) to the scaffold: %s" % link_html
+        if record.kind != AssetRecord.STYLESHEET_KIND:
+            logger.warning("Trying to add a non css file (link element) to the scaffold: %s" % record.render())
             return ""
 
-        return "@import \"%s\";" % url
+        return "@import \"%s\";" % record.url
+
+
+class LazyScaffold(object):
+    '''
+    Stands in for the Scaffold of a BenderAssets instance, which is generated on first
+    attribute access
+    '''
+    def __init__(self, bender_assets):
+        self._bender_assets = bender_assets
+
+    def __getattr__(self, name):
+        # Don't build it for lookups of special or private attributes (by copy, pickle, etc.)
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return getattr(self._bender_assets.generate_scaffold(), name)
+
+
+script_tag_regex = re.compile(r'^<script\b([^>]*)>\s*</script>$', re.IGNORECASE)
+link_tag_regex = re.compile(r'^<link\b([^>]*?)/?>$', re.IGNORECASE)
+tag_attr_regex = re.compile(r'([^\s=/]+)(?:\s*=\s*(?:([\'"])(.*?)\2|([^\s\'">]+)))?')
+
+def parse_bundle_html(html):
+    '''
+    Parses the html of a bundle (one include per line) into a list of AssetRecords.
+    Blank lines are dropped.
+    '''
+    records = []
+
+    for line in html.split('\n'):
+        line = line.strip()
+
+        if line:
+            records.append(_parse_include_tag(line))
+
+    return records
+
+def _parse_include_tag(tag_html):
+    match = script_tag_regex.match(tag_html)
+
+    if match:
+        kind, url_attr = AssetRecord.SCRIPT_KIND, 'src'
+    else:
+        match = link_tag_regex.match(tag_html)
+        kind, url_attr = AssetRecord.STYLESHEET_KIND, 'href'
+
+    if match:
+        attrs = _parse_tag_attrs(match.group(1))
+        url = None
+
+        for name, value in attrs:
+            if name == url_attr:
+                url = value
+
+        is_plain_include = kind == AssetRecord.SCRIPT_KIND or \
+            any([name == 'rel' and (value or '').lower() == 'stylesheet' for name, value in attrs])
+
+        if url and is_plain_include:
+            return AssetRecord(kind, url, tuple([(name, value) for name, value in attrs if name != url_attr]), None)
+
+    return AssetRecord(AssetRecord.RAW_KIND, None, (), tag_html)
+
+def _parse_tag_attrs(attrs_html):
+    attrs = []
+
+    for match in tag_attr_regex.finditer(attrs_html):
+        name, quoted_value, unquoted_value = match.group(1), match.group(3), match.group(4)
+        value = quoted_value if quoted_value is not None else unquoted_value
+        attrs.append((name.lower(), _unescape_attr(value) if value is not None else None))
+
+    return attrs
+
+def combine_records(records, combo_url_template, max_url_length=DEFAULT_COMBO_MAX_URL_LENGTH):
+    '''
+    Collapses runs of consecutive script (or stylesheet) records that share the same domain
+    and attributes into single records pointing at a combo handler url. Raw records and
+    urls without a domain are left as is (and break up the runs).
+    '''
+    combined = []
+    group, group_key, group_paths = [], None, []
+
+    def flush():
+        if len(group) == 1:
+            combined.append(group[0])
+        elif group:
+            kind, domain, attrs = group_key
+            combined.append(AssetRecord(kind, _build_combo_url(combo_url_template, domain, group_paths), attrs, None))
+
+    for record in records:
+        domain, path = _split_asset_url(record.url) if record.url else (None, None)
+
+        if not domain:
+            flush()
+            group, group_key, group_paths = [], None, []
+            combined.append(record)
+            continue
+
+        key = (record.kind, domain, record.attrs)
+        quoted_path = urllib.quote(path.lstrip('/'), safe='/')
+
+        too_long = len(_build_combo_url(combo_url_template, domain, group_paths + [quoted_path])) > max_url_length
+
+        if key != group_key or too_long:
+            flush()
+            group, group_key, group_paths = [], key, []
+
+        group.append(record)
+        group_paths.append(quoted_path)
+
+    flush()
+    return combined
+
+def _build_combo_url(combo_url_template, domain, quoted_paths):
+    return combo_url_template % {'domain': domain, 'paths': '&'.join(quoted_paths)}
+
+def _split_asset_url(url):
+    '''
+    Splits "//domain/path?query" (or an http/https url) into its domain and path. Returns
+    (None, None) for relative urls.
+    '''
+    url = _normalize_asset_url(url)
+
+    if not url.startswith('//'):
+        return None, None
+
+    host_end = url.find('/', 2)
+
+    if host_end < 0:
+        return None, None
+
+    return url[2:host_end], url[host_end:]
+
+def _normalize_asset_url(url):
+    '''
+    Normalizes an asset url for de-duplication, so that "https://Domain/x.js", "http://domain/x.js"
+    and "//domain/x.js" are all considered the same
+    '''
+    url = url.strip()
+    lowercase_url = url.lower()
+
+    if lowercase_url.startswith('http:') or lowercase_url.startswith('https:'):
+        url = url[url.index(':') + 1:]
+
+    if url.startswith('//'):
+        host_end = url.find('/', 2)
+
+        if host_end < 0:
+            host_end = len(url)
+
+        url = url[:host_end].lower() + url[host_end:]
+
+    return url
+
+def _render_attrs(attrs):
+    rendered = []
+
+    for name, value in attrs:
+        if value is None:
+            rendered.append(' %s' % name)
+        else:
+            rendered.append(' %s="%s"' % (name, _escape_attr(value)))
+
+    return ''.join(rendered)
+
+def _escape_attr(value):
+    '''
+    Escapes a value for a double quoted attribute (combo urls have "&"s in them)
+    '''
+    return value.replace('&', '&amp;').replace('"', '&quot;')
+
+html_entity_regex = re.compile(r'&(amp|quot|#39|#x27|lt|gt);')
+html_entities = {'amp': '&', 'quot': '"', '#39': "'", '#x27': "'", 'lt': '<', 'gt': '>'}
+
+def _unescape_attr(value):
+    '''
+    The inverse of _escape_attr (for the attribute values parsed from bundle html)
+    '''
+    return html_entity_regex.sub(lambda match: html_entities[match.group(1)], value)
+
+def _render_records(records):
+    return "\n".join([record.render() for record in records])
+
+class LocalLRUCache(object):
+    '''
+    A small thread-safe dict that evicts the least recently used keys past max_entries
+    '''
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+
+            if value is not None:
+                self._entries[key] = value
+
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# The serialized dependency configs for the boilerplate js, by (resolved versions, is_debug)
+MAX_DEPENDENCY_JS_CONFIGS_CACHED = 100
+_dependency_js_config_cache = LocalLRUCache(MAX_DEPENDENCY_JS_CONFIGS_CACHED)
+on_config_reset(_dependency_js_config_cache.clear)
+
+def _build_dependency_url_prefixes(dep_versions):
+    dep_versions_with_prefix = {}
+
+    for dep, version in dep_versions.items():
+        dep_versions_with_prefix[dep] = "/" + dep + "/" + version
+
+    return dep_versions_with_prefix
+
+def _json_for_script(data):
+    '''
+    Serializes data to json that is safe to inline in a <script> element
+    '''
+    return json.dumps(data, sort_keys=True).replace('</', '<\\/')
+
 
 _file_json_cache = {}
 def _load_json_file_with_cache(path, throw_exception_if=None):
@@ -898,7 +1819,7 @@ def _load_json_file_with_cache(path, throw_exception_if=None):
         return _file_json_cache[path]
 
     if not os.path.isfile(path):
-        if hasattr(throw_exception_if, '__call__') and throw_exception_if() and not get_bender_or_static3_setting('BENDER_QA_EMULATION', False):
+        if hasattr(throw_exception_if, '__call__') and throw_exception_if() and not get_config().qa_emulation:
             raise IOError("""
 Couldn't find the prebuilt static dependencies file at: %s
 You should double check that your static and jenkins config are correct. And that you have these lines in your Manifest.in:
@@ -941,6 +1862,30 @@ def _find_extension(filename, also_search_folder_name=True):
 
 project_name_static_path_regex = re.compile(r"(?:\/|^)([^\/]+)\/static\/")
 
+def split_bender_asset_path(full_asset_path):
+    '''
+    Splits "<project_name>/static/<asset_path>" into (project_name, asset_path)
+    '''
+    project_name = _extract_project_name_from_path(full_asset_path)
+    if not project_name:
+        raise Exception('Your path must be of the form: "<project_name>/static/js/whatever.js"')
+
+    # Break the full path down to just the asset path (everything under static/)
+    asset_path = full_asset_path.replace("%s/static/" % project_name, '')
+
+    # Make sure the path doesn't refer to a precompiled extension (since that won't actually exist on s3)
+    extension = _find_extension(full_asset_path, also_search_folder_name=False)
+
+    if extension in PRECOMPILED_EXTENSIONS:
+        message = "You cannot use the '%s' extension in this static path: %s.\n You must use 'js' or 'css' (It will work locally, but it won't work on QA/prod)." % (extension, full_asset_path)
+
+        if get_config().is_prod:
+            logger.error(message)
+        else:
+            raise Exception(message)
+
+    return project_name, asset_path
+
 def _extract_project_name_from_path(path_or_url):
     """
     Extracts the project_name out of a path or URL that looks like any of these:
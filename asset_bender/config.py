@@ -0,0 +1,355 @@
+import os
+import tempfile
+
+from asset_bender import AssetBenderException
+
+
+# %(domain)s is the domain of the combined assets and %(paths)s is their url quoted
+# paths (without the leading slash) joined by "&"
+DEFAULT_COMBO_MAX_URL_LENGTH = 2000
+
+FETCH_EXECUTOR_KINDS = ('auto', 'serial', 'threads', 'gevent', 'eventlet')
+
+DEFAULT_PROFILE_DIRECTORY = os.path.join(tempfile.gettempdir(), 'asset_bender_profiles')
+DEFAULT_TRACE_PATH = os.path.join(tempfile.gettempdir(), 'asset_bender_traces.jsonl')
+
+# Settings outside of the BENDER_/STATIC3_ namespace that the config depends on
+NON_BENDER_SETTING_NAMES = ('ENV', 'PROJ_NAME', 'PROJ_DIR', 'DEFAULT_ASSET_BENDER_BUNDLES', 'DEFAULT_BUNDLES_V3')
+
+
+_get_setting_default = None
+
+def get_setting_default(setting_name, default_value):
+    '''
+    The settings helper is only imported on first use, since hscacheutils' looks at whether
+    the django settings are configured when it is imported
+    '''
+    global _get_setting_default
+
+    if _get_setting_default is None:
+        _load_django_settings()
+
+        try:
+            from hubspot.hsutils import get_setting_default as _get_setting_default
+        except ImportError:
+            from hscacheutils.setting_wrappers import get_setting_default as _get_setting_default
+
+    return _get_setting_default(setting_name, default_value)
+
+def _load_django_settings():
+    '''
+    Django loads its settings lazily (on first access), so make sure that has happened
+    '''
+    try:
+        from django.conf import settings
+        getattr(settings, 'DEBUG', None)
+    except Exception:
+        pass
+
+def get_bender_or_static3_setting(setting_name, default_value):
+    static3_setting_name = setting_name.replace('BENDER_', 'STATIC3_')
+    return get_setting_default(setting_name, get_setting_default(static3_setting_name, default_value))
+
+
+class BenderConfig(object):
+    """
+    All of the Asset Bender settings, resolved once (with the BENDER_/STATIC3_ aliases
+    merged and the PROJ_DIR paths precomputed) so the hot paths only do attribute lookups.
+
+    Immutable, use `get_config()` to get the current instance.
+    """
+    __slots__ = (
+        'env',
+        'project_name',
+        'project_directory',
+        'static_conf_path',
+        'parent_static_conf_path',
+        'prebuilt_static_conf_path',
+        'frozen_snapshot_path',
+        'default_bundles',
+
+        'cdn_domain',
+        's3_domain',
+        'daemon_domain',
+        'daemon_change_feed',
+        'daemon_change_feed_path',
+
+        'local_mode',
+        'debug_mode',
+        'local_project_mode',
+        'qa_emulation',
+        'no_cache',
+
+        'log_cache_misses',
+        'log_s3_fetches',
+        'log_dropped_duplicates',
+
+        'dedupe_assets',
+        'use_combo_urls',
+        'combo_url_template',
+        'combo_max_url_length',
+
+        'preload_max_assets',
+        'early_hints',
+        'early_hints_environ_key',
+
+        'profile_sample_rate',
+        'profile_threshold_ms',
+        'profile_directory',
+        'profile_max_dumps',
+
+        'adaptive_timeouts',
+        'fetch_timeout_min',
+        'fetch_timeout_max',
+        'fetch_timeout_multiplier',
+        'fetch_timeout_min_samples',
+        'fetch_backoff_base',
+        'fetch_backoff_max',
+
+        'fetch_executor',
+        'fetch_concurrency',
+
+        'scaffold_max_age',
+        'incomplete_scaffold_timeout',
+        'background_scaffold_rebuilds',
+
+        'pointer_index_url',
+        'pointer_index_revalidate_seconds',
+
+        'static_json_cache_max_bytes',
+
+        'trace_sample_rate',
+        'trace_path',
+        'trace_max_bytes',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+        self._validate()
+
+    @classmethod
+    def from_settings(cls):
+        project_directory = get_setting_default('PROJ_DIR', None)
+
+        def project_path(relative_path):
+            if project_directory:
+                return os.path.join(project_directory, relative_path)
+
+        return cls(
+            env=get_setting_default('ENV', None),
+            project_name=get_setting_default('PROJ_NAME', None),
+            project_directory=project_directory,
+            static_conf_path=project_path('static/static_conf.json'),
+            parent_static_conf_path=project_path('../static/static_conf.json'),
+            prebuilt_static_conf_path=project_path('static/prebuilt_recursive_static_conf.json'),
+            frozen_snapshot_path=project_path('static/frozen_at_deploy_version_snapshot.json'),
+            default_bundles=tuple(get_setting_default('DEFAULT_ASSET_BENDER_BUNDLES', get_setting_default('DEFAULT_BUNDLES_V3', []))),
+
+            cdn_domain=get_bender_or_static3_setting('BENDER_CDN_DOMAIN', 'static.hsappstatic.net'),
+            s3_domain=get_bender_or_static3_setting('BENDER_S3_DOMAIN', 'hubspot-static2cdn.s3.amazonaws.com'),
+            daemon_domain=get_bender_or_static3_setting('BENDER_DAEMON_DOMAIN', 'localhost:3333'),
+            daemon_change_feed=get_bender_or_static3_setting('BENDER_DAEMON_CHANGE_FEED', True),
+            daemon_change_feed_path=get_bender_or_static3_setting('BENDER_DAEMON_CHANGE_FEED_PATH', '/changes'),
+
+            local_mode=get_bender_or_static3_setting('BENDER_LOCAL_MODE', None),
+            debug_mode=get_bender_or_static3_setting('BENDER_DEBUG_MODE', None),
+            local_project_mode=get_bender_or_static3_setting('BENDER_LOCAL_PROJECT_MODE', False),
+            qa_emulation=get_bender_or_static3_setting('BENDER_QA_EMULATION', False),
+            no_cache=get_bender_or_static3_setting('BENDER_NO_CACHE', False),
+
+            log_cache_misses=get_bender_or_static3_setting('BENDER_LOG_CACHE_MISSES', True),
+            log_s3_fetches=get_bender_or_static3_setting('BENDER_LOG_S3_FETCHES', True),
+            log_dropped_duplicates=get_bender_or_static3_setting('BENDER_LOG_DROPPED_DUPLICATES', False),
+
+            dedupe_assets=get_bender_or_static3_setting('BENDER_DEDUPE_ASSETS', True),
+            use_combo_urls=get_bender_or_static3_setting('BENDER_USE_COMBO_URLS', False),
+            combo_url_template=get_bender_or_static3_setting('BENDER_COMBO_URL_TEMPLATE', None),
+            combo_max_url_length=get_bender_or_static3_setting('BENDER_COMBO_MAX_URL_LENGTH', DEFAULT_COMBO_MAX_URL_LENGTH),
+
+            preload_max_assets=get_bender_or_static3_setting('BENDER_PRELOAD_MAX_ASSETS', 20),
+            early_hints=get_bender_or_static3_setting('BENDER_EARLY_HINTS', False),
+            early_hints_environ_key=get_bender_or_static3_setting('BENDER_EARLY_HINTS_ENVIRON_KEY', 'wsgi.early_hints'),
+
+            profile_sample_rate=get_bender_or_static3_setting('BENDER_PROFILE_SAMPLE_RATE', 0),
+            profile_threshold_ms=get_bender_or_static3_setting('BENDER_PROFILE_THRESHOLD_MS', 500),
+            profile_directory=get_bender_or_static3_setting('BENDER_PROFILE_DIRECTORY', DEFAULT_PROFILE_DIRECTORY),
+            profile_max_dumps=get_bender_or_static3_setting('BENDER_PROFILE_MAX_DUMPS', 100),
+
+            adaptive_timeouts=get_bender_or_static3_setting('BENDER_ADAPTIVE_TIMEOUTS', True),
+            fetch_timeout_min=get_bender_or_static3_setting('BENDER_FETCH_TIMEOUT_MIN', 0.5),
+            fetch_timeout_max=get_bender_or_static3_setting('BENDER_FETCH_TIMEOUT_MAX', 25),
+            fetch_timeout_multiplier=get_bender_or_static3_setting('BENDER_FETCH_TIMEOUT_MULTIPLIER', 3),
+            fetch_timeout_min_samples=get_bender_or_static3_setting('BENDER_FETCH_TIMEOUT_MIN_SAMPLES', 20),
+            fetch_backoff_base=get_bender_or_static3_setting('BENDER_FETCH_BACKOFF_BASE', 0.05),
+            fetch_backoff_max=get_bender_or_static3_setting('BENDER_FETCH_BACKOFF_MAX', 1),
+
+            fetch_executor=get_bender_or_static3_setting('BENDER_FETCH_EXECUTOR', 'auto'),
+            fetch_concurrency=get_bender_or_static3_setting('BENDER_FETCH_CONCURRENCY', 8),
+
+            scaffold_max_age=get_bender_or_static3_setting('BENDER_SCAFFOLD_MAX_AGE', None),
+            incomplete_scaffold_timeout=get_bender_or_static3_setting('BENDER_INCOMPLETE_SCAFFOLD_TIMEOUT', 30),
+            background_scaffold_rebuilds=get_bender_or_static3_setting('BENDER_BACKGROUND_SCAFFOLD_REBUILDS', True),
+
+            pointer_index_url=get_bender_or_static3_setting('BENDER_POINTER_INDEX_URL', None),
+            pointer_index_revalidate_seconds=get_bender_or_static3_setting('BENDER_POINTER_INDEX_REVALIDATE_SECONDS', 30),
+
+            static_json_cache_max_bytes=get_bender_or_static3_setting('BENDER_STATIC_JSON_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+
+            trace_sample_rate=get_bender_or_static3_setting('BENDER_TRACE_SAMPLE_RATE', 0),
+            trace_path=get_bender_or_static3_setting('BENDER_TRACE_PATH', DEFAULT_TRACE_PATH),
+            trace_max_bytes=get_bender_or_static3_setting('BENDER_TRACE_MAX_BYTES', 50 * 1024 * 1024),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("The Asset Bender config is immutable (tried to set %s)" % name)
+
+    @property
+    def is_prod(self):
+        return self.env == 'prod'
+
+    @property
+    def is_qa(self):
+        return self.env == 'qa'
+
+    @property
+    def is_local(self):
+        return self.env == 'local'
+
+    def _validate(self):
+        for name in ('cdn_domain', 's3_domain', 'daemon_domain'):
+            domain = getattr(self, name)
+
+            if not domain or not isinstance(domain, basestring):
+                raise AssetBenderException("The Asset Bender %s setting must be a non-empty string (got %r)" % (name, domain))
+
+            # The s3 and daemon domains get "http://" prepended to them
+            if name != 'cdn_domain' and '://' in domain:
+                raise AssetBenderException("The Asset Bender %s setting must be a domain without a scheme (got %s)" % (name, domain))
+
+        if self.project_directory is not None and not isinstance(self.project_directory, basestring):
+            raise AssetBenderException("PROJ_DIR must be a path (got %r)" % (self.project_directory,))
+
+        # There's no default, the CDN and S3 don't have a combo handler
+        if self.use_combo_urls and not self.combo_url_template:
+            raise AssetBenderException("BENDER_COMBO_URL_TEMPLATE must be set to the url of your combo handler when BENDER_USE_COMBO_URLS is on")
+
+        if self.combo_url_template is not None and '%(paths)s' not in self.combo_url_template:
+            raise AssetBenderException("BENDER_COMBO_URL_TEMPLATE must include %%(paths)s (got %s)" % self.combo_url_template)
+
+        if not isinstance(self.combo_max_url_length, (int, long)) or self.combo_max_url_length <= 0:
+            raise AssetBenderException("BENDER_COMBO_MAX_URL_LENGTH must be a positive integer (got %r)" % (self.combo_max_url_length,))
+
+        if not isinstance(self.preload_max_assets, (int, long)) or self.preload_max_assets < 0:
+            raise AssetBenderException("BENDER_PRELOAD_MAX_ASSETS must be a non-negative integer (got %r)" % (self.preload_max_assets,))
+
+        if not isinstance(self.profile_sample_rate, (int, long, float)) or not 0 <= self.profile_sample_rate <= 1:
+            raise AssetBenderException("BENDER_PROFILE_SAMPLE_RATE must be a number between 0 and 1 (got %r)" % (self.profile_sample_rate,))
+
+        if self.profile_sample_rate:
+            if not isinstance(self.profile_threshold_ms, (int, long, float)) or self.profile_threshold_ms < 0:
+                raise AssetBenderException("BENDER_PROFILE_THRESHOLD_MS must be a non-negative number (got %r)" % (self.profile_threshold_ms,))
+
+            if not self.profile_directory or not isinstance(self.profile_directory, basestring):
+                raise AssetBenderException("BENDER_PROFILE_DIRECTORY must be a path (got %r)" % (self.profile_directory,))
+
+        if self.adaptive_timeouts:
+            for name in ('fetch_timeout_min', 'fetch_timeout_max', 'fetch_timeout_multiplier', 'fetch_backoff_base', 'fetch_backoff_max'):
+                value = getattr(self, name)
+
+                if not isinstance(value, (int, long, float)) or value < 0:
+                    raise AssetBenderException("BENDER_%s must be a non-negative number (got %r)" % (name.upper(), value))
+
+            if self.fetch_timeout_min > self.fetch_timeout_max:
+                raise AssetBenderException("BENDER_FETCH_TIMEOUT_MIN (%s) can't be more than BENDER_FETCH_TIMEOUT_MAX (%s)" % (self.fetch_timeout_min, self.fetch_timeout_max))
+
+        if self.fetch_executor not in FETCH_EXECUTOR_KINDS:
+            raise AssetBenderException("BENDER_FETCH_EXECUTOR must be one of %s (got %r)" % (', '.join(FETCH_EXECUTOR_KINDS), self.fetch_executor))
+
+        if not isinstance(self.fetch_concurrency, (int, long)) or self.fetch_concurrency < 1:
+            raise AssetBenderException("BENDER_FETCH_CONCURRENCY must be a positive integer (got %r)" % (self.fetch_concurrency,))
+
+        if self.scaffold_max_age is not None and (not isinstance(self.scaffold_max_age, (int, long, float)) or self.scaffold_max_age <= 0):
+            raise AssetBenderException("BENDER_SCAFFOLD_MAX_AGE must be a positive number of seconds or None (got %r)" % (self.scaffold_max_age,))
+
+        if self.incomplete_scaffold_timeout is not None and (not isinstance(self.incomplete_scaffold_timeout, (int, long)) or self.incomplete_scaffold_timeout <= 0):
+            raise AssetBenderException("BENDER_INCOMPLETE_SCAFFOLD_TIMEOUT must be a positive integer (got %r)" % (self.incomplete_scaffold_timeout,))
+
+        if self.pointer_index_url is not None and not isinstance(self.pointer_index_url, basestring):
+            raise AssetBenderException("BENDER_POINTER_INDEX_URL must be a url or path (got %r)" % (self.pointer_index_url,))
+
+        if self.static_json_cache_max_bytes is not None and (not isinstance(self.static_json_cache_max_bytes, (int, long)) or self.static_json_cache_max_bytes <= 0):
+            raise AssetBenderException("BENDER_STATIC_JSON_CACHE_MAX_BYTES must be a positive integer or None (got %r)" % (self.static_json_cache_max_bytes,))
+
+        if self.trace_sample_rate:
+            if not isinstance(self.trace_sample_rate, (int, long, float)) or not 0 <= self.trace_sample_rate <= 1:
+                raise AssetBenderException("BENDER_TRACE_SAMPLE_RATE must be a number between 0 and 1 (got %r)" % (self.trace_sample_rate,))
+
+            if not self.trace_path or not isinstance(self.trace_path, basestring):
+                raise AssetBenderException("BENDER_TRACE_PATH must be a path (got %r)" % (self.trace_path,))
+
+            if not isinstance(self.trace_max_bytes, (int, long)) or self.trace_max_bytes <= 0:
+                raise AssetBenderException("BENDER_TRACE_MAX_BYTES must be a positive integer (got %r)" % (self.trace_max_bytes,))
+
+
+_config = None
+_connected_to_setting_changed = False
+_reset_callbacks = []
+
+def get_config():
+    '''
+    Returns the resolved config, building it from the settings the first time
+    '''
+    global _config
+
+    if _config is None:
+        _connect_to_setting_changed()
+        _config = BenderConfig.from_settings()
+
+    return _config
+
+def reset_config():
+    '''
+    Forces the config to be rebuilt from the settings on next use (and clears the caches
+    registered with `on_config_reset`)
+    '''
+    global _config
+    _config = None
+
+    for callback in _reset_callbacks:
+        callback()
+
+def on_config_reset(callback):
+    '''
+    Registers a function to call whenever the config is reset, for local caches of
+    things derived from it
+    '''
+    _reset_callbacks.append(callback)
+
+
+def _reset_config_on_setting_changed(sender, setting=None, **kwargs):
+    if setting and (setting.startswith('BENDER_') or setting.startswith('STATIC3_') or setting in NON_BENDER_SETTING_NAMES):
+        reset_config()
+
+def _connect_to_setting_changed():
+    '''
+    Rebuild the config when tests change settings (via override_settings)
+    '''
+    global _connected_to_setting_changed
+
+    if _connected_to_setting_changed:
+        return
+
+    try:
+        from django.core.signals import setting_changed
+    except ImportError:
+        try:
+            from django.test.signals import setting_changed
+        except ImportError:
+            setting_changed = None
+
+    if setting_changed is not None:
+        setting_changed.connect(_reset_config_on_setting_changed, dispatch_uid='asset_bender_reset_config')
+
+    _connected_to_setting_changed = True
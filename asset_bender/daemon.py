@@ -0,0 +1,200 @@
+import logging
+import os
+import threading
+import time
+import urllib
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender import http
+
+logger = logging.getLogger(__name__)
+
+
+class DaemonChangeWatcher(object):
+    """
+    A per-process cache of responses from the local Asset Bender daemon, that is invalidated
+    by the daemon's change feed.
+
+    A background thread long-polls the feed:
+
+        GET http://<domain><changes_path>?timeout=<seconds>[&since=<seq>]
+
+    The daemon responds with {"seq": <seq>} as soon as the seq is different than "since" (a
+    file was rebuilt), or after the timeout with the current seq. Whenever the seq changes,
+    everything cached is thrown away.
+
+    Responses are only cached while the feed is working. If the daemon doesn't support it
+    (or goes away) nothing is cached, and every request hits the daemon like before.
+    """
+
+    def __init__(self, domain, changes_path='/changes', poll_timeout=25, retry_delay=5):
+        self.domain = domain
+        self.changes_path = changes_path
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+
+        self.is_healthy = False
+        self.generation = 0
+        self.invalidation_count = 0
+
+        self._cache = {}
+        self._seq = None
+        self._lock = threading.RLock()
+        self._thread = None
+        self._pid = None
+        self._stopped = False
+
+    def ensure_running(self):
+        '''
+        Starts the polling thread if it isn't running in this process (threads
+        don't survive a fork)
+        '''
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+
+            self._mark_unhealthy()
+            self._stopped = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='asset-bender-daemon-watcher')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        self._stopped = True
+
+    def get(self, url):
+        if self.is_healthy:
+            return self._cache.get(url)
+
+    def set(self, url, text, generation):
+        '''
+        Caches the text for url, unless there was a change (or the feed went away) since
+        `generation` was read (right before fetching the url)
+        '''
+        with self._lock:
+            if self.is_healthy and generation == self.generation:
+                self._cache[url] = text
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidation_count += 1
+            self._cache = {}
+
+    def _mark_unhealthy(self):
+        self.is_healthy = False
+        self._seq = None
+        self.invalidate()
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                seq = self._poll()
+            except Exception as e:
+                if self.is_healthy:
+                    logger.info("Lost the Asset Bender daemon's change feed, not caching daemon responses: %s" % e)
+
+                self._mark_unhealthy()
+                time.sleep(self.retry_delay)
+                continue
+
+            if seq != self._seq:
+                self.invalidate()
+                self._seq = seq
+
+            self.is_healthy = True
+
+    def _poll(self):
+        url = "http://%s%s?timeout=%s" % (self.domain, self.changes_path, self.poll_timeout)
+
+        if self._seq is not None:
+            url += "&since=%s" % urllib.quote(str(self._seq))
+
+        result = http._download_url(url, timeout=self.poll_timeout + 5)
+        return json.loads(result.text)['seq']
+
+
+# Daemons (by domain) that responded to a batch request with "not supported"
+_batch_unsupported_domains = set()
+
+BATCH_UNSUPPORTED_STATUS_CODES = (404, 405, 501)
+
+def fetch_batch(domain, host_project_name, bundle_paths, project_names, expanded=False, timeout=25):
+    '''
+    Asks the daemon for the include html of every bundle and the build version of every project
+    in a single round trip:
+
+        POST http://<domain>/batch?from=<host_project_name>
+        {"bundles": [...], "projects": [...], "expanded": true|false}
+
+    Which responds with:
+
+        {"bundles": {"<bundle_path>": "<html>", ...}, "builds": {"<project>": "<build>", ...}}
+
+    Returns that response as a dict, or None if the daemon doesn't support batching (which is
+    remembered for this process) or the request failed. Either way you should fall back on
+    fetching each item individually.
+    '''
+    if domain in _batch_unsupported_domains:
+        return None
+
+    from requests import HTTPError
+
+    url = "http://%s/batch?from=%s" % (domain, urllib.quote(host_project_name or ''))
+    body = json.dumps({
+        'bundles': list(bundle_paths),
+        'projects': list(project_names),
+        'expanded': bool(expanded),
+    })
+
+    try:
+        result = http._download_url(url, timeout=timeout, method='post', data=body,
+                                    headers={'Content-Type': 'application/json'})
+        data = json.loads(result.text)
+    except HTTPError as e:
+        status_code = getattr(e.response, 'status_code', None)
+
+        if status_code in BATCH_UNSUPPORTED_STATUS_CODES:
+            logger.info("The Asset Bender daemon at %s doesn't support batch requests, fetching individually" % domain)
+            _batch_unsupported_domains.add(domain)
+        else:
+            logger.warning("Batch request to the Asset Bender daemon failed, fetching individually: %s" % e)
+
+        return None
+    except Exception as e:
+        logger.warning("Batch request to the Asset Bender daemon failed, fetching individually: %s" % e)
+        return None
+
+    return {
+        'bundles': data.get('bundles') or {},
+        'builds': data.get('builds') or {},
+    }
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+def get_change_watcher(domain, changes_path='/changes'):
+    '''
+    Returns the (running) watcher for the daemon at domain, one per process
+    '''
+    key = (domain, changes_path)
+    watcher = _watchers.get(key)
+
+    if watcher is None:
+        with _watchers_lock:
+            watcher = _watchers.get(key)
+
+            if watcher is None:
+                watcher = _watchers[key] = DaemonChangeWatcher(domain, changes_path)
+
+    watcher.ensure_running()
+    return watcher
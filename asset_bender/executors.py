@@ -0,0 +1,184 @@
+'''
+Executors used to fan out the bulk fetches (the bundles of a scaffold, the version pointers
+of the dependencies). Which one is used depends on BENDER_FETCH_EXECUTOR:
+
+    - "serial": one after the other, like before
+    - "threads": a per-process thread pool
+    - "gevent" / "eventlet": a greenlet pool, for gevent/eventlet workers
+    - "auto" (the default): a greenlet pool if gevent or eventlet monkeypatched the socket
+      module, otherwise a thread pool
+
+BENDER_FETCH_CONCURRENCY (defaults to 8) caps how many fetches run at once. The pools are
+shared by all the threads of the process, so under load the fetches of one request queue behind
+the other requests' (size it for the number of server threads, not for a single request).
+
+With a thread pool, a map from inside the pool (e.g. resolving the versions of the
+dependencies while fetching a bundle) runs serially in the calling pool thread, since
+the pool could deadlock waiting on itself otherwise.
+'''
+import os
+import threading
+
+from asset_bender import AssetBenderException
+from asset_bender.config import get_config, FETCH_EXECUTOR_KINDS
+from asset_bender.profiling import is_profiling
+from asset_bender.tracing import propagate_trace
+
+
+class SerialExecutor(object):
+    def map(self, func, items):
+        '''
+        Returns [func(item) for item in items], in order. Like the other executors, an
+        exception raised by any of the calls is raised from map.
+        '''
+        return [func(item) for item in items]
+
+
+class ThreadPoolExecutor(object):
+    '''
+    Runs the calls in a thread pool (created on first use, and again after a fork). Maps
+    made from inside the pool run serially (in the calling pool thread), so nested maps
+    can't deadlock the pool, but they aren't parallel either.
+    '''
+    def __init__(self, size):
+        self.size = size
+
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def map(self, func, items):
+        items = list(items)
+
+        if len(items) <= 1 or getattr(self._local, 'in_pool', False):
+            return [func(item) for item in items]
+
+        func = propagate_trace(func)
+
+        def run_in_pool(item):
+            self._local.in_pool = True
+
+            try:
+                return func(item)
+            finally:
+                self._local.in_pool = False
+
+        return self._get_pool().map(run_in_pool, items)
+
+    def _get_pool(self):
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    from multiprocessing.pool import ThreadPool
+
+                    self._pool = ThreadPool(self.size)
+                    self._pid = os.getpid()
+
+        return self._pool
+
+
+class GeventExecutor(object):
+    def __init__(self, size):
+        self.size = size
+
+    def map(self, func, items):
+        import gevent.pool
+
+        items = list(items)
+
+        if len(items) <= 1:
+            return [func(item) for item in items]
+
+        return gevent.pool.Pool(self.size).map(propagate_trace(func), items)
+
+
+class EventletExecutor(object):
+    def __init__(self, size):
+        self.size = size
+
+    def map(self, func, items):
+        import eventlet
+
+        items = list(items)
+
+        if len(items) <= 1:
+            return [func(item) for item in items]
+
+        return list(eventlet.GreenPool(self.size).imap(propagate_trace(func), items))
+
+
+_NOT_DETECTED = object()
+_detected_greenlet_library = _NOT_DETECTED
+
+def detect_greenlet_library():
+    '''
+    Returns "gevent" or "eventlet" if either has monkeypatched the socket module, otherwise None
+    (only checked once per process, since patching happens at startup)
+    '''
+    global _detected_greenlet_library
+
+    if _detected_greenlet_library is _NOT_DETECTED:
+        _detected_greenlet_library = _detect_greenlet_library()
+
+    return _detected_greenlet_library
+
+def _detect_greenlet_library():
+    try:
+        from gevent import monkey
+    except ImportError:
+        pass
+    else:
+        if monkey.is_module_patched('socket'):
+            return 'gevent'
+
+    try:
+        from eventlet import patcher
+    except ImportError:
+        pass
+    else:
+        if patcher.is_monkey_patched('socket'):
+            return 'eventlet'
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_executor():
+    '''
+    Returns the executor (shared per process) for the BENDER_FETCH_EXECUTOR and
+    BENDER_FETCH_CONCURRENCY settings. While a profiled call is in progress on this thread
+    it is the serial one, so the profile sees the fetches.
+    '''
+    config = get_config()
+    kind = config.fetch_executor
+
+    if kind == 'auto':
+        kind = detect_greenlet_library() or 'threads'
+
+    if config.fetch_concurrency <= 1 or is_profiling():
+        kind = 'serial'
+
+    key = (kind, config.fetch_concurrency)
+    executor = _executors.get(key)
+
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(key)
+
+            if executor is None:
+                executor = _executors[key] = _build_executor(kind, config.fetch_concurrency)
+
+    return executor
+
+def _build_executor(kind, size):
+    if kind == 'serial':
+        return SerialExecutor()
+    elif kind == 'threads':
+        return ThreadPoolExecutor(size)
+    elif kind == 'gevent':
+        return GeventExecutor(size)
+    elif kind == 'eventlet':
+        return EventletExecutor(size)
+    else:
+        raise AssetBenderException("Unknown BENDER_FETCH_EXECUTOR: %s (must be one of %s)" % (kind, ', '.join(FETCH_EXECUTOR_KINDS)))
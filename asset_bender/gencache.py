@@ -0,0 +1,77 @@
+'''
+Generational caches (from hscacheutils) that can also look up many keys in a batch.
+'''
+from django.utils.encoding import smart_str
+
+from hscacheutils.raw_cache import cache as raw_cache, MAX_MEMCACHE_TIMEOUT
+from hscacheutils.generational_cache import CustomUseGenCache, DummyGenCache, sanitize_memcached_key, \
+                                             build_generation_cache_key, build_generation_cache_key_suffix, \
+                                             new_generation_value
+
+
+class BatchingGenCache(CustomUseGenCache):
+    '''
+    A CustomUseGenCache with `get_many`, which does two memcache round trips (one for all
+    the generations, one for all the values) no matter how many lookups there are.
+    '''
+
+    def get_many(self, kwargs_list):
+        '''
+        Takes a list of the kwargs you would pass to `get` and returns a list of the
+        values (None for misses) in the same order
+        '''
+        kwargs_list = [dict(kwargs) for kwargs in kwargs_list]
+
+        if not kwargs_list:
+            return []
+
+        for kwargs in kwargs_list:
+            self._adjust_kwargs(kwargs)
+
+        suffixes_list = [[build_generation_cache_key_suffix(generation, **kwargs) for generation in self.generation_names]
+                         for kwargs in kwargs_list]
+
+        generation_values = self._get_or_create_generation_values(set([suffix for suffixes in suffixes_list for suffix in suffixes]))
+
+        keys = []
+
+        for kwargs, suffixes in zip(kwargs_list, suffixes_list):
+            # Built exactly like GenerationalCache.build_key (which joins a dict of the
+            # generation values, so it's created the same way to get the same ordering)
+            values_by_suffix = dict([(suffix, generation_values[suffix]) for suffix in suffixes])
+            generation_parts = ["%s:%s" % (suffix, value) for suffix, value in values_by_suffix.items()]
+            keys.append(sanitize_memcached_key(','.join(generation_parts + _add_to_key_parts(kwargs.get('add_to_key')))))
+
+        values = raw_cache.get_many(keys)
+        return [values.get(key) for key in keys]
+
+    def _get_or_create_generation_values(self, suffixes):
+        '''
+        Like hscacheutils' multi_generation_values, but for the generations of many lookups
+        '''
+        key_by_suffix = dict([(suffix, build_generation_cache_key(suffix)) for suffix in suffixes])
+        values = raw_cache.get_many(key_by_suffix.values())
+        newly_initialized = {}
+
+        for key in key_by_suffix.values():
+            if values.get(key) is None:
+                values[key] = newly_initialized[key] = new_generation_value()
+
+        if newly_initialized:
+            raw_cache.set_many(newly_initialized, MAX_MEMCACHE_TIMEOUT)
+
+        return dict([(suffix, values[key]) for suffix, key in key_by_suffix.items()])
+
+
+class DummyBatchingGenCache(DummyGenCache):
+    def get_many(self, kwargs_list):
+        return [None] * len(kwargs_list)
+
+
+def _add_to_key_parts(add_to_key):
+    if add_to_key is None:
+        return []
+    elif isinstance(add_to_key, tuple):
+        return [smart_str(part) for part in add_to_key]
+    else:
+        return [smart_str(add_to_key)]
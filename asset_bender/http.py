@@ -1,8 +1,12 @@
 import logging
-import requests
-from requests import ConnectionError, HTTPError, Timeout
+import time
+import urlparse
 
 from asset_bender import AssetBenderException
+from asset_bender.config import get_config
+from asset_bender.latency import DEFAULT_TIMEOUT_LADDERS, FIXED_TIMEOUT_REQUEST_TYPES, backoff_delay, get_tracker
+from asset_bender.metrics import registry, status_class
+from asset_bender.tracing import trace_event
 
 logger = logging.getLogger(__name__)
 
@@ -12,22 +16,49 @@ class FauxException(Exception):
     pass
 
 
-def _download_url(url, timeout=10, **kwargs):
-    result = requests.get(url, timeout=timeout, **kwargs)
+def fetch_errors():
+    '''
+    The requests exceptions a fetch can fail with. requests is only imported on first use,
+    since it's most of the time it takes to import asset_bender.
+    '''
+    import requests
+    return (requests.ConnectionError, requests.HTTPError, requests.Timeout)
+
+def _download_url(url, timeout=10, method='get', **kwargs):
+    import requests
+
+    result = requests.request(method, url, timeout=timeout, **kwargs)
     result.raise_for_status()
 
     return result
 
-def fetch_ab_url_with_retries(url, retries=None, timeouts=None, **kwargs):
+def fetch_ab_url_with_retries(url, retries=None, timeouts=None, request_type='other', **kwargs):
     """
     Calls download_url retries number of times unless a valid response is returned earlier. 
     Each retry will have a timeout of timeouts[i - 1] where i is the attempt number.
 
     If you omit retries, it will be set to len(timeouts).
+
+    request_type (eg. "pointer", "bundle" or "daemon") labels the fetch metrics. If you omit the
+    timeouts for one of the DEFAULT_TIMEOUT_LADDERS request types, they are derived from the latency
+    observed for that host and request type (see asset_bender.latency), with a jittered backoff
+    between attempts. The daemon request types (FIXED_TIMEOUT_REQUEST_TYPES) always use their ladder.
     """
 
     attempt = 1
     latest_result = None
+    host = urlparse.urlparse(url).netloc or 'unknown'
+    tracker = get_tracker(host, request_type)
+    config = None
+
+    if timeouts is None and request_type in DEFAULT_TIMEOUT_LADDERS:
+        config = get_config()
+
+        if config.adaptive_timeouts and request_type not in FIXED_TIMEOUT_REQUEST_TYPES:
+            timeouts = tracker.timeouts(DEFAULT_TIMEOUT_LADDERS[request_type], config)
+        else:
+            timeouts = list(DEFAULT_TIMEOUT_LADDERS[request_type])
+            config = None
 
     if retries is None and timeouts is None:
         retries = 1
@@ -38,11 +69,34 @@ def fetch_ab_url_with_retries(url, retries=None, timeouts=None, **kwargs):
     while attempt <= retries:
         timeout = timeouts[min(len(timeouts), attempt) - 1] 
 
+        start = time.time()
+
         try:
             latest_result = _download_url(url, timeout=timeout, **kwargs)
+            elapsed = time.time() - start
+            tracker.observe(elapsed)
+            registry.observe('asset_bender_fetch_seconds', elapsed, host=host, type=request_type)
+            trace_event('fetch', url, request_type, latest_result.status_code, round(elapsed, 5),
+                        latest_result.text if request_type == 'pointer' else None)
             return latest_result
 
-        except (ConnectionError, HTTPError, Timeout, FauxException) as e:
+        except fetch_errors() + (FauxException,) as e:
+            elapsed = time.time() - start
+            registry.observe('asset_bender_fetch_seconds', elapsed, host=host, type=request_type)
+            registry.inc('asset_bender_fetch_errors_total', host=host, type=request_type, status_class=status_class(e))
+            trace_event('fetch', url, request_type, getattr(getattr(e, 'response', None), 'status_code', None) or status_class(e),
+                        round(elapsed, 5), None)
+
+            # A timeout says the latency is at least that long
+            if isinstance(e, fetch_errors()[2]):
+                tracker.observe(max(elapsed, timeout or 0))
+
+            if attempt < retries:
+                registry.inc('asset_bender_fetch_retries_total', host=host, type=request_type)
+
+                if config is not None:
+                    time.sleep(backoff_delay(attempt, config))
+
             status_code = getattr(latest_result, 'status_code', None)
 
             # Warn an continue if there are retries
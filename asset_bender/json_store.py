@@ -0,0 +1,137 @@
+'''
+The store behind `load_static_json_content` on QA/prod: the precompiled JSON files the
+build placed in the python egg, parsed and kept in local memory.
+
+Entries are keyed by the path of the file that was read, and reloaded if its mtime changes.
+The least recently used ones are evicted once their total size is over
+BENDER_STATIC_JSON_CACHE_MAX_BYTES (32MB by default, None for no limit). The size is the
+size of the file, the parsed objects take a few times that.
+'''
+import os
+import stat
+import threading
+from collections import OrderedDict
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender.config import get_config
+from asset_bender.metrics import record_cache_lookup
+
+
+# What an entry costs on top of its file
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class StaticJsonStore(object):
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, paths):
+        '''
+        Returns the parsed contents of the first of paths that exists (or {} if none of them do),
+        loading it the first time it is read or after it changed
+        '''
+        path, mtime = self._find_file(paths)
+
+        if path is None:
+            record_cache_lookup('static_json_store', False)
+            return {}
+
+        with self._lock:
+            entry = self._entries.pop(path, None)
+
+            if entry is not None and entry[0] == mtime:
+                self._entries[path] = entry
+                self.hits += 1
+            elif entry is not None:
+                self.current_bytes -= entry[2]
+                entry = None
+
+        record_cache_lookup('static_json_store', entry is not None)
+
+        if entry is None:
+            with open(path, 'r') as f:
+                entry = (mtime, json.load(f), os.path.getsize(path) + ENTRY_OVERHEAD_BYTES)
+
+            with self._lock:
+                self.misses += 1
+                self._add(path, entry)
+
+        return entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            for path in self._entries.keys():
+                self._remove(path)
+
+    def _find_file(self, paths):
+        '''
+        The first of paths that exists and its mtime, or (None, None)
+        '''
+        for path in paths:
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+
+            if stat.S_ISREG(file_stat.st_mode):
+                return path, file_stat.st_mtime
+
+        return None, None
+
+    def _add(self, path, entry):
+        # Another thread might have loaded it in the meantime
+        if path in self._entries:
+            self._remove(path)
+
+        self._entries[path] = entry
+        self.current_bytes += entry[2]
+
+        # Evict the least recently used (but always keep the newest entry)
+        while self.max_bytes is not None and self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, path):
+        mtime, value, size = self._entries.pop(path)
+        self.current_bytes -= size
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_static_json_store():
+    '''
+    Returns the store (shared per process) for the BENDER_STATIC_JSON_CACHE_MAX_BYTES setting
+    '''
+    max_bytes = get_config().static_json_cache_max_bytes
+    store = _stores.get(max_bytes)
+
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(max_bytes, StaticJsonStore(max_bytes))
+
+    return store
@@ -0,0 +1,133 @@
+'''
+Tracks the observed latency of fetches (per host and request type) and derives the
+timeouts of fetch_ab_url_with_retries from it.
+'''
+import random
+import threading
+from collections import deque
+
+
+# Used (per request type) until enough latencies have been observed
+DEFAULT_TIMEOUT_LADDERS = {
+    'pointer': (1, 2, 5),
+    'bundle': (1, 2, 5),
+    'daemon': (1, 2, 5),
+
+    # The daemon compiles on demand, which can be slow
+    'daemon_bundle': (1, 5, 25),
+
+    'combo': (1, 2, 5),
+}
+
+# Always use their default ladder. A daemon that answers quickly from its cache can still take
+# seconds when it has to compile a bundle, so its observed latency says little about the next fetch.
+FIXED_TIMEOUT_REQUEST_TYPES = ('daemon', 'daemon_bundle')
+
+EWMA_ALPHA = 0.2
+
+# How many of the most recent latencies the percentiles are computed from
+SAMPLE_WINDOW = 256
+
+# The percentiles are only recomputed after this many new samples
+RECOMPUTE_EVERY = 16
+
+
+class LatencyTracker(object):
+    """
+    An EWMA and a window of recent samples (for percentiles) of the latency of one host
+    and request type
+    """
+
+    def __init__(self):
+        self.ewma = None
+        self.count = 0
+
+        self._samples = deque(maxlen=SAMPLE_WINDOW)
+        self._percentiles = None
+        self._samples_since_recompute = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.ewma = seconds if self.ewma is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+            self.count += 1
+            self._samples.append(seconds)
+            self._samples_since_recompute += 1
+
+            # React to a slow down right away
+            if self._percentiles is not None and seconds > self._percentiles[2]:
+                self._percentiles = None
+
+    def percentiles(self):
+        '''
+        Returns (p50, p95, p99) of the recent samples, or None if there aren't any
+        '''
+        with self._lock:
+            if not self._samples:
+                return None
+
+            if self._percentiles is None or self._samples_since_recompute >= RECOMPUTE_EVERY:
+                samples = sorted(self._samples)
+                self._percentiles = tuple([samples[min(len(samples) - 1, int(fraction * len(samples)))] for fraction in (0.5, 0.95, 0.99)])
+                self._samples_since_recompute = 0
+
+            return self._percentiles
+
+    def timeouts(self, default_ladder, config):
+        '''
+        The timeout of each attempt: a multiple of the p99 latency (or the EWMA, if that
+        is higher), doubling with every attempt, within the configured bounds. Falls back
+        to default_ladder until enough samples were observed.
+        '''
+        if self.count < config.fetch_timeout_min_samples:
+            return list(default_ladder)
+
+        p50, p95, p99 = self.percentiles()
+        first_timeout = max(max(p99, self.ewma) * config.fetch_timeout_multiplier, config.fetch_timeout_min)
+
+        return [min(first_timeout * (2 ** attempt), config.fetch_timeout_max) for attempt in range(len(default_ladder))]
+
+    def stats(self, default_ladder, config, adaptive=True):
+        percentiles = self.percentiles() or (None, None, None)
+
+        return {
+            'count': self.count,
+            'ewma': self.ewma,
+            'p50': percentiles[0],
+            'p95': percentiles[1],
+            'p99': percentiles[2],
+            'timeouts': self.timeouts(default_ladder, config) if adaptive else list(default_ladder),
+        }
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def get_tracker(host, request_type):
+    key = (host, request_type)
+    tracker = _trackers.get(key)
+
+    if tracker is None:
+        with _trackers_lock:
+            tracker = _trackers.setdefault(key, LatencyTracker())
+
+    return tracker
+
+def get_latency_stats(config):
+    '''
+    Returns the learned state, a dict of (host, request type) -> a dict of the count, EWMA,
+    percentiles and the current timeouts
+    '''
+    return dict([(key, tracker.stats(DEFAULT_TIMEOUT_LADDERS.get(key[1], (None,)), config,
+                                     adaptive=key[1] not in FIXED_TIMEOUT_REQUEST_TYPES))
+                 for key, tracker in _trackers.items()])
+
+def reset_latency_stats():
+    with _trackers_lock:
+        _trackers.clear()
+
+def backoff_delay(attempt, config):
+    '''
+    "Full jitter" exponential backoff before the attempt after `attempt`
+    '''
+    return random.uniform(0, min(config.fetch_backoff_max, config.fetch_backoff_base * (2 ** (attempt - 1))))
@@ -0,0 +1,225 @@
+'''
+An in-process metrics registry for Asset Bender (fetch latencies, retries and errors, cache
+hits and misses, and scaffold builds), that can be rendered in the Prometheus text format
+(see `asset_bender.views.metrics_handler`).
+
+Recording is lock free: every thread writes to its own shard, and the shards are only merged
+when the metrics are read.
+'''
+import threading
+from bisect import bisect_left
+
+from asset_bender.tracing import trace_event
+
+
+# In seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# In bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+
+# The shards of dead threads are folded together every this many new shards (and on every
+# snapshot), so thread per request servers don't pile them up when nothing reads the metrics
+RETIRE_DEAD_SHARDS_EVERY = 64
+
+
+class MetricsRegistry(object):
+    """
+    Counters and histograms, each identified by a name and a (small) dict of labels.
+    Metrics need to be declared (with `counter` or `histogram`) before they are recorded.
+    """
+
+    def __init__(self):
+        self._declarations = {}
+        self._shards = []
+        self._retired_shard = {}
+        self._shards_created = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        self._declarations[name] = (COUNTER, help_text, None)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._declarations[name] = (HISTOGRAM, help_text, tuple(buckets))
+
+    def inc(self, name, amount=1, **labels):
+        shard = self._get_shard()
+        key = (name, tuple(sorted(labels.items())))
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = self._declarations[name][2]
+        shard = self._get_shard()
+        key = (name, tuple(sorted(labels.items())))
+        values = shard.get(key)
+
+        # One count per bucket, then the sum and the count
+        if values is None:
+            values = shard[key] = [0] * (len(buckets) + 2)
+
+        index = bisect_left(buckets, value)
+
+        if index < len(buckets):
+            values[index] += 1
+
+        values[-2] += value
+        values[-1] += 1
+
+    def snapshot(self):
+        '''
+        Returns a dict of (name, labels) -> value for counters, or -> [bucket counts..., sum, count]
+        (not cumulative) for histograms, merged across all the threads
+        '''
+        with self._lock:
+            self._retire_dead_shards()
+            merged = {}
+
+            for shard in [self._retired_shard] + [shard for thread, shard in self._shards]:
+                _merge_shard(merged, shard)
+
+        return merged
+
+    def get(self, name, **labels):
+        return self.snapshot().get((name, tuple(sorted(labels.items()))))
+
+    def reset(self):
+        with self._lock:
+            for thread, shard in self._shards:
+                shard.clear()
+
+            self._retired_shard = {}
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+
+        for name in sorted(self._declarations):
+            kind, help_text, buckets = self._declarations[name]
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s %s" % (name, kind))
+
+            for (metric_name, labels), value in sorted(snapshot.items()):
+                if metric_name != name:
+                    continue
+
+                if kind == COUNTER:
+                    lines.append("%s%s %s" % (name, _format_labels(labels), _format_number(value)))
+                else:
+                    cumulative = 0
+
+                    for upper_bound, count in zip(buckets, value):
+                        cumulative += count
+                        lines.append("%s_bucket%s %s" % (name, _format_labels(labels + (('le', _format_number(upper_bound)),)), cumulative))
+
+                    lines.append("%s_bucket%s %s" % (name, _format_labels(labels + (('le', '+Inf'),)), value[-1]))
+                    lines.append("%s_sum%s %s" % (name, _format_labels(labels), _format_number(value[-2])))
+                    lines.append("%s_count%s %s" % (name, _format_labels(labels), value[-1]))
+
+        return '\n'.join(lines) + '\n'
+
+    def _get_shard(self):
+        shard = getattr(self._local, 'shard', None)
+
+        if shard is None:
+            shard = self._local.shard = {}
+
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+                self._shards_created += 1
+
+                if self._shards_created % RETIRE_DEAD_SHARDS_EVERY == 0:
+                    self._retire_dead_shards()
+
+        return shard
+
+    def _retire_dead_shards(self):
+        '''
+        Folds the shards of threads that are gone into one (so they don't pile up). Call
+        it with the lock held.
+        '''
+        live_shards = []
+
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live_shards.append((thread, shard))
+            else:
+                _merge_shard(self._retired_shard, shard)
+
+        self._shards = live_shards
+
+
+def _merge_shard(merged, shard):
+    # Copying the dict is atomic, so it's safe while the owning thread keeps writing to it
+    for key, value in shard.copy().items():
+        if isinstance(value, list):
+            existing = merged.get(key)
+
+            if existing is None:
+                merged[key] = list(value)
+            else:
+                merged[key] = [a + b for a, b in zip(existing, value)]
+        else:
+            merged[key] = merged.get(key, 0) + value
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+
+    return '{%s}' % ','.join(['%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                              for name, value in labels])
+
+def _format_number(value):
+    if isinstance(value, float):
+        return repr(value)
+
+    return str(value)
+
+def status_class(exception):
+    '''
+    Buckets a fetch exception into "4xx", "5xx", "timeout", "connection" or "other"
+    '''
+    response = getattr(exception, 'response', None)
+    status_code = getattr(response, 'status_code', None)
+
+    if status_code:
+        return "%sxx" % (status_code / 100)
+
+    name = type(exception).__name__
+
+    if 'Timeout' in name:
+        return 'timeout'
+    elif 'Connection' in name:
+        return 'connection'
+    else:
+        return 'other'
+
+
+registry = MetricsRegistry()
+
+registry.histogram('asset_bender_fetch_seconds', "Time spent fetching from the Asset Bender origin or daemon, by host and type")
+registry.counter('asset_bender_fetch_retries_total', "Fetches that were retried, by host and type")
+registry.counter('asset_bender_fetch_errors_total', "Failed fetch attempts, by host, type and status class")
+registry.counter('asset_bender_cache_requests_total', "Cache lookups, by cache and result (hit or miss)")
+registry.histogram('asset_bender_scaffold_build_seconds', "Time spent building scaffolds (on a cache miss)")
+registry.counter('asset_bender_stale_scaffolds_served_total', "Incomplete, expired or previous scaffolds that were served, by reason")
+registry.histogram('asset_bender_scaffold_bytes', "Size of the html of built scaffolds", buckets=SIZE_BUCKETS)
+
+
+def record_cache_lookup(cache_name, value):
+    registry.inc('asset_bender_cache_requests_total', cache=cache_name, result='hit' if value else 'miss')
+    trace_event('cache', cache_name, int(bool(value)))
+
+def cache_hit_ratio(cache_name):
+    '''
+    The hit ratio of a cache (since the process started), or None if it hasn't been used
+    '''
+    snapshot = registry.snapshot()
+    hits = snapshot.get(('asset_bender_cache_requests_total', (('cache', cache_name), ('result', 'hit'))), 0)
+    misses = snapshot.get(('asset_bender_cache_requests_total', (('cache', cache_name), ('result', 'miss'))), 0)
+
+    if hits + misses:
+        return float(hits) / (hits + misses)
@@ -0,0 +1,141 @@
+import logging
+
+from asset_bender.bundling import BENDER_ASSETS_REQUEST_ATTRIBUTE
+from asset_bender.config import get_config
+from asset_bender.tracing import begin_request, finish_trace
+
+logger = logging.getLogger(__name__)
+
+EARLY_HINTS_SENT_ATTRIBUTE = '_bender_early_hints_sent'
+PRELOAD_HEADERS_ADDED_ATTRIBUTE = '_bender_preloaded'
+
+
+def build_preload_link_headers(bender_assets, max_assets=None):
+    '''
+    Builds the values of the Link headers for a BenderAssets instance. A preconnect for
+    the static domain and a preload for each of the head css and head js files.
+    '''
+    if max_assets is None:
+        max_assets = get_config().preload_max_assets
+
+    links = []
+    prefixed_domain = bender_assets.get_prefixed_domain()
+
+    if prefixed_domain:
+        links.append('<%s>; rel=preconnect' % prefixed_domain)
+
+    scaffold = bender_assets.generate_scaffold()
+
+    for url, as_type in scaffold.head_preload_urls()[:max_assets]:
+        links.append('<%s>; rel=preload; as=%s' % (url, as_type))
+
+    return links
+
+def add_preload_headers(response, bender_assets):
+    '''
+    Adds (or appends to) the Link header of the response with preload/preconnect hints
+    for the critical head assets. The response is marked so they aren't added twice.
+    '''
+    links = build_preload_link_headers(bender_assets)
+    setattr(response, PRELOAD_HEADERS_ADDED_ATTRIBUTE, True)
+
+    if not links:
+        return response
+
+    if response.has_header('Link'):
+        links.insert(0, response['Link'])
+
+    response['Link'] = ', '.join(links)
+    return response
+
+def send_early_hints(request, bender_assets):
+    '''
+    Sends a "103 Early Hints" response with the preload headers if the server supports it.
+
+    There isn't a WSGI standard for early hints, so this looks for a callable in the request's
+    environ (under BENDER_EARLY_HINTS_ENVIRON_KEY) that takes a list of (header, value) tuples.
+    Returns True if the hints were sent.
+    '''
+    config = get_config()
+
+    if not config.early_hints:
+        return False
+
+    if getattr(request, EARLY_HINTS_SENT_ATTRIBUTE, False):
+        return False
+
+    send_hints = request.META.get(config.early_hints_environ_key)
+
+    if not hasattr(send_hints, '__call__'):
+        return False
+
+    try:
+        send_hints([('Link', link) for link in build_preload_link_headers(bender_assets)])
+    except Exception as e:
+        logger.warning("Couldn't send early hints: %s" % e)
+        return False
+
+    setattr(request, EARLY_HINTS_SENT_ATTRIBUTE, True)
+    return True
+
+
+class PreloadHeadersMiddleware(object):
+    '''
+    Adds Link preload headers for the head css/js of the scaffold (and a preconnect
+    for the static domain) to html responses.
+
+    Relies on the BenderAssets instance being set on the request, either by `build_scaffold`
+    or by your context processor:
+
+        request.bender_assets = bender_assets
+
+    Streamed responses are skipped, `streaming_bender_response` adds the headers itself.
+    '''
+
+    def process_response(self, request, response):
+        bender_assets = getattr(request, BENDER_ASSETS_REQUEST_ATTRIBUTE, None)
+
+        # Streamed responses from streaming_bender_response already have them (and are
+        # marked, which on Django < 1.5 is the only way to tell)
+        if not bender_assets or getattr(response, 'streaming', False) or getattr(response, PRELOAD_HEADERS_ADDED_ATTRIBUTE, False):
+            return response
+
+        if response.status_code != 200 or not response.get('Content-Type', '').startswith('text/html'):
+            return response
+
+        try:
+            add_preload_headers(response, bender_assets)
+        except Exception as e:
+            logger.warning("Couldn't add Asset Bender preload headers: %s" % e)
+
+        return response
+
+
+class TraceMiddleware(object):
+    '''
+    Writes the Asset Bender trace of the request (if it was sampled, see BENDER_TRACE_SAMPLE_RATE)
+    once the response is ready, or for streamed responses once the body was sent. Without it, a
+    thread's trace is written when it starts the next one (and every BenderAssets starts its own).
+    '''
+
+    def process_request(self, request):
+        begin_request()
+
+    def process_response(self, request, response):
+        if getattr(response, 'streaming', False):
+            response.streaming_content = _finish_trace_when_done(response.streaming_content)
+        else:
+            finish_trace()
+
+        return response
+
+def _finish_trace_when_done(chunks):
+    '''
+    Yields the chunks of a streamed body, then finishes the trace (also when the response is
+    closed part way, the server closes it along with this generator)
+    '''
+    try:
+        for chunk in chunks:
+            yield chunk
+    finally:
+        finish_trace()
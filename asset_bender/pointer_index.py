@@ -0,0 +1,159 @@
+'''
+An optional consolidated index of version pointers, so resolving the dependencies doesn't
+take one origin request per project. It's a single JSON object mapping project -> pointer
+file name -> build:
+
+    {
+        "jquery": {"current": "static-1.2", "current-qa": "static-1.3", "latest-version-1": "static-1.2"},
+        "style_guide": {"current": "static-3.40", "edge-qa": "static-3.41"}
+    }
+
+Set BENDER_POINTER_INDEX_URL to where it lives (an http(s) url, or a local path/file:// url).
+It is fetched once and revalidated (with If-None-Match/If-Modified-Since) at most every
+BENDER_POINTER_INDEX_REVALIDATE_SECONDS. Projects or pointers that aren't in it are
+fetched individually, like before.
+'''
+import logging
+import os
+import threading
+import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender import http
+
+logger = logging.getLogger(__name__)
+
+
+class PointerIndex(object):
+
+    def __init__(self, url, revalidate_seconds=30, timeout=2):
+        self.url = url
+        self.revalidate_seconds = revalidate_seconds
+        self.timeout = timeout
+
+        self.index = {}
+        self.checked_at = None
+        self.loaded_at = None
+        self.revalidation_count = 0
+        self.not_modified_count = 0
+
+        self._etag = None
+        self._last_modified = None
+        self._lock = threading.Lock()
+
+    def lookup(self, project_name, pointer_file_name):
+        '''
+        Returns the build the pointer points at, or None if the index doesn't know it
+        '''
+        self.refresh_if_needed()
+        return self.index.get(project_name, {}).get(pointer_file_name)
+
+    def refresh_if_needed(self):
+        '''
+        (Re)validates the index if it's been long enough. Only one thread does it at a time,
+        the others keep using the current index in the meantime (unless it was never loaded).
+        '''
+        if self.checked_at is not None and time.time() - self.checked_at < self.revalidate_seconds:
+            return
+
+        if not self._lock.acquire(self.checked_at is None):
+            return
+
+        try:
+            if self.checked_at is None or time.time() - self.checked_at >= self.revalidate_seconds:
+                self._refresh()
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        self.revalidation_count += 1
+
+        try:
+            if self._is_local():
+                index = self._load_local()
+            else:
+                index = self._load_remote()
+        except Exception as e:
+            # Keep using what we had (or nothing), everything not in it is fetched individually
+            logger.warning("Couldn't load the Asset Bender pointer index from %s: %s" % (self.url, e))
+            index = None
+
+        if index is None:
+            self.not_modified_count += 1
+        else:
+            self.index = index
+            self.loaded_at = time.time()
+
+        self.checked_at = time.time()
+
+    def _is_local(self):
+        return self.url.startswith('file://') or self.url.startswith('/')
+
+    def _load_local(self):
+        '''
+        Returns the parsed index, or None if it hasn't changed (by mtime)
+        '''
+        path = self.url[len('file://'):] if self.url.startswith('file://') else self.url
+        modified_at = os.path.getmtime(path)
+
+        if self.loaded_at is not None and modified_at == self._last_modified:
+            return None
+
+        with open(path, 'r') as f:
+            index = _parse_index(f.read())
+
+        self._last_modified = modified_at
+        return index
+
+    def _load_remote(self):
+        '''
+        Returns the parsed index, or None if it hasn't changed (a 304)
+        '''
+        headers = {}
+
+        if self.loaded_at is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+
+        result = http._download_url(self.url, timeout=self.timeout, headers=headers)
+
+        if result.status_code == 304:
+            return None
+
+        index = _parse_index(result.text)
+        self._etag = result.headers.get('ETag')
+        self._last_modified = result.headers.get('Last-Modified')
+        return index
+
+
+def _parse_index(text):
+    data = json.loads(text)
+
+    if not isinstance(data, dict):
+        raise ValueError("The pointer index must be a JSON object")
+
+    return dict([(project_name, pointers) for project_name, pointers in data.items() if isinstance(pointers, dict)])
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_pointer_index(url, revalidate_seconds=30):
+    '''
+    Returns the (per process) index for url
+    '''
+    key = (url, revalidate_seconds)
+    index = _indexes.get(key)
+
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(key, PointerIndex(url, revalidate_seconds))
+
+    return index
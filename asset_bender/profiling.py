@@ -0,0 +1,125 @@
+'''
+An opt-in profiling hook for the slow paths (building scaffolds and resolving versions).
+
+A fraction of calls (BENDER_PROFILE_SAMPLE_RATE) are run under cProfile, and when one takes
+longer than BENDER_PROFILE_THRESHOLD_MS the profile is saved to BENDER_PROFILE_DIRECTORY:
+
+    <name>-<timestamp>-<pid>-<n>.prof   (load it with pstats or snakeviz)
+    <name>-<timestamp>-<pid>-<n>.json   (how long it took, the bundles, the resolved versions, ...)
+
+cProfile only sees the thread it runs on, so the fetches of a profiled call run serially on
+that thread (see asset_bender.executors.get_executor) and show up in the profile. Its timings
+include what would otherwise have run in parallel.
+
+When the sample rate is 0 (the default) the only overhead is a config lookup.
+'''
+import cProfile
+import functools
+import logging
+import os
+import random
+import threading
+import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender.config import get_config
+
+logger = logging.getLogger(__name__)
+
+
+_local = threading.local()
+_dump_count = [0]
+_dump_lock = threading.Lock()
+
+
+def profiled(name, describe=None):
+    '''
+    Decorator that profiles a sample of calls to the wrapped method. `describe` is called with
+    (self, args, result) after the call and should return a dict of extra info to save with
+    the profile (the bundles, resolved versions, etc).
+
+    Calls made while another profiled call is in progress (on the same thread) are part
+    of the outer profile.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            sample_rate = get_config().profile_sample_rate
+
+            if not sample_rate or is_profiling() or random.random() >= sample_rate:
+                return func(self, *args, **kwargs)
+
+            return _call_with_profile(name, describe, func, self, args, kwargs)
+
+        return wrapper
+    return decorator
+
+def is_profiling():
+    '''
+    Whether a profiled call is in progress on this thread
+    '''
+    return getattr(_local, 'active', False)
+
+def _call_with_profile(name, describe, func, self, args, kwargs):
+    profile = cProfile.Profile()
+    result = None
+    _local.active = True
+    start = time.time()
+
+    try:
+        result = profile.runcall(func, self, *args, **kwargs)
+        return result
+    finally:
+        elapsed_ms = (time.time() - start) * 1000
+        _local.active = False
+
+        config = get_config()
+
+        if elapsed_ms >= config.profile_threshold_ms:
+            _save_profile(name, profile, elapsed_ms, describe, self, args, result, config)
+
+def _save_profile(name, profile, elapsed_ms, describe, instance, args, result, config):
+    '''
+    Never raises, a failed dump shouldn't break the request
+    '''
+    with _dump_lock:
+        if _dump_count[0] >= config.profile_max_dumps:
+            return
+
+        _dump_count[0] += 1
+        dump_number = _dump_count[0]
+
+    try:
+        details = {
+            'name': name,
+            'elapsed_ms': elapsed_ms,
+            'threshold_ms': config.profile_threshold_ms,
+            'timestamp': time.time(),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+        }
+
+        if describe:
+            details.update(describe(instance, args, result))
+
+        if not os.path.isdir(config.profile_directory):
+            os.makedirs(config.profile_directory)
+
+        base_path = os.path.join(config.profile_directory, "%s-%s-%s-%s" % (
+            name, time.strftime('%Y%m%d%H%M%S'), os.getpid(), dump_number))
+
+        profile.dump_stats(base_path + '.prof')
+
+        with open(base_path + '.json', 'w') as f:
+            json.dump(details, f, indent=2, sort_keys=True, default=str)
+
+        logger.warning("Asset Bender %s took %.1fms, saved a profile to: %s.prof" % (name, elapsed_ms, base_path))
+    except Exception as e:
+        logger.warning("Couldn't save the Asset Bender profile for %s: %s" % (name, e))
+
+def reset_dump_count():
+    _dump_count[0] = 0
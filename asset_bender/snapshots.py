@@ -0,0 +1,167 @@
+'''
+The dependency version snapshot taken on QA at deploy time (and frozen for prod in
+frozen_at_deploy_version_snapshot.json), plus what changed compared to the currently
+frozen snapshot and to prebuilt_recursive_static_conf.json.
+
+The versions are resolved like a request resolves them: everything that is cached is
+looked up in one memcache batch, and the rest of the pointers are fetched in parallel.
+'''
+import os
+import time
+from collections import namedtuple
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender.config import get_config
+from asset_bender.versions import BuildVersion
+
+
+ADDED = 'added'
+REMOVED = 'removed'
+UPGRADED = 'upgraded'
+DOWNGRADED = 'downgraded'
+CHANGED = 'changed'
+
+
+class SnapshotChange(namedtuple('SnapshotChange', 'project_name change frozen prebuilt resolved')):
+    '''
+    A project whose resolved version isn't the one in the frozen snapshot. `change` is one
+    of "added", "removed", "upgraded", "downgraded" or "changed" (if the builds can't be compared)
+    '''
+    __slots__ = ()
+
+    def as_dict(self):
+        return dict(zip(self._fields, self))
+
+    def format(self):
+        line = "%s: %s -> %s (%s" % (self.project_name, self.frozen or '-', self.resolved or '-', self.change)
+
+        if self.prebuilt and self.prebuilt != self.resolved:
+            line += ", prebuilt %s" % self.prebuilt
+
+        return line + ")"
+
+
+class DependencySnapshot(object):
+    def __init__(self, versions, frozen_versions, prebuilt_versions, seconds=None):
+        self.versions = versions
+        self.frozen_versions = frozen_versions
+        self.prebuilt_versions = prebuilt_versions
+        self.seconds = seconds
+        self.changes = diff_dependency_versions(versions, frozen_versions, prebuilt_versions)
+
+    @property
+    def has_changes(self):
+        return bool(self.changes)
+
+    def as_dict(self):
+        return {
+            'versions': self.versions,
+            'changes': [change.as_dict() for change in self.changes],
+            'unchanged': len(set(self.versions) | set(self.frozen_versions)) - len(self.changes),
+            'seconds': self.seconds,
+        }
+
+    def format_diff(self):
+        if not self.changes:
+            return "No changes from the frozen snapshot (%s projects)" % len(self.versions)
+
+        lines = ["%s of %s projects changed from the frozen snapshot:" % (len(self.changes), len(set(self.versions) | set(self.frozen_versions)))]
+        lines.extend(["    " + change.format() for change in self.changes])
+        return '\n'.join(lines)
+
+
+def diff_dependency_versions(resolved_versions, frozen_versions, prebuilt_versions=None):
+    '''
+    Returns a SnapshotChange (sorted by project name) for every project whose resolved version
+    is different from its frozen one
+    '''
+    prebuilt_versions = prebuilt_versions or {}
+    changes = []
+
+    for project_name in sorted(set(resolved_versions) | set(frozen_versions)):
+        frozen = frozen_versions.get(project_name) or None
+        resolved = resolved_versions.get(project_name) or None
+
+        if frozen == resolved:
+            continue
+
+        changes.append(SnapshotChange(project_name, _classify_change(frozen, resolved), frozen,
+                                      prebuilt_versions.get(project_name) or None, resolved))
+
+    return changes
+
+def _classify_change(frozen, resolved):
+    if frozen is None:
+        return ADDED
+    elif resolved is None:
+        return REMOVED
+
+    try:
+        frozen_version, resolved_version = BuildVersion.parse(frozen), BuildVersion.parse(resolved)
+    except ValueError:
+        return CHANGED
+
+    if resolved_version > frozen_version:
+        return UPGRADED
+    elif resolved_version < frozen_version:
+        return DOWNGRADED
+    else:
+        return CHANGED
+
+def build_dependency_snapshot(bender_assets=None, frozen_snapshot_path=None, prebuilt_static_conf_path=None):
+    '''
+    Resolves the current version of every dependency and compares them with the frozen snapshot
+    and the prebuilt static conf (which default to the ones in PROJ_DIR). Returns a DependencySnapshot.
+    '''
+    from asset_bender.bundling import BenderAssets
+
+    config = get_config()
+    bender_assets = bender_assets or BenderAssets()
+
+    start = time.time()
+    versions = bender_assets.get_dependency_version_snapshot()
+    seconds = time.time() - start
+
+    frozen_versions = load_json_file(frozen_snapshot_path or config.frozen_snapshot_path)
+    prebuilt_versions = load_prebuilt_versions(prebuilt_static_conf_path or config.prebuilt_static_conf_path,
+                                               bender_assets.host_project_name)
+
+    return DependencySnapshot(versions, frozen_versions, prebuilt_versions, seconds)
+
+def load_json_file(path):
+    '''
+    The parsed json file, or {} if it doesn't exist. Unlike the request path, it is re-read
+    every time (the files change during a deploy).
+    '''
+    if not path or not os.path.isfile(path):
+        return {}
+
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def load_prebuilt_versions(path, host_project_name):
+    '''
+    The deps of prebuilt_recursive_static_conf.json, plus the build of the host project
+    '''
+    data = load_json_file(path)
+    prebuilt_versions = dict(data.get('deps', {}))
+
+    if data.get('build') and host_project_name:
+        prebuilt_versions[host_project_name] = "static-%s" % data['build']
+
+    return prebuilt_versions
+
+def write_frozen_snapshot(snapshot, path=None):
+    '''
+    Writes the resolved versions as the frozen snapshot (for prod), returns the path
+    '''
+    path = path or get_config().frozen_snapshot_path
+
+    with open(path, 'w') as f:
+        json.dump(snapshot.versions, f, indent=2, sort_keys=True)
+
+    return path
@@ -0,0 +1,89 @@
+'''
+Streaming responses that send the head (with the Asset Bender head css and js) before
+the rest of the page is rendered, so browsers start downloading the assets while the
+view is still working:
+
+    from asset_bender.streaming import streaming_bender_response
+
+    def my_view(request):
+        bender_assets = BenderAssets([...], request.GET)
+
+        def render_body():
+            # The slow part (queries, etc.)
+            return render_to_string('my_app/page_body.html', build_page_context(), RequestContext(request))
+
+        return streaming_bender_response(request, bender_assets, 'my_app/page_head.html', render_body)
+
+The head template should open the document up to (and including) the <body> tag and include
+"asset_bender/scaffold/head.html". The body is followed by "asset_bender/scaffold/end_of_body.html"
+and then `closing_html`.
+'''
+import logging
+
+from django.template import RequestContext
+from django.template.loader import render_to_string
+
+from asset_bender.bundling import BENDER_ASSETS_REQUEST_ATTRIBUTE, Scaffold
+from asset_bender.middleware import add_preload_headers, send_early_hints
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLOSING_HTML = '\n</body>\n</html>\n'
+
+
+def stream_bender_page(request, bender_assets, head_template_name, render_body, context=None, closing_html=DEFAULT_CLOSING_HTML):
+    '''
+    A generator of the chunks of the page: the rendered head template, the body (render_body is
+    only called after the head was yielded), the end of body scaffold and closing_html.
+
+    The head template is rendered with the Asset Bender context (and the optional context dict),
+    so the scaffold is built (or fetched from the cache) before the first chunk.
+    '''
+    # So the rest of the request (and the preload middleware) use the same instance
+    setattr(request, BENDER_ASSETS_REQUEST_ATTRIBUTE, bender_assets)
+
+    template_context = dict(context or {})
+    template_context.update(bender_assets.generate_context_dict())
+
+    yield render_to_string(head_template_name, template_context, RequestContext(request))
+
+    try:
+        body = render_body()
+    except Exception:
+        # The status and the head are already sent, so all that can be done is to stop here
+        logger.exception("Error rendering the body of a streamed Asset Bender page")
+        raise
+
+    yield body
+    yield render_to_string(Scaffold.end_of_body_template, template_context, RequestContext(request))
+    yield closing_html
+
+def streaming_bender_response(request, bender_assets, head_template_name, render_body, context=None,
+                              closing_html=DEFAULT_CLOSING_HTML, content_type='text/html; charset=utf-8'):
+    '''
+    A response that streams `stream_bender_page` (a StreamingHttpResponse on Django 1.5+,
+    otherwise an HttpResponse with an iterator, which older Django streams as is)
+
+    The scaffold is built before the response is returned, so the response gets the Link preload
+    headers (PreloadHeadersMiddleware skips streamed responses) and, if BENDER_EARLY_HINTS is on,
+    the early hints are sent.
+    '''
+    bender_assets.generate_scaffold()
+    send_early_hints(request, bender_assets)
+
+    chunks = stream_bender_page(request, bender_assets, head_template_name, render_body, context, closing_html)
+
+    try:
+        from django.http import StreamingHttpResponse
+    except ImportError:
+        from django.http import HttpResponse
+        response = HttpResponse(chunks, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+
+    try:
+        add_preload_headers(response, bender_assets)
+    except Exception as e:
+        logger.warning("Couldn't add Asset Bender preload headers: %s" % e)
+
+    return response
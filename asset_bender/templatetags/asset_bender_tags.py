@@ -1,21 +1,92 @@
 from django import template
-from asset_bender.bundling import get_static_url, get_static_build_version
+from django.utils.safestring import mark_safe
+
+from asset_bender.bundling import get_static_url, get_static_build_version, get_dependency_js_config, \
+                                  split_bender_asset_path, _extract_bender_assets_instance_from_template_context
 
 register = template.Library()
 
-@register.simple_tag(takes_context=True)
-def bender_url(context, full_asset_path):
-    return get_static_url(full_asset_path, template_context=context)
+
+class BenderUrlNode(template.Node):
+    '''
+    For a string literal path, which is split (and checked) once when the template is compiled
+    '''
+    def __init__(self, project_name, asset_path):
+        self.project_name = project_name
+        self.asset_path = asset_path
+
+    def render(self, context):
+        bender_assets = _extract_bender_assets_instance_from_template_context(context)
+        return bender_assets.get_project_asset_url(self.project_name, self.asset_path)
+
+class DynamicBenderUrlNode(template.Node):
+    '''
+    For a path that comes from a variable
+    '''
+    def __init__(self, path_expression):
+        self.path_expression = path_expression
+
+    def render(self, context):
+        return get_static_url(self.path_expression.resolve(context), template_context=context)
+
+class BenderBuildForNode(template.Node):
+    def __init__(self, project_name=None, project_name_expression=None):
+        self.project_name = project_name
+        self.project_name_expression = project_name_expression
+
+    def render(self, context):
+        project_name = self.project_name or self.project_name_expression.resolve(context)
+        return get_static_build_version(project_name, template_context=context)
+
+
+def _parse_single_argument(parser, token):
+    '''
+    Returns (the string literal's value, None) or (None, the filter expression) for
+    the tag's only argument
+    '''
+    bits = token.split_contents()
+
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError("%r takes exactly one argument" % bits[0])
+
+    argument = bits[1]
+
+    if len(argument) >= 2 and argument[0] == argument[-1] and argument[0] in ('"', "'"):
+        return argument[1:-1], None
+    else:
+        return None, parser.compile_filter(argument)
+
+def _compile_bender_url(parser, token):
+    full_asset_path, path_expression = _parse_single_argument(parser, token)
+
+    if path_expression is not None:
+        return DynamicBenderUrlNode(path_expression)
+
+    try:
+        project_name, asset_path = split_bender_asset_path(full_asset_path)
+    except Exception as e:
+        raise template.TemplateSyntaxError(str(e))
+
+    return BenderUrlNode(project_name, asset_path)
+
+@register.tag
+def bender_url(parser, token):
+    return _compile_bender_url(parser, token)
+
+@register.tag
+def bender_build_for(parser, token):
+    project_name, project_name_expression = _parse_single_argument(parser, token)
+    return BenderBuildForNode(project_name, project_name_expression)
 
 @register.simple_tag(takes_context=True)
-def bender_build_for(context, project_name):
-    return get_static_build_version(project_name, template_context=context)
+def bender_dependency_js_config(context):
+    return mark_safe(get_dependency_js_config(template_context=context))
 
 # Deprecated
 @register.simple_tag
 def static_url(static_path):
     return get_static_url(static_path)
 
-@register.simple_tag(takes_context=True)
-def static3_url(context, full_asset_path):
-    return get_static_url(full_asset_path, template_context=context)
+@register.tag
+def static3_url(parser, token):
+    return _compile_bender_url(parser, token)
@@ -0,0 +1,69 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+from nose.tools import eq_, assert_raises
+
+from django.template import Context, Template, TemplateSyntaxError
+
+from asset_bender import bundling
+from asset_bender.templatetags.asset_bender_tags import BenderUrlNode, DynamicBenderUrlNode, BenderBuildForNode
+
+
+class FakeBenderAssets(object):
+    '''
+    Records the lookups the tags make
+    '''
+    def __init__(self):
+        self.calls = []
+
+    def get_bender_asset_url(self, full_asset_path):
+        self.calls.append(('get_bender_asset_url', full_asset_path))
+        project_name, asset_path = bundling.split_bender_asset_path(full_asset_path)
+        return '//static.example.com/%s/static-1.3/%s' % (project_name, asset_path)
+
+    def get_project_asset_url(self, project_name, asset_path):
+        self.calls.append(('get_project_asset_url', project_name, asset_path))
+        return '//static.example.com/%s/static-1.3/%s' % (project_name, asset_path)
+
+    def get_static3_build_version(self, project_name):
+        self.calls.append(('get_static3_build_version', project_name))
+        return 'static-1.3'
+
+def render(template_src, **context):
+    bender_assets = FakeBenderAssets()
+    context[bundling.BENDER_ASSETS_CONTEXT_NAME] = bender_assets
+    return Template('{% load asset_bender_tags %}' + template_src).render(Context(context)), bender_assets.calls
+
+def compiled_nodes(template_src):
+    return Template('{% load asset_bender_tags %}' + template_src).nodelist[1:]
+
+
+def test_literal_bender_url_is_split_at_compile_time():
+    node, = compiled_nodes('{% bender_url "my_project/static/my/path.html" %}')
+    eq_(type(node), BenderUrlNode)
+    eq_((node.project_name, node.asset_path), ('my_project', 'my/path.html'))
+
+    eq_(render('{% bender_url "my_project/static/my/path.html" %}{% static3_url \'my_project/static/other.js\' %}'), (
+        '//static.example.com/my_project/static-1.3/my/path.html//static.example.com/my_project/static-1.3/other.js',
+        [('get_project_asset_url', 'my_project', 'my/path.html'), ('get_project_asset_url', 'my_project', 'other.js')]))
+
+def test_bender_url_from_a_variable():
+    node, = compiled_nodes('{% bender_url path %}')
+    eq_(type(node), DynamicBenderUrlNode)
+
+    eq_(render('{% bender_url path %}', path='my_project/static/my/path.html'), (
+        '//static.example.com/my_project/static-1.3/my/path.html',
+        [('get_bender_asset_url', 'my_project/static/my/path.html')]))
+
+def test_bender_build_for():
+    eq_(type(compiled_nodes('{% bender_build_for "my_project" %}')[0]), BenderBuildForNode)
+
+    eq_(render('{% bender_build_for "my_project" %} {% bender_build_for name %}', name='other_project'), (
+        'static-1.3 static-1.3',
+        [('get_static3_build_version', 'my_project'), ('get_static3_build_version', 'other_project')]))
+
+def test_bad_literal_paths_are_rejected_at_compile_time():
+    assert_raises(TemplateSyntaxError, Template, '{% load asset_bender_tags %}{% bender_url "my_project/static/sass/path.sass" %}')
+    assert_raises(TemplateSyntaxError, Template, '{% load asset_bender_tags %}{% bender_url "no_static_dir.js" %}')
+    assert_raises(TemplateSyntaxError, Template, '{% load asset_bender_tags %}{% bender_url %}')
+    assert_raises(TemplateSyntaxError, Template, '{% load asset_bender_tags %}{% bender_build_for "a" "b" %}')
@@ -0,0 +1,27 @@
+'''
+Minimal Django settings for the tests that need them, so they also run without
+DJANGO_SETTINGS_MODULE being set
+'''
+import os
+
+from django.conf import ENVIRONMENT_VARIABLE, settings
+
+
+def configure_test_settings():
+    '''
+    Configures the settings unless they already are (or will be, from DJANGO_SETTINGS_MODULE).
+    Call it before anything reads a setting, hscacheutils only looks at them once.
+    '''
+    if settings.configured or os.environ.get(ENVIRONMENT_VARIABLE):
+        return
+
+    settings.configure(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        INSTALLED_APPS=['asset_bender'],
+        TEMPLATE_DIRS=[],
+        SECRET_KEY='asset_bender_tests',
+        ENV='local',
+        PROJ_NAME='my_app')
+
+# Not a test, even though nose picks it up from the test modules that import it
+configure_test_settings.__test__ = False
@@ -0,0 +1,84 @@
+from nose.tools import eq_
+
+from asset_bender.bundling import AssetRecord, Scaffold, parse_bundle_html, _parse_include_tag, _parse_tag_attrs
+
+
+def test_parse_tag_attrs():
+    eq_(_parse_tag_attrs(' SRC="//static.example.com/a.js?x=1&amp;y=&quot;2&quot;" async data-main=\'app\' type=text/javascript'), [
+        ('src', '//static.example.com/a.js?x=1&y="2"'),
+        ('async', None),
+        ('data-main', 'app'),
+        ('type', 'text/javascript'),
+    ])
+    eq_(_parse_tag_attrs(''), [])
+
+def test_parse_include_tags():
+    eq_(_parse_include_tag('<script src="//static.example.com/app/static-1.0/js/a.js" async></script>'),
+        AssetRecord(AssetRecord.SCRIPT_KIND, '//static.example.com/app/static-1.0/js/a.js', (('async', None),), None))
+    eq_(_parse_include_tag('<link rel="stylesheet" href="//static.example.com/app/static-1.0/css/a.css" media="print">'),
+        AssetRecord(AssetRecord.STYLESHEET_KIND, '//static.example.com/app/static-1.0/css/a.css', (('rel', 'stylesheet'), ('media', 'print')), None))
+
+    # Anything that isn't a plain include is passed through as is
+    for html in ('<!--[if lt IE 9]><script src="//static.example.com/app/static-1.0/js/ie.js"></script><![endif]-->',
+                 '<!-- a comment -->',
+                 '<script>window.inline = true;</script>',
+                 '<script type="text/javascript"></script>',
+                 '<link rel="icon" href="//static.example.com/app/static-1.0/img/favicon.ico">',
+                 'not a tag at all'):
+        eq_(_parse_include_tag(html), AssetRecord(AssetRecord.RAW_KIND, None, (), html))
+
+def test_parse_and_render_round_trip():
+    html = '\n'.join([
+        '<script src="//static.example.com/app/static-1.0/js/a.js?x=1&amp;y=2" data-main="app"></script>',
+        '',
+        '  <link href="//static.example.com/app/static-1.0/css/a.css" rel="stylesheet" />  ',
+        '<!-- a comment -->',
+        '<script>window.inline = true;</script>',
+    ])
+    records = parse_bundle_html(html)
+
+    eq_([record.kind for record in records], [AssetRecord.SCRIPT_KIND, AssetRecord.STYLESHEET_KIND, AssetRecord.RAW_KIND, AssetRecord.RAW_KIND])
+    eq_(records[0].url, '//static.example.com/app/static-1.0/js/a.js?x=1&y=2')
+    eq_([record.render() for record in records], [
+        '<script src="//static.example.com/app/static-1.0/js/a.js?x=1&amp;y=2" data-main="app"></script>',
+        '<link href="//static.example.com/app/static-1.0/css/a.css" rel="stylesheet" />',
+        '<!-- a comment -->',
+        '<script>window.inline = true;</script>',
+    ])
+
+    # Rendered records parse back to the same records
+    eq_(parse_bundle_html('\n'.join([record.render() for record in records])), records)
+
+def test_duplicates_across_bundles_keep_the_first_occurrence():
+    scaffold = Scaffold()
+    seen_asset_urls = set()
+
+    scaffold.add_html_by_file_name('style_guide/static/js/style_guide.js', '\n'.join([
+        '<script src="//static.example.com/jquery/static-1.3/jquery.js"></script>',
+        '<script src="//static.example.com/style_guide/static-3.1/js/style_guide.js"></script>',
+    ]), seen_asset_urls=seen_asset_urls)
+    scaffold.add_html_by_file_name('my_app/static/js/app.js', '\n'.join([
+        '<script src="https://STATIC.example.com/jquery/static-1.3/jquery.js"></script>',
+        '<!-- a comment -->',
+        '<!-- a comment -->',
+        '<script src="//static.example.com/my_app/static-2.0/js/app.js"></script>',
+    ]), seen_asset_urls=seen_asset_urls)
+
+    eq_([record.url or record.html for record in scaffold.footer_js], [
+        '//static.example.com/jquery/static-1.3/jquery.js',
+        '//static.example.com/style_guide/static-3.1/js/style_guide.js',
+        '<!-- a comment -->',
+        '<!-- a comment -->',
+        '//static.example.com/my_app/static-2.0/js/app.js',
+    ])
+    eq_(scaffold.dropped_duplicates, [('my_app/static/js/app.js', 'https://STATIC.example.com/jquery/static-1.3/jquery.js')])
+
+def test_duplicates_are_kept_without_dedupe():
+    scaffold = Scaffold()
+    html = '<link rel="stylesheet" href="//static.example.com/app/static-1.0/css/a.css">'
+
+    scaffold.add_html_by_file_name('app/static/css/a.css', html)
+    scaffold.add_html_by_file_name('app/static/css/b.css', html)
+
+    eq_(len(scaffold.head_css), 2)
+    eq_(scaffold.dropped_duplicates, [])
@@ -0,0 +1,140 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+import urlparse
+
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from nose.tools import eq_, ok_
+
+from asset_bender import bundling, views
+from asset_bender.bundling import AssetRecord, Scaffold, combine_records, parse_bundle_html
+
+
+TEMPLATE = "//%(domain)s/combo?%(paths)s"
+
+def script(url, *attrs):
+    return AssetRecord(AssetRecord.SCRIPT_KIND, url, tuple(attrs), None)
+
+def stylesheet(url):
+    return AssetRecord(AssetRecord.STYLESHEET_KIND, url, (('rel', 'stylesheet'),), None)
+
+
+def test_combine_records():
+    raw = AssetRecord(AssetRecord.RAW_KIND, None, (), '<!-- ie only -->')
+    records = [
+        script('//static.example.com/app/static-1.0/js/a.js'),
+        script('https://static.example.com/app/static-1.0/js/b file.js'),
+        raw,
+        script('//static.example.com/app/static-1.0/js/c.js'),
+        script('//static.example.com/app/static-1.0/js/d.js', ('async', None)),
+        script('//other.example.com/lib/static-2.0/js/e.js'),
+        script('/relative/f.js'),
+        stylesheet('//static.example.com/app/static-1.0/css/a.css'),
+    ]
+
+    eq_(combine_records(records, TEMPLATE), [
+        script('//static.example.com/combo?app/static-1.0/js/a.js&app/static-1.0/js/b%20file.js'),
+        raw,
+        records[3],
+        records[4],
+        records[5],
+        records[6],
+        records[7],
+    ])
+
+def test_combo_urls_are_split_at_the_max_length():
+    records = [script('//static.example.com/app/static-1.0/js/%s.js' % name) for name in 'abcde']
+    combined = combine_records(records, TEMPLATE, max_url_length=len('//static.example.com/combo?') + 2 * len('app/static-1.0/js/a.js') + 1)
+
+    eq_([record.url for record in combined], [
+        '//static.example.com/combo?app/static-1.0/js/a.js&app/static-1.0/js/b.js',
+        '//static.example.com/combo?app/static-1.0/js/c.js&app/static-1.0/js/d.js',
+        '//static.example.com/app/static-1.0/js/e.js',
+    ])
+
+def build_combo_scaffold():
+    scaffold = Scaffold(combo_url_template=TEMPLATE)
+    scaffold.add_head_css_html('<link href="//static.example.com/app/static-1.0/css/a.css" rel="stylesheet" type="text/css" />\n'
+                               '<link href="//static.example.com/app/static-1.0/css/b.css" rel="stylesheet" type="text/css" />', 'app.css')
+    scaffold.add_footer_js_html('<script src="//static.example.com/app/static-1.0/js/a.js"></script>\n'
+                                '<script src="//static.example.com/app/static-1.0/js/b.js"></script>', 'app.js')
+    return scaffold
+
+def test_combo_urls_are_escaped_and_preloaded():
+    scaffold = build_combo_scaffold()
+    combo_url = '//static.example.com/combo?app/static-1.0/css/a.css&app/static-1.0/css/b.css'
+
+    eq_(scaffold.header_css_html(), '<link href="%s" rel="stylesheet" type="text/css" />' % combo_url.replace('&', '&amp;'))
+    eq_(scaffold.head_preload_urls(), [(combo_url, 'style')])
+
+def test_records_are_only_combined_once():
+    scaffold = build_combo_scaffold()
+    original_combine_records = bundling.combine_records
+    calls = []
+
+    def counting_combine_records(*args):
+        calls.append(args)
+        return original_combine_records(*args)
+
+    bundling.combine_records = counting_combine_records
+
+    try:
+        for i in range(2):
+            scaffold.header_css_html()
+            scaffold.header_js_html()
+            scaffold.footer_js_html()
+            scaffold.has_excess_stylesheets_for_IE()
+            scaffold.head_preload_urls()
+
+        eq_(len(calls), 3)
+
+        # Adding html combines them again
+        scaffold.add_footer_js_html('<script src="//static.example.com/app/static-1.0/js/c.js"></script>', 'c.js')
+        ok_('js/c.js' in scaffold.footer_js_html())
+        eq_(len(calls), 4)
+    finally:
+        bundling.combine_records = original_combine_records
+
+
+class FakeResult(object):
+    def __init__(self, content):
+        self.content = content
+
+def call_combo_handler(query_string):
+    fetched_urls = []
+
+    def fake_fetch(url, request_type=None):
+        fetched_urls.append(url)
+        return FakeResult('/* %s */' % url.rsplit('/', 1)[-1])
+
+    original_fetch = views.fetch_ab_url_with_retries
+    views.fetch_ab_url_with_retries = fake_fetch
+
+    try:
+        with override_settings(BENDER_LOCAL_MODE=False, BENDER_CDN_DOMAIN='static.example.com', DEFAULT_ASSET_BENDER_BUNDLES=[]):
+            response = views.combo_handler(RequestFactory().get('/combo?' + query_string))
+    finally:
+        views.fetch_ab_url_with_retries = original_fetch
+
+    return response, fetched_urls
+
+def test_combo_url_round_trip():
+    scaffold = build_combo_scaffold()
+    combo_url = parse_bundle_html(scaffold.footer_js_html())[0].url
+
+    response, fetched_urls = call_combo_handler(urlparse.urlparse(combo_url).query)
+
+    eq_(response.status_code, 200)
+    eq_(response['Content-Type'], 'application/javascript')
+    eq_(fetched_urls, ['https://static.example.com/app/static-1.0/js/a.js', 'https://static.example.com/app/static-1.0/js/b.js'])
+    eq_(response.content, '/* a.js */\n;\n/* b.js */')
+
+def test_combo_handler_rejects_bad_paths():
+    for query_string in ('', 'app/static-1.0/js/a.js&app/static-1.0/css/a.css', 'app/static-1.0/../../js/a.js', '/etc/a.js',
+                         '%3Cscript%3Ealert(1)%3C/script%3E/../a.js'):
+        response, fetched_urls = call_combo_handler(query_string)
+        eq_(response.status_code, 400)
+        eq_(response['Content-Type'], 'text/plain')
+        ok_('<script>' not in response.content)
+        eq_(fetched_urls, [])
@@ -0,0 +1,70 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+from django.test.utils import override_settings
+from nose.tools import eq_, ok_, assert_raises
+
+from asset_bender import AssetBenderException, bundling
+from asset_bender.config import BenderConfig, get_config
+
+
+VALID_VALUES = dict(
+    cdn_domain='static.example.com',
+    s3_domain='s3.example.com',
+    daemon_domain='localhost:3333',
+    combo_max_url_length=2000,
+    preload_max_assets=20,
+    fetch_executor='serial',
+    fetch_concurrency=1,
+    profile_sample_rate=0)
+
+def build_config(**values):
+    config_values = dict(VALID_VALUES)
+    config_values.update(values)
+    return BenderConfig(**config_values)
+
+
+def test_valid_config():
+    eq_(build_config().cdn_domain, 'static.example.com')
+
+def test_invalid_settings_raise():
+    for values in ({'cdn_domain': ''},
+                   {'s3_domain': 'http://s3.example.com'},
+                   {'daemon_domain': None},
+                   {'combo_max_url_length': 0},
+                   {'use_combo_urls': True, 'combo_url_template': '//%(domain)s/combo'},
+                   {'use_combo_urls': True},
+                   {'combo_url_template': '/bender/combo'},
+                   {'fetch_executor': 'processes'},
+                   {'trace_sample_rate': 2, 'trace_path': '/tmp/traces.jsonl', 'trace_max_bytes': 1024},
+                   {'trace_sample_rate': 0.5, 'trace_path': None, 'trace_max_bytes': 1024}):
+        assert_raises(AssetBenderException, build_config, **values)
+
+def test_combo_urls_need_a_template():
+    eq_(build_config(use_combo_urls=True, combo_url_template='/bender/combo?%(paths)s').combo_url_template, '/bender/combo?%(paths)s')
+
+    with override_settings(DEFAULT_ASSET_BENDER_BUNDLES=[]):
+        assert_raises(AssetBenderException, bundling.BenderAssets, use_combo_urls=True)
+
+    with override_settings(DEFAULT_ASSET_BENDER_BUNDLES=[], BENDER_COMBO_URL_TEMPLATE='/bender/combo?%(paths)s'):
+        ok_(bundling.BenderAssets(use_combo_urls=True).use_combo_urls)
+
+def test_invalid_django_settings_raise():
+    with override_settings(BENDER_COMBO_MAX_URL_LENGTH='long'):
+        assert_raises(AssetBenderException, get_config)
+
+def test_override_settings_resets_the_config():
+    config = get_config()
+    ok_(get_config() is config)
+
+    with override_settings(BENDER_CDN_DOMAIN='cdn.example.com', PROJ_NAME='other_app'):
+        eq_(get_config().cdn_domain, 'cdn.example.com')
+        eq_(get_config().project_name, 'other_app')
+
+    ok_(get_config() is not config)
+    eq_(get_config().cdn_domain, config.cdn_domain)
+    eq_(get_config().project_name, 'my_app')
+
+def test_setting_helper_is_still_exported_from_bundling():
+    with override_settings(STATIC3_CDN_DOMAIN='static3.example.com'):
+        eq_(bundling.get_bender_or_static3_setting('BENDER_CDN_DOMAIN', None), 'static3.example.com')
@@ -0,0 +1,69 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+from django.template import Context, Template
+from django.test.utils import override_settings
+from nose.tools import eq_, ok_
+
+from asset_bender import bundling
+from asset_bender.bundling import BenderAssets, LazyScaffold, LocalLRUCache, Scaffold
+from asset_bender.config import reset_config
+
+
+def counting_generate_scaffold(bender_assets, calls):
+    scaffold = Scaffold()
+    scaffold.add_head_css_html('<link rel="stylesheet" href="//static.example.com/app/static-1.0/css/app.css">')
+
+    def generate_scaffold():
+        calls.append(1)
+        return scaffold
+
+    bender_assets.generate_scaffold = generate_scaffold
+
+
+@override_settings(BENDER_LOCAL_MODE=False, BENDER_CDN_DOMAIN='static.example.com', DEFAULT_ASSET_BENDER_BUNDLES=[])
+def test_scaffold_is_not_built_until_used():
+    bender_assets = BenderAssets(['app/static/js/app.js'])
+    calls = []
+    counting_generate_scaffold(bender_assets, calls)
+
+    context = bender_assets.generate_context_dict()
+    scaffold = context[bundling.SCAFFOLD_CONTEXT_NAME]
+    ok_(isinstance(scaffold, LazyScaffold))
+
+    # Templates that only check for it (or don't use it at all) don't build it
+    eq_(Template('{% if bender_scaffold %}yes{% endif %}').render(Context(context)), 'yes')
+    eq_(calls, [])
+
+    html = Template('{{ bender_scaffold.header_css_html|safe }}').render(Context(context))
+    eq_(html, '<link href="//static.example.com/app/static-1.0/css/app.css" rel="stylesheet" />')
+    eq_(len(calls), 1)
+
+    eq_(scaffold.header_css_html(), html)
+    ok_(scaffold.is_complete)
+
+def test_local_lru_cache():
+    cache = LocalLRUCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    eq_(cache.get('a'), 1)
+
+    # b is the least recently used
+    cache.set('c', 3)
+    eq_((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+    eq_(len(cache), 2)
+
+@override_settings(DEFAULT_ASSET_BENDER_BUNDLES=[])
+def test_dependency_js_config_is_cached_until_the_config_is_reset():
+    bender_assets = BenderAssets()
+    bender_assets.get_all_dependency_versions = lambda: {'jquery': 'static-1.3', 'my_app': 'static-2.0'}
+
+    js_config = bender_assets.get_dependency_js_config()
+    eq_(js_config, 'depVersions: {"jquery": "static-1.3", "my_app": "static-2.0"},\n'
+                   '    depPathPrefixes: {"jquery": "/jquery/static-1.3", "my_app": "/my_app/static-2.0"}')
+    ok_(bender_assets.get_dependency_js_config() is js_config)
+    eq_(len(bundling._dependency_js_config_cache), 1)
+
+    reset_config()
+    eq_(len(bundling._dependency_js_config_cache), 0)
+    eq_(bender_assets.get_dependency_js_config(), js_config)
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+import urlparse
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from nose.tools import eq_, ok_
+
+from asset_bender import daemon as daemon_module
+from asset_bender.daemon import DaemonChangeWatcher, fetch_batch
+
+
+class StubDaemon(object):
+    '''
+    A tiny local daemon with a /changes long-poll feed
+    '''
+    def __init__(self, supports_feed=True, supports_batch=True):
+        self.seq = 1
+        self.supports_feed = supports_feed
+        self.supports_batch = supports_batch
+        self.batch_requests = []
+        self.changed = threading.Condition()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse.urlparse(self.path)
+                params = urlparse.parse_qs(parsed.query)
+
+                if parsed.path != '/changes' or not stub.supports_feed:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                since = params.get('since', [None])[0]
+
+                with stub.changed:
+                    if since == str(stub.seq):
+                        stub.changed.wait(float(params['timeout'][0]))
+                    seq = stub.seq
+
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write('{"seq": %s}' % seq)
+
+            def do_POST(self):
+                if not self.path.startswith('/batch') or not stub.supports_batch:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.batch_requests.append(request)
+
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(json.dumps({
+                    'bundles': dict([(path, '<script src="/%s"></script>' % path) for path in request['bundles']]),
+                    'builds': dict([(project, 'static-1.0') for project in request['projects']]),
+                }))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.domain = '127.0.0.1:%s' % self.server.server_port
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def rebuild(self):
+        with self.changed:
+            self.seq += 1
+            self.changed.notify_all()
+
+    def shutdown(self):
+        self.rebuild()
+        self.server.shutdown()
+
+
+def wait_for(condition, timeout=5):
+    end = time.time() + timeout
+    while not condition() and time.time() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_caches_until_the_daemon_reports_a_change():
+    daemon = StubDaemon()
+    watcher = DaemonChangeWatcher(daemon.domain, poll_timeout=1, retry_delay=0.1)
+    watcher.ensure_running()
+
+    try:
+        ok_(wait_for(lambda: watcher.is_healthy))
+
+        watcher.set('http://daemon/bundle.html', 'v1', watcher.generation)
+        eq_(watcher.get('http://daemon/bundle.html'), 'v1')
+
+        invalidations = watcher.invalidation_count
+        daemon.rebuild()
+
+        ok_(wait_for(lambda: watcher.invalidation_count > invalidations))
+        eq_(watcher.get('http://daemon/bundle.html'), None)
+    finally:
+        watcher.stop()
+        daemon.shutdown()
+
+def test_doesnt_cache_a_response_fetched_before_a_change():
+    daemon = StubDaemon()
+    watcher = DaemonChangeWatcher(daemon.domain, poll_timeout=1, retry_delay=0.1)
+    watcher.ensure_running()
+
+    try:
+        ok_(wait_for(lambda: watcher.is_healthy))
+
+        generation = watcher.generation
+        invalidations = watcher.invalidation_count
+        daemon.rebuild()
+        ok_(wait_for(lambda: watcher.invalidation_count > invalidations))
+
+        watcher.set('http://daemon/bundle.html', 'stale', generation)
+        eq_(watcher.get('http://daemon/bundle.html'), None)
+    finally:
+        watcher.stop()
+        daemon.shutdown()
+
+def test_no_caching_without_a_change_feed():
+    daemon = StubDaemon(supports_feed=False)
+    watcher = DaemonChangeWatcher(daemon.domain, poll_timeout=1, retry_delay=0.1)
+    watcher.ensure_running()
+
+    try:
+        time.sleep(0.2)
+        ok_(not watcher.is_healthy)
+
+        watcher.set('http://daemon/bundle.html', 'v1', watcher.generation)
+        eq_(watcher.get('http://daemon/bundle.html'), None)
+    finally:
+        watcher.stop()
+        daemon.shutdown()
+
+def test_batch_fetch():
+    daemon = StubDaemon()
+
+    try:
+        result = fetch_batch(daemon.domain, 'my_app', ['a/static/js/a.js'], ['a', 'b'], expanded=True)
+
+        eq_(result['bundles'], {'a/static/js/a.js': '<script src="/a/static/js/a.js"></script>'})
+        eq_(result['builds'], {'a': 'static-1.0', 'b': 'static-1.0'})
+        eq_(daemon.batch_requests[0]['expanded'], True)
+    finally:
+        daemon.shutdown()
+
+def test_batch_fetch_unsupported():
+    daemon = StubDaemon(supports_batch=False)
+
+    try:
+        eq_(fetch_batch(daemon.domain, 'my_app', ['a/static/js/a.js'], ['a']), None)
+        ok_(daemon.domain in daemon_module._batch_unsupported_domains)
+
+        # Doesn't ask again once it knows batching isn't supported
+        daemon.supports_batch = True
+        eq_(fetch_batch(daemon.domain, 'my_app', ['a/static/js/a.js'], ['a']), None)
+        eq_(daemon.batch_requests, [])
+    finally:
+        daemon.shutdown()
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from nose.plugins.skip import SkipTest
+from nose.tools import eq_, ok_, assert_raises
+
+from asset_bender.executors import SerialExecutor, ThreadPoolExecutor, GeventExecutor
+
+
+def slow_square(number):
+    time.sleep(0.02)
+    return number * number
+
+def fail_on_three(number):
+    if number == 3:
+        raise ValueError("three")
+
+    return number
+
+
+def test_serial_executor():
+    eq_(SerialExecutor().map(slow_square, [1, 2, 3]), [1, 4, 9])
+    assert_raises(ValueError, SerialExecutor().map, fail_on_three, [1, 2, 3])
+
+def test_thread_pool_runs_in_parallel_and_keeps_order():
+    executor = ThreadPoolExecutor(8)
+
+    start = time.time()
+    eq_(executor.map(slow_square, range(8)), [number * number for number in range(8)])
+    ok_(time.time() - start < 0.1)
+
+def test_thread_pool_raises_exceptions():
+    assert_raises(ValueError, ThreadPoolExecutor(4).map, fail_on_three, [1, 2, 3, 4])
+
+def test_thread_pool_nested_maps_run_serially():
+    executor = ThreadPoolExecutor(2)
+    thread_names = []
+
+    def nested(number):
+        def record(inner_number):
+            thread_names.append(threading.current_thread().name)
+            return inner_number
+
+        return executor.map(record, [number, number])
+
+    eq_(executor.map(nested, [1, 2, 3, 4]), [[1, 1], [2, 2], [3, 3], [4, 4]])
+    ok_(threading.current_thread().name not in thread_names)
+
+def test_gevent_executor():
+    try:
+        import gevent
+    except ImportError:
+        raise SkipTest("gevent isn't installed")
+
+    start = time.time()
+    eq_(GeventExecutor(8).map(lambda number: gevent.sleep(0.02) or number, range(8)), range(8))
+    ok_(time.time() - start < 0.1)
@@ -0,0 +1,53 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+import threading
+import time
+
+from django.test.utils import override_settings
+from nose.tools import eq_
+
+from asset_bender.bundling import BenderAssets, BundleFetcherBase
+
+
+class SlowPointerFetcher(BundleFetcherBase):
+    def __init__(self, *args, **kwargs):
+        super(SlowPointerFetcher, self).__init__(*args, **kwargs)
+        self.pointer_fetches = []
+
+    def _fetch_version_from_version_pointer(self, pointer, project_name):
+        self.pointer_fetches.append((project_name, pointer))
+        time.sleep(0.05)
+        return 'static-2.7'
+
+
+def test_forced_versions_are_resolved_once_across_threads():
+    fetcher = SlowPointerFetcher('my_app', forced_build_version_by_project={'jquery': 'edge', 'style_guide': 'static-3.1'})
+    seen = []
+
+    def read_cache():
+        seen.append(dict(fetcher.per_request_project_build_version_cache))
+
+    threads = [threading.Thread(target=read_cache) for i in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    eq_(fetcher.pointer_fetches, [('jquery', 'edge')])
+    eq_(seen, [{'jquery': 'static-2.7', 'style_guide': 'static-3.1'}] * 8)
+
+@override_settings(DEFAULT_ASSET_BENDER_BUNDLES=[])
+def test_invalid_forced_versions_are_ignored():
+    bender_assets = BenderAssets(http_get_params={
+        'forceBuildFor-jquery': 'static-x',
+        'forceBuildFor-style_guide': 'static-3.1',
+    })
+
+    eq_(bender_assets.forced_build_version_by_project, {'style_guide': 'static-3.1'})
+    eq_(bender_assets.s3_fetcher.per_request_project_build_version_cache, {'style_guide': 'static-3.1'})
+
+    bender_assets = BenderAssets(http_get_params={'forceBuildFor-jquery': 'static-'})
+    eq_(bender_assets.forced_build_version_by_project, None)
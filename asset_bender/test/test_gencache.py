@@ -0,0 +1,34 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+from nose.tools import eq_
+
+from asset_bender.gencache import BatchingGenCache
+
+
+def test_get_many_uses_the_same_keys_as_get():
+    cache = BatchingGenCache([
+        'test_static_build_name_for:project',
+        'test_static_deps_for_project:host_project',
+    ], timeout=60)
+
+    lookups = [
+        dict(project='jquery', host_project='my_app'),
+        dict(project='style_guide', host_project='my_app'),
+        dict(project='jquery', host_project='other_app'),
+        dict(project='jquery', host_project='my_app', add_to_key='extra'),
+        dict(project='jquery', host_project='my_app', cache_key=('a', 1)),
+    ]
+
+    for i, kwargs in enumerate(lookups):
+        if i != 1:
+            cache.set('value %s' % i, **dict(kwargs))
+
+    expected = [None if i == 1 else 'value %s' % i for i in range(len(lookups))]
+    eq_([cache.get(**dict(kwargs)) for kwargs in lookups], expected)
+    eq_(cache.get_many(lookups), expected)
+
+    # Both see invalidations
+    cache.invalidate('test_static_deps_for_project:host_project', host_project='my_app')
+    eq_([cache.get(**dict(kwargs)) for kwargs in lookups], [None, None, 'value 2', None, None])
+    eq_(cache.get_many(lookups), [None, None, 'value 2', None, None])
@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_, ok_
+
+from asset_bender.json_store import StaticJsonStore, ENTRY_OVERHEAD_BYTES
+
+
+def write_json(directory, name, data):
+    path = os.path.join(directory, name)
+
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+    return path
+
+def test_entries_are_keyed_by_file_and_lru_evicted():
+    directory = tempfile.mkdtemp()
+
+    try:
+        first = write_json(directory, 'first.json', {'name': 'first', 'padding': 'x' * 1000})
+        second = write_json(directory, 'second.json', {'name': 'second', 'padding': 'x' * 1000})
+        third = write_json(directory, 'third.json', {'name': 'third', 'padding': 'x' * 1000})
+        missing = os.path.join(directory, 'missing.json')
+        entry_size = os.path.getsize(first) + ENTRY_OVERHEAD_BYTES
+
+        store = StaticJsonStore(max_bytes=entry_size * 2 + 10)
+
+        eq_(store.get((first,))['name'], 'first')
+        eq_(store.get((missing, second))['name'], 'second')
+
+        # The same file through another path list is the same entry
+        eq_(store.get((missing, first))['name'], 'first')
+        eq_(store.get((missing,)), {})
+
+        # Over the limit, so second (the least recently used) is evicted
+        eq_(store.get((third,))['name'], 'third')
+
+        stats = store.stats()
+        eq_(stats['entries'], 2)
+        eq_(stats['hits'], 1)
+        eq_(stats['misses'], 3)
+        eq_(stats['evictions'], 1)
+        ok_(stats['bytes'] <= entry_size * 2 + 10)
+    finally:
+        shutil.rmtree(directory)
+
+def test_changed_files_are_reloaded():
+    directory = tempfile.mkdtemp()
+
+    try:
+        path = write_json(directory, 'strings.json', {'greeting': 'hello'})
+        store = StaticJsonStore(max_bytes=None)
+
+        eq_(store.get((path,))['greeting'], 'hello')
+
+        write_json(directory, 'strings.json', {'greeting': 'hi there'})
+        os.utime(path, (1, 1))
+
+        eq_(store.get((path,))['greeting'], 'hi there')
+        eq_(store.get((path,))['greeting'], 'hi there')
+
+        stats = store.stats()
+        eq_(stats['entries'], 1)
+        eq_(stats['bytes'], os.path.getsize(path) + ENTRY_OVERHEAD_BYTES)
+        eq_((stats['hits'], stats['misses']), (1, 2))
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,147 @@
+import time
+
+from nose.tools import eq_, ok_
+from requests import Response, Timeout
+
+from asset_bender import http, latency
+from asset_bender.config import BenderConfig
+from asset_bender.http import fetch_ab_url_with_retries
+
+
+def build_config(**values):
+    settings = dict(
+        cdn_domain='static.example.com',
+        s3_domain='s3.example.com',
+        daemon_domain='localhost:3333',
+        combo_max_url_length=2000,
+        preload_max_assets=20,
+        profile_sample_rate=0,
+        fetch_executor='serial',
+        fetch_concurrency=1,
+        adaptive_timeouts=True,
+        fetch_timeout_min=0.01,
+        fetch_timeout_max=25,
+        fetch_timeout_multiplier=3,
+        fetch_timeout_min_samples=10,
+        fetch_backoff_base=0,
+        fetch_backoff_max=0,
+    )
+    settings.update(values)
+    return BenderConfig(**settings)
+
+class LatencyStub(object):
+    '''
+    Stands in for http._download_url, taking `latency` seconds (or timing out if that is
+    more than the timeout)
+    '''
+    def __init__(self, latency):
+        self.latency = latency
+        self.timeouts = []
+
+    def __call__(self, url, timeout=None):
+        self.timeouts.append(timeout)
+
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise Timeout("Timed out: %s" % url)
+
+        time.sleep(self.latency)
+        result = Response()
+        result._content = "static-1.2"
+        result.status_code = 200
+        return result
+
+def setup():
+    global download_url_orig, get_config_orig
+    download_url_orig = http._download_url
+    get_config_orig = http.get_config
+    latency.reset_latency_stats()
+
+def teardown():
+    http._download_url = download_url_orig
+    http.get_config = get_config_orig
+    latency.reset_latency_stats()
+
+def test_default_ladder_until_enough_samples():
+    config = build_config()
+    http.get_config = lambda: config
+    stub = http._download_url = LatencyStub(0.001)
+
+    for i in range(10):
+        fetch_ab_url_with_retries('http://s3.example.com/my_app/current-qa', request_type='pointer')
+
+    eq_(stub.timeouts, [1] * 10)
+
+def test_timeouts_follow_the_observed_latency():
+    config = build_config()
+    http.get_config = lambda: config
+    stub = http._download_url = LatencyStub(0.005)
+    url = 'http://fast.example.com/my_app/current-qa'
+
+    for i in range(20):
+        fetch_ab_url_with_retries(url, request_type='pointer')
+
+    stats = latency.get_latency_stats(config)[('fast.example.com', 'pointer')]
+    eq_(stats['count'], 20)
+    ok_(0.005 <= stats['ewma'] < 0.1)
+
+    # A multiple of the p99, doubling with each attempt
+    first, second, third = stats['timeouts']
+    ok_(0.015 <= first < 0.3, first)
+    eq_(second, first * 2)
+    eq_(third, first * 4)
+    ok_(0.015 <= stub.timeouts[-1] < 0.3, stub.timeouts[-1])
+
+def test_timeouts_stay_within_bounds():
+    config = build_config(fetch_timeout_min=0.5, fetch_timeout_max=1)
+    http.get_config = lambda: config
+    http._download_url = LatencyStub(0.001)
+    url = 'http://bounded.example.com/my_app/current-qa'
+
+    for i in range(10):
+        fetch_ab_url_with_retries(url, request_type='pointer')
+
+    eq_(latency.get_latency_stats(config)[('bounded.example.com', 'pointer')]['timeouts'], [0.5, 1, 1])
+
+def test_timeouts_grow_when_the_origin_slows_down():
+    config = build_config(fetch_timeout_min_samples=5)
+    http.get_config = lambda: config
+    url = 'http://degraded.example.com/my_app/current-qa'
+
+    http._download_url = LatencyStub(0.001)
+
+    for i in range(5):
+        fetch_ab_url_with_retries(url, request_type='pointer')
+
+    healthy_timeouts = latency.get_latency_stats(config)[('degraded.example.com', 'pointer')]['timeouts']
+
+    # The first attempts time out, but the retries are longer and succeed
+    stub = http._download_url = LatencyStub(0.03)
+
+    for i in range(5):
+        eq_(fetch_ab_url_with_retries(url, request_type='pointer').text, "static-1.2")
+
+    degraded_timeouts = latency.get_latency_stats(config)[('degraded.example.com', 'pointer')]['timeouts']
+    ok_(degraded_timeouts[0] > healthy_timeouts[0])
+    ok_(len(stub.timeouts) > 5)
+
+def test_daemon_fetches_keep_their_default_ladder():
+    config = build_config()
+    http.get_config = lambda: config
+    stub = http._download_url = LatencyStub(0.001)
+    url = 'http://localhost:3333/bundle/my_app/static/js/app.js.html?from=my_app'
+
+    for i in range(20):
+        fetch_ab_url_with_retries(url, request_type='daemon_bundle')
+
+    # Fast cached responses don't shorten the time an on demand compile gets
+    eq_(stub.timeouts, [1] * 20)
+    eq_(latency.get_latency_stats(config)[('localhost:3333', 'daemon_bundle')]['timeouts'], [1, 5, 25])
+
+def test_explicit_timeouts_are_left_alone():
+    config = build_config(fetch_timeout_min_samples=0)
+    http.get_config = lambda: config
+    stub = http._download_url = LatencyStub(0.001)
+
+    fetch_ab_url_with_retries('http://s3.example.com/my_app/current-qa', timeouts=[7], request_type='pointer')
+    eq_(stub.timeouts, [7])
@@ -0,0 +1,70 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+import threading
+
+from nose.tools import eq_, ok_
+
+from asset_bender import http
+from asset_bender.tools import loadtest
+from asset_bender.tools.fakes import InMemoryGenCache, StubOrigin
+
+
+def test_stub_origin_counts_duplicates_and_stampedes():
+    origin = StubOrigin(latency=0.05, build_for_project={'jquery': 'static-1.3'})
+    origin.install()
+
+    try:
+        eq_(http._download_url.__self__, origin)
+
+        pointer_url = 'http://static.example.com/jquery/current-qa'
+        threads = [threading.Thread(target=origin.download_url, args=(pointer_url,)) for i in range(3)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        eq_(origin.download_url(pointer_url).text, 'static-1.3')
+        ok_('<script src="/my_app/static-2.0/js/app' in
+            origin.download_url('http://static.example.com/my_app/static-2.0/js/app.bundle.html').text)
+    finally:
+        origin.uninstall()
+
+    eq_(origin.total_fetches(), 5)
+    eq_(origin.duplicate_fetches(), 3)
+
+    # The three concurrent fetches overlapped, so two of them started while one was in flight
+    eq_(origin.stampedes, 2)
+
+def test_in_memory_cache_invalidates_only_the_named_generation():
+    cache = InMemoryGenCache(['static_build_name_for:project', 'static_deps_for_project:host_project'])
+
+    cache.set('static-1.3', project='jquery', host_project='my_app')
+    cache.set('static-1.4', project='jquery', host_project='other_app')
+    cache.set('static-3.1', project='style_guide', host_project='my_app')
+
+    cache.invalidate('static_deps_for_project:host_project', host_project='my_app')
+
+    eq_(cache.get(project='jquery', host_project='my_app'), None)
+    eq_(cache.get(project='style_guide', host_project='my_app'), None)
+    eq_(cache.get(project='jquery', host_project='other_app'), 'static-1.4')
+
+    # The generation is inferred from the kwargs too
+    cache.invalidate(project='jquery')
+    eq_(cache.get(project='jquery', host_project='other_app'), None)
+
+    cache.set('static-3.2', project='style_guide', host_project='my_app')
+    eq_(cache.get(project='style_guide', host_project='my_app'), 'static-3.2')
+    eq_((cache.hits, cache.misses, cache.invalidations), (2, 3, 2))
+
+def test_load_test_smoke():
+    results = loadtest.run_load_test(threads=2, requests_per_thread=5, origin_latency=0, invalidate_every=4)
+
+    eq_(results['requests'], 10)
+    eq_(results['errors'], 0, results['error_samples'])
+    eq_(results['invalidations'], 2)
+    ok_(results['origin_fetches'] > 0)
+    ok_(results['unique_origin_urls'] <= results['origin_fetches'])
+    ok_(0 < results['scaffold_cache_hit_ratio'] < 1)
@@ -0,0 +1,91 @@
+import threading
+
+from nose.tools import eq_, ok_
+from requests import Response
+
+from asset_bender import http
+from asset_bender.http import fetch_ab_url_with_retries, FauxException
+from asset_bender.metrics import MetricsRegistry, RETIRE_DEAD_SHARDS_EVERY, registry
+
+
+def build_registry():
+    metrics = MetricsRegistry()
+    metrics.counter('test_requests_total', "Requests")
+    metrics.histogram('test_seconds', "Latency", buckets=(0.1, 1))
+    return metrics
+
+def test_counters_merged_across_threads():
+    metrics = build_registry()
+
+    def record():
+        for i in range(1000):
+            metrics.inc('test_requests_total', host='a')
+
+    threads = [threading.Thread(target=record) for i in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    metrics.inc('test_requests_total', host='b')
+
+    eq_(metrics.get('test_requests_total', host='a'), 4000)
+    eq_(metrics.get('test_requests_total', host='b'), 1)
+
+    # Once more, after the dead threads' shards are retired
+    eq_(metrics.get('test_requests_total', host='a'), 4000)
+
+def test_dead_threads_shards_are_retired_without_snapshots():
+    metrics = build_registry()
+
+    for i in range(RETIRE_DEAD_SHARDS_EVERY * 3):
+        thread = threading.Thread(target=metrics.inc, args=('test_requests_total',), kwargs={'host': 'a'})
+        thread.start()
+        thread.join()
+
+    ok_(len(metrics._shards) <= RETIRE_DEAD_SHARDS_EVERY, len(metrics._shards))
+    eq_(metrics.get('test_requests_total', host='a'), RETIRE_DEAD_SHARDS_EVERY * 3)
+
+def test_prometheus_histogram():
+    metrics = build_registry()
+    metrics.observe('test_seconds', 0.05, type='pointer')
+    metrics.observe('test_seconds', 0.5, type='pointer')
+    metrics.observe('test_seconds', 5, type='pointer')
+
+    text = metrics.render_prometheus()
+
+    ok_('# TYPE test_seconds histogram' in text)
+    ok_('test_seconds_bucket{type="pointer",le="0.1"} 1\n' in text)
+    ok_('test_seconds_bucket{type="pointer",le="1"} 2\n' in text)
+    ok_('test_seconds_bucket{type="pointer",le="+Inf"} 3\n' in text)
+    ok_('test_seconds_sum{type="pointer"} 5.55\n' in text)
+    ok_('test_seconds_count{type="pointer"} 3\n' in text)
+
+def test_fetch_retries_and_errors_are_recorded():
+    download_url_orig = http._download_url
+    attempts = [0]
+
+    def fail_once(url, timeout=None):
+        attempts[0] += 1
+
+        if attempts[0] == 1:
+            raise FauxException("Random exception")
+
+        result = Response()
+        result._content = "Success"
+        result.status_code = 200
+        return result
+
+    registry.reset()
+    http._download_url = fail_once
+
+    try:
+        fetch_ab_url_with_retries('http://s3.example.com/my_app/current-qa', timeouts=[1, 2], request_type='pointer')
+    finally:
+        http._download_url = download_url_orig
+
+    eq_(registry.get('asset_bender_fetch_retries_total', host='s3.example.com', type='pointer'), 1)
+    eq_(registry.get('asset_bender_fetch_errors_total', host='s3.example.com', type='pointer', status_class='other'), 1)
+    eq_(registry.get('asset_bender_fetch_seconds', host='s3.example.com', type='pointer')[-1], 2)
@@ -0,0 +1,108 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+from django.http import HttpRequest, HttpResponse
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from nose.tools import eq_, ok_
+
+from asset_bender import bundling
+from asset_bender.bundling import Scaffold
+from asset_bender.middleware import PreloadHeadersMiddleware, send_early_hints
+
+
+PRECONNECT = '<//static.example.com>; rel=preconnect'
+CSS_PRELOAD = '<//static.example.com/app/static-1.0/css/app.css>; rel=preload; as=style'
+JS_PRELOAD = '<//static.example.com/app/static-1.0/js/head.js>; rel=preload; as=script'
+
+
+def build_scaffold():
+    scaffold = Scaffold()
+    scaffold.add_head_css_html('<link href="//static.example.com/app/static-1.0/css/app.css" rel="stylesheet">')
+    scaffold.add_head_js_html('<script src="//static.example.com/app/static-1.0/js/head.js"></script>')
+    scaffold.add_footer_js_html('<script src="//static.example.com/app/static-1.0/js/app.js"></script>')
+    return scaffold
+
+class FakeBenderAssets(object):
+    def __init__(self):
+        self.scaffold = build_scaffold()
+
+    def generate_scaffold(self):
+        return self.scaffold
+
+    def get_prefixed_domain(self):
+        return '//static.example.com'
+
+def process_response(response):
+    request = HttpRequest()
+    request.bender_assets = FakeBenderAssets()
+    return PreloadHeadersMiddleware().process_response(request, response)
+
+
+def test_only_html_pages_get_preload_headers():
+    eq_(process_response(HttpResponse('<html>'))['Link'], ', '.join([PRECONNECT, CSS_PRELOAD, JS_PRELOAD]))
+
+    ok_(not process_response(HttpResponse('<html>', status=404)).has_header('Link'))
+    ok_(not process_response(HttpResponse('{}', content_type='application/json')).has_header('Link'))
+
+    # Nor requests without a BenderAssets
+    ok_(not PreloadHeadersMiddleware().process_response(HttpRequest(), HttpResponse('<html>')).has_header('Link'))
+
+def test_existing_link_header_is_appended_to():
+    response = HttpResponse('<html>')
+    response['Link'] = '</api/data>; rel=prefetch'
+
+    eq_(process_response(response)['Link'], ', '.join(['</api/data>; rel=prefetch', PRECONNECT, CSS_PRELOAD, JS_PRELOAD]))
+
+@override_settings(BENDER_PRELOAD_MAX_ASSETS=1)
+def test_preloads_are_capped():
+    eq_(process_response(HttpResponse('<html>'))['Link'], ', '.join([PRECONNECT, CSS_PRELOAD]))
+
+@override_settings(BENDER_EARLY_HINTS=True)
+def test_early_hints_need_a_working_callable():
+    bender_assets = FakeBenderAssets()
+
+    eq_(send_early_hints(HttpRequest(), bender_assets), False)
+
+    request = HttpRequest()
+    request.META['wsgi.early_hints'] = 'not callable'
+    eq_(send_early_hints(request, bender_assets), False)
+
+    def failing_send_hints(headers):
+        raise IOError("Connection reset")
+
+    request = HttpRequest()
+    request.META['wsgi.early_hints'] = failing_send_hints
+    eq_(send_early_hints(request, bender_assets), False)
+
+    hints = []
+    request = HttpRequest()
+    request.META['wsgi.early_hints'] = hints.append
+    eq_(send_early_hints(request, bender_assets), True)
+    eq_(send_early_hints(request, bender_assets), False)
+    eq_(hints, [[('Link', PRECONNECT), ('Link', CSS_PRELOAD), ('Link', JS_PRELOAD)]])
+
+def test_early_hints_are_off_by_default():
+    hints = []
+    request = HttpRequest()
+    request.META['wsgi.early_hints'] = hints.append
+
+    eq_(send_early_hints(request, FakeBenderAssets()), False)
+    eq_(hints, [])
+
+@override_settings(BENDER_EARLY_HINTS=True, BENDER_LOCAL_MODE=False, BENDER_CDN_DOMAIN='static.example.com', DEFAULT_ASSET_BENDER_BUNDLES=[])
+def test_build_scaffold_sends_early_hints():
+    scaffold = build_scaffold()
+    original_generate_scaffold = bundling.BenderAssets.generate_scaffold
+    bundling.BenderAssets.generate_scaffold = lambda bender_assets: scaffold
+
+    try:
+        hints = []
+        request = RequestFactory().get('/')
+        request.META['wsgi.early_hints'] = hints.append
+
+        ok_(bundling.build_scaffold(request, ['app/static/js/app.js']) is scaffold)
+        eq_(request.bender_assets.included_bundle_paths, ['app/static/js/app.js'])
+        eq_(hints, [[('Link', PRECONNECT), ('Link', CSS_PRELOAD), ('Link', JS_PRELOAD)]])
+    finally:
+        bundling.BenderAssets.generate_scaffold = original_generate_scaffold
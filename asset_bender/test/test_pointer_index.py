@@ -0,0 +1,108 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+import os
+import shutil
+import tempfile
+
+from django.test.utils import override_settings
+from nose.tools import eq_, ok_
+from requests import ConnectionError, Response
+
+from asset_bender import http
+from asset_bender.bundling import S3BundleFetcher
+from asset_bender.pointer_index import PointerIndex
+from asset_bender.versions import VersionPointer
+
+
+def test_local_pointer_index():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'pointers.json')
+
+    try:
+        with open(path, 'w') as f:
+            f.write('{"jquery": {"current": "static-1.2", "current-qa": "static-1.3"}}')
+
+        index = PointerIndex(path, revalidate_seconds=0)
+
+        eq_(index.lookup('jquery', 'current-qa'), 'static-1.3')
+        eq_(index.lookup('jquery', 'edge-qa'), None)
+        eq_(index.lookup('style_guide', 'current-qa'), None)
+
+        # Unchanged, so it isn't re-read
+        eq_(index.revalidation_count, 3)
+        eq_(index.not_modified_count, 2)
+
+        with open(path, 'w') as f:
+            f.write('{"jquery": {"current-qa": "static-1.4"}}')
+
+        os.utime(path, (0, 0))
+        eq_(index.lookup('jquery', 'current-qa'), 'static-1.4')
+    finally:
+        shutil.rmtree(directory)
+
+def test_remote_pointer_index_revalidation():
+    requests_made = []
+
+    def fake_download_url(url, timeout=None, headers=None):
+        requests_made.append(headers)
+        response = Response()
+
+        if headers.get('If-None-Match') == '"abc"':
+            response.status_code = 304
+            response._content = ''
+        else:
+            response.status_code = 200
+            response._content = '{"jquery": {"current": "static-1.2"}}'
+            response.headers['ETag'] = '"abc"'
+
+        return response
+
+    original_download_url = http._download_url
+    http._download_url = fake_download_url
+
+    try:
+        index = PointerIndex('http://pointers.example.com/index.json', revalidate_seconds=0)
+
+        eq_(index.lookup('jquery', 'current'), 'static-1.2')
+        eq_(index.lookup('jquery', 'current'), 'static-1.2')
+
+        eq_(requests_made, [{}, {'If-None-Match': '"abc"'}])
+        eq_(index.not_modified_count, 1)
+    finally:
+        http._download_url = original_download_url
+
+def test_pointer_index_keeps_last_index_on_errors():
+    def failing_download_url(url, timeout=None, headers=None):
+        raise ConnectionError("Nope")
+
+    index = PointerIndex('http://pointers.example.com/index.json', revalidate_seconds=0)
+    index.index = {'jquery': {'current': 'static-1.2'}}
+    index.loaded_at = 1
+
+    original_download_url = http._download_url
+    http._download_url = failing_download_url
+
+    try:
+        eq_(index.lookup('jquery', 'current'), 'static-1.2')
+        ok_(index.checked_at is not None)
+    finally:
+        http._download_url = original_download_url
+
+def test_invalid_index_entries_fall_back_to_fetching_the_pointer():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'pointers.json')
+
+    try:
+        with open(path, 'w') as f:
+            f.write('{"jquery": {"current-qa": "static-1.3"}, "style_guide": {"current-qa": "not a build"}, '
+                    '"backbone": {"current-qa": 12}, "underscore": {"current-qa": ["static-1.0"]}}')
+
+        with override_settings(ENV='qa', BENDER_POINTER_INDEX_URL=path, BENDER_POINTER_INDEX_REVALIDATE_SECONDS=0):
+            fetcher = S3BundleFetcher('my_app')
+            pointers = dict([(project_name, VersionPointer.parse('current'))
+                             for project_name in ('jquery', 'style_guide', 'backbone', 'underscore', 'lodash')])
+
+            eq_(fetcher._lookup_pointers_in_index(pointers), {'jquery': 'static-1.3'})
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from nose.tools import eq_, ok_
+
+from asset_bender import executors, profiling
+from asset_bender.config import BenderConfig
+
+
+class Resolver(object):
+    bundle_paths = ['my_app/static/js/app.js']
+
+    @profiling.profiled('resolve', describe=lambda self, args, result: {'bundle_paths': self.bundle_paths, 'resolved_versions': result})
+    def resolve(self, delay):
+        time.sleep(delay)
+        return {'jquery': 'static-1.2'}
+
+
+def with_config(**values):
+    '''
+    Runs the test with a profiling config and a scratch profile directory (passed to the test)
+    '''
+    def decorator(test):
+        def wrapper():
+            directory = tempfile.mkdtemp()
+            config = BenderConfig(
+                cdn_domain='static.example.com',
+                s3_domain='s3.example.com',
+                daemon_domain='localhost:3333',
+                combo_max_url_length=2000,
+                preload_max_assets=20,
+                fetch_executor='serial',
+                fetch_concurrency=1,
+                profile_directory=directory,
+                profile_max_dumps=values.pop('profile_max_dumps', 100),
+                **values)
+
+            original_get_config = profiling.get_config
+            profiling.get_config = lambda: config
+            profiling.reset_dump_count()
+
+            try:
+                test(directory)
+            finally:
+                profiling.get_config = original_get_config
+                shutil.rmtree(directory)
+
+        wrapper.__name__ = test.__name__
+        return wrapper
+    return decorator
+
+
+@with_config(profile_sample_rate=0, profile_threshold_ms=0)
+def test_nothing_saved_when_off(directory):
+    eq_(Resolver().resolve(0), {'jquery': 'static-1.2'})
+    eq_(os.listdir(directory), [])
+
+@with_config(profile_sample_rate=1, profile_threshold_ms=10000)
+def test_nothing_saved_under_threshold(directory):
+    eq_(Resolver().resolve(0), {'jquery': 'static-1.2'})
+    eq_(os.listdir(directory), [])
+
+@with_config(profile_sample_rate=1, profile_threshold_ms=10)
+def test_slow_call_saves_profile_and_details(directory):
+    eq_(Resolver().resolve(0.02), {'jquery': 'static-1.2'})
+
+    file_names = sorted(os.listdir(directory))
+    eq_(len(file_names), 2)
+    ok_(file_names[0].startswith('resolve-') and file_names[0].endswith('.json'))
+    ok_(file_names[1].endswith('.prof'))
+
+    with open(os.path.join(directory, file_names[0])) as f:
+        details = json.load(f)
+
+    eq_(details['name'], 'resolve')
+    eq_(details['bundle_paths'], Resolver.bundle_paths)
+    eq_(details['resolved_versions'], {'jquery': 'static-1.2'})
+    ok_(details['elapsed_ms'] >= 10)
+
+@with_config(profile_sample_rate=1, profile_threshold_ms=0, profile_max_dumps=1)
+def test_dumps_are_capped(directory):
+    Resolver().resolve(0)
+    Resolver().resolve(0)
+    eq_(len(os.listdir(directory)), 2)
+
+@with_config(profile_sample_rate=1, profile_threshold_ms=0)
+def test_profiled_calls_fetch_on_their_own_thread(directory):
+    config = profiling.get_config()
+    threaded_config = BenderConfig(**dict([(name, getattr(config, name)) for name in BenderConfig.__slots__],
+                                          fetch_executor='threads', fetch_concurrency=4))
+    executor_kinds = []
+
+    class Fetcher(object):
+        @profiling.profiled('fetch')
+        def fetch(self):
+            executor_kinds.append(type(executors.get_executor()))
+
+    original_get_config = executors.get_config
+    executors.get_config = lambda: threaded_config
+
+    try:
+        executor_kinds.append(type(executors.get_executor()))
+        Fetcher().fetch()
+    finally:
+        executors.get_config = original_get_config
+
+    eq_(executor_kinds, [executors.ThreadPoolExecutor, executors.SerialExecutor])
@@ -0,0 +1,48 @@
+import json
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_, ok_
+
+from asset_bender.snapshots import DependencySnapshot, SnapshotChange, diff_dependency_versions, load_prebuilt_versions
+
+
+def test_diff_dependency_versions():
+    resolved = {'jquery': 'static-1.3', 'style_guide': 'static-3.40', 'my_app': 'static-1.10', 'new_dep': 'static-1.0'}
+    frozen = {'jquery': 'static-1.2', 'style_guide': 'static-3.40', 'my_app': 'static-1.9.1', 'old_dep': 'static-2.0'}
+    prebuilt = {'jquery': 'static-1.2'}
+
+    eq_(diff_dependency_versions(resolved, frozen, prebuilt), [
+        SnapshotChange('jquery', 'upgraded', 'static-1.2', 'static-1.2', 'static-1.3'),
+        SnapshotChange('my_app', 'upgraded', 'static-1.9.1', None, 'static-1.10'),
+        SnapshotChange('new_dep', 'added', None, None, 'static-1.0'),
+        SnapshotChange('old_dep', 'removed', 'static-2.0', None, None),
+    ])
+
+    eq_(diff_dependency_versions({'jquery': 'static-1.2'}, {'jquery': 'static-1.3'})[0].change, 'downgraded')
+    eq_(diff_dependency_versions(resolved, resolved), [])
+
+def test_snapshot_output():
+    snapshot = DependencySnapshot({'jquery': 'static-1.3', 'style_guide': 'static-3.40'},
+                                  {'jquery': 'static-1.2', 'style_guide': 'static-3.40'}, {}, seconds=0.5)
+
+    ok_(snapshot.has_changes)
+    eq_(snapshot.format_diff(), "1 of 2 projects changed from the frozen snapshot:\n    jquery: static-1.2 -> static-1.3 (upgraded)")
+
+    data = json.loads(json.dumps(snapshot.as_dict()))
+    eq_(data['unchanged'], 1)
+    eq_(data['changes'], [{'project_name': 'jquery', 'change': 'upgraded', 'frozen': 'static-1.2', 'prebuilt': None, 'resolved': 'static-1.3'}])
+
+def test_load_prebuilt_versions():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'prebuilt_recursive_static_conf.json')
+
+    try:
+        with open(path, 'w') as f:
+            json.dump({'build': '1.5', 'deps': {'jquery': 'static-1.2'}}, f)
+
+        eq_(load_prebuilt_versions(path, 'my_app'), {'jquery': 'static-1.2', 'my_app': 'static-1.5'})
+        eq_(load_prebuilt_versions(os.path.join(directory, 'missing.json'), 'my_app'), {})
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,118 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+import threading
+import time
+
+from django.test.utils import override_settings
+from nose.tools import eq_, ok_
+
+from asset_bender import bundling
+from asset_bender.bundling import BenderAssets, Scaffold
+from asset_bender.tools.fakes import install_in_memory_caches
+
+
+class FakeBuilds(object):
+    '''
+    Stands in for BenderAssets._build_scaffold, returning (or raising) the given results
+    in order. Builds wait until `release` is set.
+    '''
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def build(self, bender_assets):
+        self.release.wait(5)
+        self.calls += 1
+        result = self.results.pop(0)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+def with_fake_builds(test):
+    def wrapper():
+        restore_caches = install_in_memory_caches()
+        original_build_scaffold = BenderAssets._build_scaffold
+
+        try:
+            test()
+        finally:
+            BenderAssets._build_scaffold = original_build_scaffold
+            restore_caches()
+
+    wrapper.__name__ = test.__name__
+    return override_settings(BENDER_LOCAL_MODE=False, DEFAULT_ASSET_BENDER_BUNDLES=[], BENDER_SCAFFOLD_MAX_AGE=60)(wrapper)
+
+def install_builds(*results):
+    builds = FakeBuilds(*results)
+    BenderAssets._build_scaffold = lambda bender_assets: builds.build(bender_assets)
+    return builds
+
+def labelled_scaffold(label):
+    # The caches pickle the scaffolds, so they are told apart by label
+    scaffold = Scaffold()
+    scaffold.label = label
+    return scaffold
+
+def new_bender_assets():
+    return BenderAssets(['my_app/static/js/app.js'])
+
+def cache_stale_scaffold():
+    scaffold = labelled_scaffold('stale')
+    scaffold.built_at = time.time() - 3600
+    bundling.get_scaffold_cache().set(scaffold, scaffold_key=new_bender_assets()._get_scaffold_cache_key())
+
+def wait_for_rebuilds():
+    for i in range(500):
+        if not bundling._scaffolds_being_rebuilt:
+            return
+
+        time.sleep(0.01)
+
+    ok_(False, "The background rebuild didn't finish")
+
+def cached_label():
+    return bundling.get_scaffold_cache().get(scaffold_key=new_bender_assets()._get_scaffold_cache_key()).label
+
+
+@with_fake_builds
+def test_cold_miss_builds_synchronously():
+    builds = install_builds(labelled_scaffold('new'))
+
+    eq_(new_bender_assets().generate_scaffold().label, 'new')
+    eq_(builds.calls, 1)
+    eq_(cached_label(), 'new')
+
+@with_fake_builds
+def test_stale_scaffold_is_served_while_one_rebuild_runs():
+    cache_stale_scaffold()
+    builds = install_builds(labelled_scaffold('new'))
+    builds.release.clear()
+
+    for i in range(3):
+        eq_(new_bender_assets().generate_scaffold().label, 'stale')
+
+    builds.release.set()
+    wait_for_rebuilds()
+
+    eq_(builds.calls, 1)
+    eq_(cached_label(), 'new')
+    eq_(new_bender_assets().generate_scaffold().label, 'new')
+
+@with_fake_builds
+def test_failed_rebuilds_keep_the_stale_scaffold():
+    cache_stale_scaffold()
+    incomplete_scaffold = labelled_scaffold('incomplete')
+    incomplete_scaffold.missing_bundles = ['my_app/static/js/app.js']
+    builds = install_builds(ValueError("S3 is down"), incomplete_scaffold)
+
+    for i in range(2):
+        eq_(new_bender_assets().generate_scaffold().label, 'stale')
+        wait_for_rebuilds()
+        eq_(cached_label(), 'stale')
+
+    eq_(builds.calls, 2)
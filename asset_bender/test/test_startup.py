@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+from nose.tools import eq_
+
+
+def test_importing_bundling_has_no_side_effects():
+    # In a fresh process, since the test run has already imported everything
+    script = '; '.join([
+        'import sys',
+        'import asset_bender.bundling',
+        'from asset_bender import bundling, config',
+        'print [module for module in ("requests", "hscacheutils.raw_cache", "hscacheutils.setting_wrappers") if sys.modules.get(module)]',
+        'print bundling.project_version_cache, bundling.scaffold_cache, bundling._host_name, config._config',
+    ])
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, env=env).communicate()[0]
+
+    eq_(output.splitlines(), ['[]', 'None None None None'])
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+from nose.tools import eq_, ok_
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+
+def test_startup_benchmark_in_a_fresh_process():
+    # In a fresh process, since the test run has already imported the deferred modules
+    script = '; '.join([
+        'from asset_bender.test.django_settings import configure_test_settings',
+        'configure_test_settings()',
+        'import json',
+        'from asset_bender.tools import startup_benchmark',
+        'results = startup_benchmark.measure_import()',
+        'results["durations"] = startup_benchmark.measure_first_requests(2)',
+        'print json.dumps(results)',
+    ])
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    env.pop('DJANGO_SETTINGS_MODULE', None)
+    output = subprocess.Popen([sys.executable, '-c', script], stdout=subprocess.PIPE, env=env).communicate()[0]
+    results = json.loads(output.splitlines()[-1])
+
+    eq_(results['deferred_modules_loaded'], [])
+    ok_(results['import_seconds'] >= 0)
+    ok_(results['modules_loaded'] > 0)
+    eq_(len(results['durations']), 2)
+    ok_(all(duration >= 0 for duration in results['durations']))
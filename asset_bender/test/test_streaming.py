@@ -0,0 +1,90 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+import os
+import shutil
+import tempfile
+
+from django.http import HttpRequest, HttpResponse
+from django.test.utils import override_settings
+from nose.tools import eq_, ok_
+
+from asset_bender.bundling import Scaffold, SCAFFOLD_CONTEXT_NAME
+from asset_bender.middleware import PreloadHeadersMiddleware, add_preload_headers
+from asset_bender.streaming import stream_bender_page, streaming_bender_response
+
+
+class FakeBenderAssets(object):
+    def __init__(self):
+        self.scaffold = Scaffold()
+        self.scaffold.add_head_css_html('<link href="//static.example.com/app/static-1.0/css/app.css" rel="stylesheet">', 'app.css')
+        self.scaffold.add_footer_js_html('<script src="//static.example.com/app/static-1.0/js/app.js"></script>', 'app.js')
+
+    def generate_context_dict(self):
+        return {SCAFFOLD_CONTEXT_NAME: self.scaffold}
+
+    def generate_scaffold(self):
+        return self.scaffold
+
+    def get_prefixed_domain(self):
+        return '//static.example.com'
+
+def test_head_is_streamed_before_the_body_is_rendered():
+    directory = tempfile.mkdtemp()
+    rendered = []
+
+    with open(os.path.join(directory, 'page_head.html'), 'w') as f:
+        f.write('<html><head><title>{{ title }}</title>{% include "asset_bender/scaffold/head.html" %}</head><body>')
+
+    def render_body():
+        rendered.append(True)
+        return '<p>Body</p>'
+
+    try:
+        with override_settings(TEMPLATE_DIRS=(directory,)):
+            chunks = stream_bender_page(HttpRequest(), FakeBenderAssets(), 'page_head.html', render_body, {'title': 'Hi'})
+
+            head = next(chunks)
+            ok_('<title>Hi</title>' in head)
+            ok_('css/app.css' in head)
+            ok_('js/app.js' not in head)
+            eq_(rendered, [])
+
+            rest = list(chunks)
+            eq_(rest[0], '<p>Body</p>')
+            ok_('js/app.js' in rest[1])
+            eq_(rest[2], '\n</body>\n</html>\n')
+    finally:
+        shutil.rmtree(directory)
+
+@override_settings(BENDER_EARLY_HINTS=True)
+def test_early_hints_are_sent_before_streaming():
+    hints = []
+    request = HttpRequest()
+    request.META['wsgi.early_hints'] = hints.append
+
+    streaming_bender_response(request, FakeBenderAssets(), 'page_head.html', lambda: '<p>Body</p>')
+    streaming_bender_response(request, FakeBenderAssets(), 'page_head.html', lambda: '<p>Body</p>')
+
+    eq_(hints, [[
+        ('Link', '<//static.example.com>; rel=preconnect'),
+        ('Link', '<//static.example.com/app/static-1.0/css/app.css>; rel=preload; as=style'),
+    ]])
+
+def test_streamed_responses_get_preload_headers():
+    response = streaming_bender_response(HttpRequest(), FakeBenderAssets(), 'page_head.html', lambda: '<p>Body</p>')
+
+    eq_(response['Link'], '<//static.example.com>; rel=preconnect, '
+                          '<//static.example.com/app/static-1.0/css/app.css>; rel=preload; as=style')
+
+def test_preload_headers_are_only_added_once():
+    preloads = '<//static.example.com>; rel=preconnect, <//static.example.com/app/static-1.0/css/app.css>; rel=preload; as=style'
+    request = HttpRequest()
+    request.bender_assets = FakeBenderAssets()
+
+    response = streaming_bender_response(request, request.bender_assets, 'page_head.html', lambda: '<p>Body</p>')
+    eq_(PreloadHeadersMiddleware().process_response(request, response)['Link'], preloads)
+
+    # What the fallback for Django < 1.5 returns, a plain HttpResponse
+    response = add_preload_headers(HttpResponse('<html>'), request.bender_assets)
+    eq_(PreloadHeadersMiddleware().process_response(request, response)['Link'], preloads)
@@ -0,0 +1,190 @@
+from asset_bender.test.django_settings import configure_test_settings
+configure_test_settings()
+
+import os
+import shutil
+import tempfile
+import threading
+
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from nose.tools import eq_, ok_, assert_raises
+from requests import HTTPError, Timeout
+
+from asset_bender import tracing
+from asset_bender.config import BenderConfig
+from asset_bender.middleware import TraceMiddleware
+from asset_bender.tools.fakes import RecordedOrigin
+
+
+class FakeBenderAssets(object):
+    host_project_name = 'my_app'
+    included_bundle_paths = ['style_guide/static/js/style_guide.js', 'my_app/static/js/app.js']
+    is_debug = True
+    use_local_daemon = False
+    forced_build_version_by_project = {'jquery': 'static-1.3'}
+
+
+def with_config(**values):
+    '''
+    Runs the test with a tracing config and a scratch trace file (its path is passed to the test)
+    '''
+    def decorator(test):
+        def wrapper():
+            directory = tempfile.mkdtemp()
+            path = os.path.join(directory, 'traces.jsonl')
+            config = BenderConfig(
+                cdn_domain='static.example.com',
+                s3_domain='s3.example.com',
+                daemon_domain='localhost:3333',
+                combo_max_url_length=2000,
+                preload_max_assets=20,
+                fetch_executor='serial',
+                fetch_concurrency=1,
+                profile_sample_rate=0,
+                trace_sample_rate=values.get('trace_sample_rate', 1),
+                trace_path=path,
+                trace_max_bytes=values.get('trace_max_bytes', 1024 * 1024))
+
+            original_get_config = tracing.get_config
+            tracing.get_config = lambda: config
+
+            try:
+                test(path)
+            finally:
+                tracing._local.trace = None
+                tracing._local.in_request = False
+                tracing.get_config = original_get_config
+                shutil.rmtree(directory)
+
+        wrapper.__name__ = test.__name__
+        return wrapper
+
+    return decorator
+
+
+@with_config()
+def test_sampled_request_is_written_when_finished(path):
+    params = {'hsDebug': 'true', 'forceBuildFor-jquery': 'static-1.3', 'utm_source': 'email'}
+    ok_(tracing.start_trace(FakeBenderAssets(), params) is not None)
+
+    tracing.trace_event('fetch', 'http://static.example.com/jquery/current-qa', 'pointer', 200, 0.012, 'static-1.3')
+
+    # Events from the executor pools end up in the same trace
+    record_from_pool = tracing.propagate_trace(lambda: tracing.trace_event('cache', 'project_version', 1))
+    thread = threading.Thread(target=record_from_pool)
+    thread.start()
+    thread.join()
+
+    ok_(tracing.finish_trace() is not None)
+    eq_(tracing.finish_trace(), None)
+
+    traces = tracing.load_traces(path)
+    eq_(len(traces), 1)
+    eq_(traces[0]['host'], 'my_app')
+    eq_(traces[0]['params'], {'hsDebug': 'true', 'forceBuildFor-jquery': 'static-1.3'})
+    eq_(traces[0]['forced'], {'jquery': 'static-1.3'})
+    eq_([event[1:] for event in traces[0]['events']], [
+        ['fetch', 'http://static.example.com/jquery/current-qa', 'pointer', 200, 0.012, 'static-1.3'],
+        ['cache', 'project_version', 1],
+    ])
+
+@with_config(trace_sample_rate=0)
+def test_nothing_is_recorded_when_off(path):
+    eq_(tracing.start_trace(FakeBenderAssets(), {}), None)
+    tracing.trace_event('cache', 'scaffold', 0)
+    eq_(tracing.finish_trace(), None)
+    ok_(not os.path.exists(path))
+
+@with_config(trace_max_bytes=10)
+def test_trace_file_is_capped(path):
+    for i in range(3):
+        tracing.start_trace(FakeBenderAssets(), {})
+        tracing.finish_trace()
+
+    # A partially written line is skipped
+    with open(path, 'a') as f:
+        f.write('{"v": 1, "host": "my_a')
+
+    eq_(len(tracing.load_traces(path)), 1)
+
+class ImplicitBenderAssets(FakeBenderAssets):
+    included_bundle_paths = []
+    is_debug = False
+    forced_build_version_by_project = None
+
+@with_config()
+def test_bender_assets_of_a_request_share_its_trace(path):
+    request = HttpRequest()
+    TraceMiddleware().process_request(request)
+
+    trace = tracing.start_trace(FakeBenderAssets(), {'hsDebug': 'true'})
+    tracing.trace_event('cache', 'scaffold', 1)
+
+    # Like the one the static_url tag makes
+    ok_(tracing.start_trace(ImplicitBenderAssets(), {}) is trace)
+    tracing.trace_event('cache', 'project_version', 0)
+
+    TraceMiddleware().process_response(request, HttpResponse('<html>'))
+
+    traces = tracing.load_traces(path)
+    eq_(len(traces), 1)
+    eq_(traces[0]['bundles'], FakeBenderAssets.included_bundle_paths)
+    eq_(traces[0]['debug'], True)
+    eq_(traces[0]['params'], {'hsDebug': 'true'})
+    eq_([event[1:] for event in traces[0]['events']], [['cache', 'scaffold', 1], ['cache', 'project_version', 0]])
+
+    # Outside of a request each one starts its own
+    trace = tracing.start_trace(FakeBenderAssets(), {})
+    ok_(tracing.start_trace(ImplicitBenderAssets(), {}) is not trace)
+    tracing.finish_trace()
+    eq_(len(tracing.load_traces(path)), 3)
+
+@with_config()
+def test_streamed_responses_are_traced_until_the_body_is_sent(path):
+    def body():
+        tracing.trace_event('cache', 'scaffold', 1)
+        yield '<html>'
+
+    tracing.start_trace(FakeBenderAssets(), {})
+    response = TraceMiddleware().process_response(HttpRequest(), StreamingHttpResponse(body()))
+    ok_(tracing.current_trace() is not None)
+
+    eq_(list(response.streaming_content), ['<html>'])
+    response.close()
+    eq_(tracing.current_trace(), None)
+
+    traces = tracing.load_traces(path)
+    eq_(len(traces), 1)
+    eq_([event[1:] for event in traces[0]['events']], [['cache', 'scaffold', 1]])
+
+    # Other responses finish it right away
+    tracing.start_trace(FakeBenderAssets(), {})
+    TraceMiddleware().process_response(HttpRequest(), HttpResponse('<html>'))
+    eq_(len(tracing.load_traces(path)), 2)
+
+def test_recorded_origin_replays_outcomes_in_order():
+    pointer_url = 'http://static.example.com/jquery/current-qa'
+    traces = [{'events': [
+        [0.01, 'fetch', pointer_url, 'pointer', 'timeout', 0.001, None],
+        [0.02, 'fetch', pointer_url, 'pointer', 200, 0.001, 'static-1.4'],
+        [0.03, 'fetch', 'http://static.example.com/my_app/static-2.0/js/app.js.bundle.html', 'bundle', 503, 0.001, None],
+        [0.04, 'versions', {'jquery': 'static-1.4', 'style_guide': 'static-3.1'}],
+    ]}]
+    origin = RecordedOrigin(traces)
+
+    # The prod pointer url replays the QA recording
+    assert_raises(Timeout, origin.download_url, 'http://s3.example.com/jquery/current')
+    eq_(origin.download_url('http://s3.example.com/jquery/current').text, 'static-1.4')
+    eq_(origin.download_url('http://s3.example.com/jquery/current').text, 'static-1.4')
+
+    try:
+        origin.download_url('http://static.example.com/my_app/static-2.0/js/app.js.bundle.html')
+    except HTTPError as e:
+        eq_(e.response.status_code, 503)
+    else:
+        ok_(False, "The recorded 503 wasn't replayed")
+
+    # Urls that weren't recorded resolve to the recorded versions
+    eq_(origin.download_url('http://static.example.com/style_guide/current-qa').text, 'static-3.1')
+    eq_(origin.unrecorded_fetches, 1)
+    eq_(origin.errors, 2)
@@ -0,0 +1,48 @@
+from nose.tools import eq_, ok_
+from nose.tools import assert_raises
+
+from asset_bender.versions import BuildVersion, VersionPointer, maximum_build_name, resolve_maximum_versions
+
+
+def test_parse_is_interned():
+    ok_(BuildVersion.parse('static-1.4') is BuildVersion.parse('static-1.4'))
+    eq_(BuildVersion.parse('static-1.4.123').parts, (1, 4, 123))
+    eq_(BuildVersion.parse('1.4').parts, (1, 4))
+
+def test_invalid_build_name():
+    assert_raises(ValueError, BuildVersion.parse, 'static-current')
+    assert_raises(ValueError, BuildVersion.parse, 'static-')
+
+def test_ordering():
+    ok_(BuildVersion.parse('static-1.0') < BuildVersion.parse('static-1.1'))
+    ok_(BuildVersion.parse('static-2.0') > BuildVersion.parse('static-1.1'))
+    ok_(BuildVersion.parse('static-1.10') > BuildVersion.parse('static-1.9'))
+    ok_(BuildVersion.parse('static-1.4.2') > BuildVersion.parse('static-1.4.1'))
+    eq_(BuildVersion.parse('static-3.4'), BuildVersion.parse('3.4'))
+
+def test_maximum_build_name():
+    eq_(maximum_build_name('static-1.9', '', 'static-1.10', None), 'static-1.10')
+    eq_(maximum_build_name('static-3.4.1', 'static-3.4'), 'static-3.4.1')
+    eq_(maximum_build_name('', None), None)
+
+def test_version_pointers():
+    specific = VersionPointer.parse('static-4.59')
+    ok_(specific.is_specific_build)
+    eq_(specific.build, BuildVersion.parse('static-4.59'))
+
+    major = VersionPointer.parse('3')
+    eq_(major.kind, VersionPointer.MAJOR_VERSION)
+    eq_(major.pointer_name, 'latest-version-3')
+    eq_(VersionPointer.parse(3).pointer_name, 'latest-version-3')
+
+    named = VersionPointer.parse('edge')
+    ok_(not named.is_specific_build)
+    eq_(named.pointer_name, 'edge')
+
+def test_resolve_maximum_versions():
+    resolved = resolve_maximum_versions({
+        'a': ('static-1.2', 'static-1.3', ''),
+        'b': ('static-2.0',),
+        'c': ('', None),
+    })
+    eq_(resolved, {'a': 'static-1.3', 'b': 'static-2.0'})
@@ -0,0 +1,332 @@
+'''
+In-memory stand-ins for memcache and the Asset Bender origin (S3), used by the
+load test and replay tools to exercise the real code paths without any network.
+'''
+import cPickle as pickle
+import os
+import random
+import re
+import threading
+import time
+import urlparse
+from collections import defaultdict
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from requests import ConnectionError, HTTPError, Response, Timeout
+
+from asset_bender import http
+from asset_bender import bundling
+
+
+class InMemoryGenCache(object):
+    '''
+    A thread-safe, in-memory replacement for BatchingGenCache (get/get_many/set/invalidate with
+    the same generation semantics). Values are pickled like they would be in memcache,
+    and every call can be given some latency to simulate the memcache round trip.
+    '''
+
+    def __init__(self, generation_names, latency=0):
+        self.generation_names = generation_names
+        self.latency = latency
+
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+
+        self._generations = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, **kwargs):
+        self._simulate_latency()
+
+        with self._lock:
+            value = self._values.get(self._build_key(kwargs))
+
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if value is not None:
+            return pickle.loads(value)
+
+    def get_many(self, kwargs_list):
+        self._simulate_latency()
+        values = []
+
+        with self._lock:
+            for kwargs in kwargs_list:
+                value = self._values.get(self._build_key(kwargs))
+                values.append(value)
+
+                if value is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+
+        return [pickle.loads(value) if value is not None else None for value in values]
+
+    def set(self, value, **kwargs):
+        kwargs.pop('timeout', None)
+        self._simulate_latency()
+        pickled_value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self.sets += 1
+            self._values[self._build_key(kwargs)] = pickled_value
+
+    def invalidate(self, generation=None, **kwargs):
+        if generation is None:
+            for key in kwargs.keys():
+                for name in self.generation_names:
+                    if name.endswith(':' + key):
+                        generation = name
+
+        self._simulate_latency()
+
+        with self._lock:
+            self.invalidations += 1
+            generation_key = self._generation_key(generation, kwargs)
+            self._generations[generation_key] = self._generations.get(generation_key, 0) + 1
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    def _generation_key(self, generation, kwargs):
+        name, _, param = generation.partition(':')
+        return (name, kwargs.get(param)) if param else (name, None)
+
+    def _build_key(self, kwargs):
+        generations = tuple([self._generations.get(self._generation_key(name, kwargs), 0) for name in self.generation_names])
+        return (generations, tuple(sorted(kwargs.items())))
+
+    def _simulate_latency(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class StubOrigin(object):
+    '''
+    Replaces asset_bender.http._download_url with a latency-injected fake of S3/the CDN:
+
+        - version pointers (eg. /<project>/current-qa) return a build name
+        - bundle html (/<project>/<build>/<path>.bundle[-expanded].html) returns a couple of includes
+
+    and keeps track of every fetch, including duplicate fetches of the same url and
+    "stampedes" (a fetch that starts while another fetch of the same url is in flight).
+    '''
+    bundle_url_regex = re.compile(r'^https?://[^/]+/([^/]+)/([^/]+)/(.*)\.bundle(-expanded)?\.html$')
+
+    def __init__(self, latency=0.02, jitter=0.0, build_for_project=None, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.build_for_project = build_for_project or {}
+
+        self.fetches = defaultdict(int)
+        self.stampedes = 0
+        self.errors = 0
+
+        self._in_flight = defaultdict(int)
+        self._lock = threading.Lock()
+        self._original_download_url = None
+
+    def install(self):
+        self._original_download_url = http._download_url
+        http._download_url = self.download_url
+
+    def uninstall(self):
+        if self._original_download_url is not None:
+            http._download_url = self._original_download_url
+            self._original_download_url = None
+
+    def download_url(self, url, timeout=None, **kwargs):
+        with self._lock:
+            self.fetches[url] += 1
+
+            if self._in_flight[url]:
+                self.stampedes += 1
+
+            self._in_flight[url] += 1
+
+        try:
+            delay, error, content = self._next_outcome(url)
+
+            if timeout and delay > timeout:
+                time.sleep(timeout)
+                raise Timeout("Stub origin timed out after %ss: %s" % (timeout, url))
+
+            time.sleep(delay)
+
+            if error is not None:
+                with self._lock:
+                    self.errors += 1
+                raise error
+
+            return self._build_response(url, content)
+        finally:
+            with self._lock:
+                self._in_flight[url] -= 1
+
+    def total_fetches(self):
+        return sum(self.fetches.values())
+
+    def duplicate_fetches(self):
+        return sum([count - 1 for count in self.fetches.values() if count > 1])
+
+    def _next_outcome(self, url):
+        '''
+        Returns the (delay, exception to raise or None, content or None) of a fetch. If the
+        content is None, it is made up from the url.
+        '''
+        delay = self.latency + random.uniform(0, self.jitter)
+
+        if self.error_rate and random.random() < self.error_rate:
+            return delay, ConnectionError("Stub origin error for: %s" % url), None
+
+        return delay, None, None
+
+    def _build_response(self, url, content=None, status_code=200):
+        result = Response()
+        result.status_code = status_code
+        result.url = url
+        result.encoding = 'utf-8'
+
+        if content is None:
+            content = self._content_for(url)
+
+        result._content = content.encode('utf-8')
+        return result
+
+    def _content_for(self, url):
+        match = self.bundle_url_regex.match(url)
+
+        if match:
+            project_name, build, path, expanded = match.groups()
+
+            if path.endswith('.css'):
+                return '<link href="/%s/%s/%s.css" rel="stylesheet" type="text/css" />\n' \
+                       '<link href="/style_guide/%s/css/style_guide.css" rel="stylesheet" type="text/css" />' % (project_name, build, path, build)
+            else:
+                return '<script src="/%s/%s/%s.js"></script>\n' \
+                       '<script src="/jquery/%s/js/jquery.js"></script>' % (project_name, build, path, build)
+
+        # Anything else is treated as a version pointer
+        project_name = url.rstrip('/').split('/')[-2]
+        return self.build_for_project.get(project_name, 'static-1.0')
+
+
+def recorded_url_key(url):
+    '''
+    What recorded fetches are matched by: the path of the url, without the "-qa" of pointers
+    (so traces from QA can be replayed with prod settings, and the other way around)
+    '''
+    path = urlparse.urlparse(url).path
+
+    if path.endswith('-qa'):
+        path = path[:-len('-qa')]
+
+    return path
+
+
+class RecordedOrigin(StubOrigin):
+    '''
+    A StubOrigin that replays the fetches recorded in traces (see asset_bender.tracing). Each
+    url gets its recorded outcomes (latency, status or error, and pointer body) in order,
+    and the last one again once they run out. Urls that weren't recorded get the median
+    recorded latency, and pointers the build the traces resolved.
+
+    Bundle html isn't recorded, so it is made up like StubOrigin does.
+    '''
+
+    def __init__(self, traces, latency_scale=1.0, **kwargs):
+        recorded_outcomes = defaultdict(list)
+        build_for_project = {}
+
+        for trace in traces:
+            for event in trace.get('events', ()):
+                if event[1] == 'fetch':
+                    url, request_type, status, seconds, body = event[2:7]
+                    recorded_outcomes[recorded_url_key(url)].append((seconds, status, body))
+                elif event[1] in ('resolve', 'versions'):
+                    build_for_project.update(event[2])
+
+        latencies = sorted([seconds for outcomes in recorded_outcomes.values() for seconds, status, body in outcomes])
+        kwargs.setdefault('latency', latencies[len(latencies) / 2] * latency_scale if latencies else 0)
+
+        super(RecordedOrigin, self).__init__(build_for_project=build_for_project, **kwargs)
+
+        self.latency_scale = latency_scale
+        self.recorded_outcomes = dict(recorded_outcomes)
+        self.unrecorded_fetches = 0
+
+        self._replay_positions = defaultdict(int)
+
+    def _next_outcome(self, url):
+        key = recorded_url_key(url)
+        outcomes = self.recorded_outcomes.get(key)
+
+        if not outcomes:
+            with self._lock:
+                self.unrecorded_fetches += 1
+
+            return super(RecordedOrigin, self)._next_outcome(url)
+
+        with self._lock:
+            position = self._replay_positions[key]
+            self._replay_positions[key] += 1
+
+        seconds, status, body = outcomes[min(position, len(outcomes) - 1)]
+        return seconds * self.latency_scale, self._recorded_error(url, status), body
+
+    def _recorded_error(self, url, status):
+        if isinstance(status, (int, long)) and 200 <= status < 400:
+            return None
+        elif isinstance(status, (int, long)):
+            response = self._build_response(url, '', status_code=status)
+            return HTTPError("Recorded %s error for: %s" % (status, url), response=response)
+        elif status == 'timeout':
+            return Timeout("Recorded timeout for: %s" % url)
+        else:
+            return ConnectionError("Recorded %s error for: %s" % (status, url))
+
+
+def install_in_memory_caches(cache_latency=0):
+    '''
+    Swaps the project version and scaffold caches for in-memory fakes. Returns a
+    function that restores the originals.
+    '''
+    original_caches = (bundling.project_version_cache, bundling.scaffold_cache, bundling.last_complete_scaffold_cache)
+
+    bundling.project_version_cache = InMemoryGenCache(['static_build_name_for:project', 'static_deps_for_project:host_project'], latency=cache_latency)
+    bundling.scaffold_cache = InMemoryGenCache(['bender_all_scaffolds', 'bender_scaffold_for_project:scaffold_key'], latency=cache_latency)
+    bundling.last_complete_scaffold_cache = InMemoryGenCache(['bender_last_complete_scaffold:scaffold_key'], latency=cache_latency)
+
+    def restore():
+        bundling.project_version_cache, bundling.scaffold_cache, bundling.last_complete_scaffold_cache = original_caches
+
+    return restore
+
+
+def write_fake_project(directory, deps, build='1'):
+    '''
+    Writes the static_conf.json and prebuilt_recursive_static_conf.json that a built
+    project would have into directory/static (deps is a dict of project name -> version)
+    '''
+    static_directory = os.path.join(directory, 'static')
+
+    if not os.path.isdir(static_directory):
+        os.makedirs(static_directory)
+
+    with open(os.path.join(static_directory, 'static_conf.json'), 'w') as f:
+        json.dump({'deps': deps}, f)
+
+    with open(os.path.join(static_directory, 'prebuilt_recursive_static_conf.json'), 'w') as f:
+        json.dump({'build': build, 'deps': {}}, f)
@@ -0,0 +1,207 @@
+'''
+Drives many threads through the full context processor path (BenderAssets ->
+generate_context_dict -> rendering the scaffold and the boilerplate js config)
+against an in-memory cache and a latency-injected stub origin, and reports
+throughput, tail latency, duplicate origin fetches and cache stampedes.
+
+Run it from within your app's environment (so the Django settings are configured):
+
+    DJANGO_SETTINGS_MODULE=my_app.settings python -m asset_bender.tools.loadtest \\
+        --threads 16 --requests 100 --origin-latency 0.05 --invalidate-every 200
+'''
+import argparse
+import logging
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender import bundling
+from asset_bender.tools.fakes import StubOrigin, install_in_memory_caches, write_fake_project
+
+
+LOAD_TEST_PROJECT_NAME = 'load_test_app'
+
+DEFAULT_BUNDLES = (
+    'style_guide/static/css/style_guide.css',
+    'style_guide/static/js/style_guide.js',
+    'load_test_app/static/js/app.js',
+)
+
+DEFAULT_DEPS = {
+    'style_guide': 'current',
+    'jquery': '1',
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def render_like_a_request(bundle_paths, http_get_params=None):
+    '''
+    Does what a request does with Asset Bender: the context processor, then rendering
+    the head, end of body, and boilerplate js
+    '''
+    bender_assets = bundling.BenderAssets(bundle_paths, http_get_params or {})
+    context = bender_assets.generate_context_dict()
+
+    scaffold = context[bundling.SCAFFOLD_CONTEXT_NAME]
+    scaffold.header_css_html()
+    scaffold.header_js_html()
+    scaffold.footer_js_html()
+
+    bender_assets.get_dependency_js_config()
+
+def run_load_test(threads=8, requests_per_thread=50, bundle_paths=DEFAULT_BUNDLES, deps=DEFAULT_DEPS,
+                  origin_latency=0.02, origin_jitter=0.0, cache_latency=0.0, invalidate_every=None):
+    '''
+    Runs the load test and returns a dict with the results. If invalidate_every is set,
+    invalidate_cache_for_deploy is called after every that many requests (across all threads).
+
+    The requests are made from a scratch project (with deps in its static_conf.json), so
+    the host app's own static conf doesn't matter.
+    '''
+    from django.test.utils import override_settings
+
+    project_directory = tempfile.mkdtemp(prefix='asset_bender_load_test')
+    write_fake_project(project_directory, deps)
+
+    origin = StubOrigin(latency=origin_latency, jitter=origin_jitter)
+    restore_caches = install_in_memory_caches(cache_latency=cache_latency)
+    origin.install()
+
+    # Always go through the S3 fetcher (and not a local daemon)
+    settings_override = override_settings(
+        PROJ_NAME=LOAD_TEST_PROJECT_NAME,
+        PROJ_DIR=project_directory,
+        BENDER_LOCAL_MODE=False,
+        BENDER_LOCAL_PROJECT_MODE=False)
+    settings_override.enable()
+
+    latencies = []
+    errors = []
+    request_count = [0]
+    invalidations = [0]
+    lock = threading.Lock()
+    start_event = threading.Event()
+
+    def worker():
+        start_event.wait()
+
+        for i in range(requests_per_thread):
+            start = time.time()
+
+            try:
+                render_like_a_request(bundle_paths)
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+
+            elapsed = time.time() - start
+
+            with lock:
+                latencies.append(elapsed)
+                request_count[0] += 1
+                should_invalidate = invalidate_every and request_count[0] % invalidate_every == 0
+
+            if should_invalidate:
+                bundling.invalidate_cache_for_deploy(LOAD_TEST_PROJECT_NAME)
+
+                with lock:
+                    invalidations[0] += 1
+
+    try:
+        worker_threads = [threading.Thread(target=worker) for i in range(threads)]
+
+        for thread in worker_threads:
+            thread.start()
+
+        start = time.time()
+        start_event.set()
+
+        for thread in worker_threads:
+            thread.join()
+
+        total_time = time.time() - start
+    finally:
+        settings_override.disable()
+        origin.uninstall()
+        caches = (bundling.project_version_cache, bundling.scaffold_cache)
+        restore_caches()
+        shutil.rmtree(project_directory, ignore_errors=True)
+
+    latencies.sort()
+    project_version_cache, scaffold_cache = caches
+
+    return {
+        'threads': threads,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'seconds': total_time,
+        'requests_per_second': len(latencies) / total_time if total_time else 0.0,
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p90': percentile(latencies, 0.90),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_max': latencies[-1] if latencies else 0.0,
+        'origin_fetches': origin.total_fetches(),
+        'unique_origin_urls': len(origin.fetches),
+        'duplicate_origin_fetches': origin.duplicate_fetches(),
+        'stampedes': origin.stampedes,
+        'invalidations': invalidations[0],
+        'version_cache_hit_ratio': project_version_cache.hit_ratio(),
+        'scaffold_cache_hit_ratio': scaffold_cache.hit_ratio(),
+    }
+
+def format_results(results):
+    lines = [
+        "%(requests)s requests over %(threads)s threads in %(seconds).2fs (%(requests_per_second).1f req/s, %(errors)s errors)",
+        "latency p50 %(latency_p50).4fs  p90 %(latency_p90).4fs  p99 %(latency_p99).4fs  max %(latency_max).4fs",
+        "origin fetches %(origin_fetches)s (%(unique_origin_urls)s unique urls, %(duplicate_origin_fetches)s duplicates, %(stampedes)s stampedes)",
+        "cache hit ratios: versions %(version_cache_hit_ratio).2f, scaffolds %(scaffold_cache_hit_ratio).2f (%(invalidations)s deploy invalidations)",
+    ]
+    return '\n'.join([line % results for line in lines])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Asset Bender cache layers with many threads")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help="Requests per thread")
+    parser.add_argument('--bundle', action='append', dest='bundles', help="A bundle path to include (repeatable)")
+    parser.add_argument('--origin-latency', type=float, default=0.02, help="Seconds per origin fetch")
+    parser.add_argument('--origin-jitter', type=float, default=0.0, help="Extra random seconds per origin fetch")
+    parser.add_argument('--cache-latency', type=float, default=0.0, help="Seconds per cache call")
+    parser.add_argument('--invalidate-every', type=int, default=None, help="Invalidate the caches (like a deploy) every N requests")
+    parser.add_argument('--json', action='store_true', help="Output the results as json")
+    args = parser.parse_args(argv)
+
+    logging.getLogger('asset_bender').setLevel(logging.WARNING)
+
+    results = run_load_test(
+        threads=args.threads,
+        requests_per_thread=args.requests,
+        bundle_paths=args.bundles or DEFAULT_BUNDLES,
+        origin_latency=args.origin_latency,
+        origin_jitter=args.origin_jitter,
+        cache_latency=args.cache_latency,
+        invalidate_every=args.invalidate_every)
+
+    if args.json:
+        print json.dumps(results, indent=2, sort_keys=True)
+    else:
+        print format_results(results)
+
+    return 1 if results['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
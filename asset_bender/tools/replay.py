@@ -0,0 +1,263 @@
+'''
+Replays the requests recorded by the tracer (see asset_bender.tracing) against an in-memory
+cache and a stub origin that answers with the recorded latencies, errors and pointers, and
+compares the replay with the recording (latency, origin fetches, cache hit ratios and
+scaffold builds). Nothing goes over the network, so it can be used to try caching or
+concurrency changes on a production-shaped workload.
+
+Record on a server with BENDER_TRACE_SAMPLE_RATE (and TraceMiddleware), copy the trace file,
+then run it from within your app's environment (so the Django settings are configured):
+
+    DJANGO_SETTINGS_MODULE=my_app.settings python -m asset_bender.tools.replay \\
+        /tmp/asset_bender_traces.jsonl --threads 8
+
+The requests are replayed with the S3 fetcher even if they were recorded against a local
+daemon, and with the caches starting out empty.
+'''
+import argparse
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender.tools.fakes import RecordedOrigin, install_in_memory_caches, write_fake_project
+from asset_bender.tools.loadtest import percentile, render_like_a_request
+from asset_bender.tracing import begin_request, finish_trace, load_traces
+
+
+pointer_url_regex = re.compile(r'^https?://[^/]+/([^/]+)/([^/]+?)(?:-qa)?$')
+major_version_pointer_regex = re.compile(r'^latest-version-(\d+)$')
+
+
+def summarize_traces(traces):
+    '''
+    Aggregates traces (recorded or replayed) into a dict of latency percentiles (of the
+    time to the last event of each trace), fetch and scaffold build counts, and cache hit ratios
+    '''
+    latencies = sorted([trace.get('seconds', 0) for trace in traces])
+    fetches = defaultdict(int)
+    fetch_errors = defaultdict(int)
+    cache_lookups = defaultdict(lambda: [0, 0])
+    builds = incomplete_builds = 0
+
+    for trace in traces:
+        for event in trace.get('events', ()):
+            kind = event[1]
+
+            if kind == 'fetch':
+                request_type, status = event[3], event[4]
+                fetches[request_type] += 1
+
+                if not isinstance(status, (int, long)) or not 200 <= status < 400:
+                    fetch_errors[request_type] += 1
+            elif kind == 'cache':
+                cache_lookups[event[2]][event[3] and 1 or 0] += 1
+            elif kind == 'build':
+                builds += 1
+
+                if not event[3]:
+                    incomplete_builds += 1
+
+    return {
+        'requests': len(traces),
+        'debug_requests': len([trace for trace in traces if trace.get('debug')]),
+        'forced_requests': len([trace for trace in traces if trace.get('forced')]),
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p90': percentile(latencies, 0.90),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_max': latencies[-1] if latencies else 0.0,
+        'fetches': dict(fetches),
+        'fetch_errors': dict(fetch_errors),
+        'cache_hit_ratios': dict([(name, float(hits) / (hits + misses))
+                                  for name, (misses, hits) in cache_lookups.items()]),
+        'scaffold_builds': builds,
+        'incomplete_scaffold_builds': incomplete_builds,
+    }
+
+def infer_host_project(traces):
+    '''
+    The host project of most of the traces, and its build (from the recorded versions)
+    '''
+    counts = defaultdict(int)
+
+    for trace in traces:
+        counts[trace.get('host')] += 1
+
+    host = max(counts, key=counts.get) if counts else None
+    build = None
+
+    for trace in traces:
+        if trace.get('host') == host:
+            for event in trace.get('events', ()):
+                if event[1] in ('resolve', 'versions') and event[2].get(host):
+                    build = event[2][host]
+
+    if build and build.startswith('static-'):
+        build = build[len('static-'):]
+
+    return host, build or '1'
+
+def infer_deps(traces, host):
+    '''
+    The static_conf.json deps the traces were recorded with: the pointer that was fetched
+    for each project ("current" if it never was, the recorded build is what it resolves to)
+    '''
+    deps = {}
+
+    for trace in traces:
+        for event in trace.get('events', ()):
+            if event[1] in ('resolve', 'versions'):
+                for project_name in event[2]:
+                    deps.setdefault(project_name, 'current')
+
+    pointers = {}
+
+    for trace in traces:
+        for event in trace.get('events', ()):
+            if event[1] == 'fetch' and event[3] == 'pointer':
+                match = pointer_url_regex.match(event[2])
+
+                if match:
+                    project_name, pointer_name = match.groups()
+                    major_version = major_version_pointer_regex.match(pointer_name)
+                    pointers.setdefault(project_name, major_version.group(1) if major_version else pointer_name)
+
+    deps.update(pointers)
+    deps.pop(host, None)
+    return deps
+
+def replay_traces(traces, threads=1, latency_scale=1.0, cache_latency=0.0, output_path=None):
+    '''
+    Replays the traces (of the most common host project) round robin over the threads, and
+    returns a dict with the summaries of the recording and the replay. The replay is traced
+    too (to output_path, or a temporary file).
+    '''
+    from django.test.utils import override_settings
+
+    host, build = infer_host_project(traces)
+    traces = [trace for trace in traces if trace.get('host') == host]
+
+    project_directory = tempfile.mkdtemp(prefix='asset_bender_replay')
+    write_fake_project(project_directory, infer_deps(traces, host), build)
+
+    replay_trace_path = output_path or os.path.join(project_directory, 'replayed_traces.jsonl')
+
+    if os.path.isfile(replay_trace_path):
+        os.remove(replay_trace_path)
+
+    origin = RecordedOrigin(traces, latency_scale=latency_scale)
+    restore_caches = install_in_memory_caches(cache_latency=cache_latency)
+    origin.install()
+
+    # Always go through the S3 fetcher, with the bundles exactly as they were recorded
+    settings_override = override_settings(
+        PROJ_NAME=host,
+        PROJ_DIR=project_directory,
+        BENDER_LOCAL_MODE=False,
+        BENDER_LOCAL_PROJECT_MODE=False,
+        DEFAULT_ASSET_BENDER_BUNDLES=[],
+        BENDER_TRACE_SAMPLE_RATE=1,
+        BENDER_TRACE_PATH=replay_trace_path)
+    settings_override.enable()
+
+    errors = []
+    lock = threading.Lock()
+
+    def worker(thread_traces):
+        for trace in thread_traces:
+            try:
+                begin_request()
+                render_like_a_request(trace.get('bundles', ()), trace.get('params'))
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+            finally:
+                finish_trace()
+
+    try:
+        worker_threads = [threading.Thread(target=worker, args=(traces[i::threads],)) for i in range(threads)]
+        start = time.time()
+
+        for thread in worker_threads:
+            thread.start()
+
+        for thread in worker_threads:
+            thread.join()
+
+        total_time = time.time() - start
+        replayed_traces = load_traces(replay_trace_path) if os.path.isfile(replay_trace_path) else []
+    finally:
+        settings_override.disable()
+        origin.uninstall()
+        restore_caches()
+        shutil.rmtree(project_directory, ignore_errors=True)
+
+    return {
+        'host': host,
+        'threads': threads,
+        'seconds': total_time,
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'unrecorded_origin_fetches': origin.unrecorded_fetches,
+        'recorded': summarize_traces(traces),
+        'replayed': summarize_traces(replayed_traces),
+    }
+
+def format_results(results):
+    lines = ["Replayed %s requests of %s over %s threads in %.2fs (%s errors, %s fetches of urls that weren't recorded)" % (
+        results['replayed']['requests'], results['host'], results['threads'], results['seconds'],
+        results['errors'], results['unrecorded_origin_fetches'])]
+
+    for name in ('recorded', 'replayed'):
+        summary = results[name]
+        lines.append("%s: p50 %.4fs  p90 %.4fs  p99 %.4fs  max %.4fs, %s scaffold builds (%s incomplete)" % (
+            name, summary['latency_p50'], summary['latency_p90'], summary['latency_p99'], summary['latency_max'],
+            summary['scaffold_builds'], summary['incomplete_scaffold_builds']))
+        lines.append("    fetches: %s" % (', '.join(["%s %s (%s errors)" % (request_type, count, summary['fetch_errors'].get(request_type, 0))
+                                                     for request_type, count in sorted(summary['fetches'].items())]) or 'none'))
+        lines.append("    cache hit ratios: %s" % (', '.join(["%s %.2f" % (cache_name, ratio)
+                                                              for cache_name, ratio in sorted(summary['cache_hit_ratios'].items())]) or 'none'))
+
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Asset Bender traces against a stub origin and in-memory caches")
+    parser.add_argument('trace_path', help="The trace file (BENDER_TRACE_PATH) to replay")
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="Multiply the recorded origin latencies by this")
+    parser.add_argument('--cache-latency', type=float, default=0.0, help="Seconds per cache call")
+    parser.add_argument('--output', help="Also keep the traces of the replay in this file")
+    parser.add_argument('--json', action='store_true', help="Output the results as json")
+    args = parser.parse_args(argv)
+
+    logging.getLogger('asset_bender').setLevel(logging.WARNING)
+
+    traces = load_traces(args.trace_path)
+
+    if not traces:
+        print >> sys.stderr, "No traces in %s" % args.trace_path
+        return 1
+
+    results = replay_traces(traces, threads=args.threads, latency_scale=args.latency_scale,
+                            cache_latency=args.cache_latency, output_path=args.output)
+
+    if args.json:
+        print json.dumps(results, indent=2, sort_keys=True)
+    else:
+        print format_results(results)
+
+    return 1 if results['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
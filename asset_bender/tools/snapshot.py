@@ -0,0 +1,53 @@
+'''
+Resolves the dependency version snapshot (like the deploy script does on QA) and prints
+what changed compared to the frozen snapshot and prebuilt_recursive_static_conf.json.
+
+Run it from within your app's environment (so the Django settings are configured):
+
+    DJANGO_SETTINGS_MODULE=my_app.settings python -m asset_bender.tools.snapshot --json
+    DJANGO_SETTINGS_MODULE=my_app.settings python -m asset_bender.tools.snapshot --write
+
+The exit status is 1 if anything changed (and --exit-code is passed).
+'''
+import argparse
+import logging
+import sys
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender.snapshots import build_dependency_snapshot, write_frozen_snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff the current Asset Bender dependency versions against the frozen snapshot")
+    parser.add_argument('--frozen', help="The frozen snapshot to compare with (defaults to the one in PROJ_DIR)")
+    parser.add_argument('--prebuilt', help="The prebuilt static conf to compare with (defaults to the one in PROJ_DIR)")
+    parser.add_argument('--write', nargs='?', const='', default=None, metavar='PATH',
+                        help="Write the versions as the frozen snapshot (to PATH or the --frozen one) if they changed")
+    parser.add_argument('--json', action='store_true', help="Output the versions and the changes as json")
+    parser.add_argument('--exit-code', action='store_true', help="Exit with 1 if anything changed")
+    args = parser.parse_args(argv)
+
+    logging.getLogger('asset_bender').setLevel(logging.WARNING)
+
+    snapshot = build_dependency_snapshot(frozen_snapshot_path=args.frozen, prebuilt_static_conf_path=args.prebuilt)
+
+    if args.json:
+        print json.dumps(snapshot.as_dict(), indent=2, sort_keys=True)
+    else:
+        print snapshot.format_diff()
+
+    if args.write is not None and snapshot.has_changes:
+        path = write_frozen_snapshot(snapshot, args.write or args.frozen)
+
+        if not args.json:
+            print "Wrote %s" % path
+
+    return 1 if args.exit_code and snapshot.has_changes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
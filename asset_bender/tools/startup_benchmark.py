@@ -0,0 +1,167 @@
+'''
+Measures how long a fresh worker takes to import Asset Bender, and how long its first
+request takes (compared to the ones after it), each in a new python process. The first
+request goes through the same path as the load test, against an in-memory cache and a
+stub origin, so it's the cost of the lazy setup (config, caches, requests) that shows.
+
+Run it from within your app's environment (so the Django settings are configured):
+
+    DJANGO_SETTINGS_MODULE=my_app.settings python -m asset_bender.tools.startup_benchmark --runs 10
+'''
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+
+DEFAULT_MODULES = (
+    'asset_bender.bundling',
+    'asset_bender.templatetags.asset_bender_tags',
+)
+
+# Modules that shouldn't be imported until the first request needs them
+DEFERRED_MODULES = (
+    'requests',
+    'hscacheutils.raw_cache',
+    'hscacheutils.generational_cache',
+    'hscacheutils.setting_wrappers',
+)
+
+
+def measure_import(modules=DEFAULT_MODULES):
+    '''
+    Imports the modules (in this process) and returns the seconds it took, how many modules
+    were loaded, and which of the DEFERRED_MODULES were loaded anyway
+    '''
+    modules_before = len(sys.modules)
+    start = time.time()
+
+    for module in modules:
+        __import__(module)
+
+    return {
+        'import_seconds': time.time() - start,
+        'modules_loaded': len(sys.modules) - modules_before,
+        'deferred_modules_loaded': [module for module in DEFERRED_MODULES if sys.modules.get(module)],
+    }
+
+def measure_first_requests(requests=3):
+    '''
+    Returns the seconds each of the first `requests` requests took (in this process)
+    '''
+    from django.test.utils import override_settings
+
+    from asset_bender.tools.fakes import StubOrigin, install_in_memory_caches, write_fake_project
+    from asset_bender.tools.loadtest import DEFAULT_BUNDLES, DEFAULT_DEPS, LOAD_TEST_PROJECT_NAME, render_like_a_request
+
+    project_directory = tempfile.mkdtemp(prefix='asset_bender_startup_benchmark')
+    write_fake_project(project_directory, DEFAULT_DEPS)
+
+    origin = StubOrigin(latency=0)
+    restore_caches = install_in_memory_caches()
+    origin.install()
+
+    settings_override = override_settings(
+        PROJ_NAME=LOAD_TEST_PROJECT_NAME,
+        PROJ_DIR=project_directory,
+        BENDER_LOCAL_MODE=False,
+        BENDER_LOCAL_PROJECT_MODE=False)
+    settings_override.enable()
+
+    durations = []
+
+    try:
+        for i in range(requests):
+            start = time.time()
+            render_like_a_request(DEFAULT_BUNDLES)
+            durations.append(time.time() - start)
+    finally:
+        settings_override.disable()
+        origin.uninstall()
+        restore_caches()
+        shutil.rmtree(project_directory, ignore_errors=True)
+
+    return durations
+
+def _measure_in_this_process(modules):
+    results = measure_import(modules)
+    durations = measure_first_requests()
+
+    results['first_request_seconds'] = durations[0]
+    results['warm_request_seconds'] = min(durations[1:])
+    return results
+
+def run_startup_benchmark(runs=5, modules=DEFAULT_MODULES):
+    '''
+    Measures the import and the first requests in `runs` fresh processes, and returns a dict
+    with the medians (and the per run results)
+    '''
+    command = [sys.executable, '-m', 'asset_bender.tools.startup_benchmark', '--in-process', '--json']
+
+    for module in modules:
+        command += ['--module', module]
+
+    run_results = []
+
+    for i in range(runs):
+        output = subprocess.Popen(command, stdout=subprocess.PIPE).communicate()[0]
+        run_results.append(json.loads(output))
+
+    def median(name):
+        values = sorted([result[name] for result in run_results])
+        return values[len(values) / 2]
+
+    return {
+        'runs': runs,
+        'modules': list(modules),
+        'import_seconds': median('import_seconds'),
+        'modules_loaded': median('modules_loaded'),
+        'first_request_seconds': median('first_request_seconds'),
+        'warm_request_seconds': median('warm_request_seconds'),
+        'deferred_modules_loaded': sorted(set([module for result in run_results for module in result['deferred_modules_loaded']])),
+        'run_results': run_results,
+    }
+
+def format_results(results):
+    lines = [
+        "import %(import_seconds).4fs (%(modules_loaded)s modules), median of %(runs)s fresh processes",
+        "first request %(first_request_seconds).4fs, warm request %(warm_request_seconds).4fs",
+    ]
+
+    if results['deferred_modules_loaded']:
+        lines.append("imported before the first request: %s" % ', '.join(results['deferred_modules_loaded']))
+
+    return '\n'.join([line % results for line in lines])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the import time and first request of Asset Bender")
+    parser.add_argument('--runs', type=int, default=5, help="How many fresh processes to measure")
+    parser.add_argument('--module', action='append', dest='modules', help="A module to import (repeatable)")
+    parser.add_argument('--in-process', action='store_true', help="Measure once, in this process")
+    parser.add_argument('--json', action='store_true', help="Output the results as json")
+    args = parser.parse_args(argv)
+
+    modules = args.modules or DEFAULT_MODULES
+
+    if args.in_process:
+        results = _measure_in_this_process(modules)
+    else:
+        results = run_startup_benchmark(args.runs, modules)
+
+    if args.json:
+        print json.dumps(results, indent=2, sort_keys=True)
+    else:
+        print format_results(results)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+'''
+Opt-in tracing of what Asset Bender does for a request, so real traffic can be replayed
+offline (see asset_bender.tools.replay).
+
+A fraction of requests (BENDER_TRACE_SAMPLE_RATE) record the inputs of their BenderAssets
+instances (the bundles, hsDebug and forceBuildFor-* params, debug and daemon flags) and
+everything that happens on that thread (and in the executor pools): fetches and their
+outcomes, cache lookups, resolved versions and scaffold builds. Each trace is appended as a
+line of json to BENDER_TRACE_PATH when the request ends (with TraceMiddleware), or when the
+thread starts its next trace. Writing stops once the file is BENDER_TRACE_MAX_BYTES.
+
+With TraceMiddleware, every BenderAssets created during a request (including the ones made
+implicitly, by the static_url tag for instance) adds to the request's single trace. Without it,
+each BenderAssets starts a new trace.
+
+The events are lists, starting with the seconds since the trace started:
+
+    [t, "fetch", url, request type, status code or error class, seconds, pointer body or null]
+    [t, "cache", cache name, hit (0 or 1)]
+    [t, "resolve", {project: build}]      versions resolved from the origin
+    [t, "versions", {project: build}]     versions the request used
+    [t, "build", seconds, complete (0 or 1)]
+
+When the sample rate is 0 (the default) the only overhead is a config or thread local lookup.
+'''
+import logging
+import os
+import random
+import threading
+import time
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from asset_bender.config import get_config
+
+logger = logging.getLogger(__name__)
+
+TRACE_FORMAT_VERSION = 1
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+class RequestTrace(object):
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.events = []
+        self.started_at = time.time()
+
+    def attach(self, inputs):
+        '''
+        Merges the inputs of another BenderAssets of the same request
+        '''
+        for bundle_path in inputs['bundles']:
+            if bundle_path not in self.inputs['bundles']:
+                self.inputs['bundles'].append(bundle_path)
+
+        self.inputs['params'].update(inputs['params'])
+        self.inputs['debug'] = self.inputs['debug'] or inputs['debug']
+        self.inputs['daemon'] = self.inputs['daemon'] or inputs['daemon']
+
+        if inputs['forced']:
+            self.inputs['forced'] = dict(self.inputs['forced'] or {}, **inputs['forced'])
+
+    def add(self, kind, *values):
+        # list.append is atomic, so the executor pool threads can add events too
+        self.events.append([round(time.time() - self.started_at, 5), kind] + list(values))
+
+    def as_dict(self):
+        data = dict(self.inputs)
+        data.update({
+            'v': TRACE_FORMAT_VERSION,
+            'ts': round(self.started_at, 3),
+            'seconds': self.events[-1][0] if self.events else 0,
+            'events': self.events,
+        })
+        return data
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+def begin_request():
+    '''
+    Called by TraceMiddleware when a request starts. Finishes any leftover trace of this thread,
+    the BenderAssets created until the next finish_trace all go into the same trace.
+    '''
+    finish_trace()
+    _local.in_request = True
+    _local.request_sampled = None
+
+def start_trace(bender_assets, http_get_params):
+    '''
+    Called for every BenderAssets. Within a request (see begin_request) the first one decides
+    whether the request is sampled and the later ones are added to its trace. Otherwise it
+    finishes the previous trace of this thread (if any) and starts a new one for a sample of
+    them. Returns the trace or None.
+    '''
+    sample_rate = get_config().trace_sample_rate
+
+    if not sample_rate:
+        return None
+
+    in_request = getattr(_local, 'in_request', False)
+
+    if in_request and _local.request_sampled is not None:
+        trace = current_trace()
+
+        if trace is not None:
+            trace.attach(_trace_inputs(bender_assets, http_get_params))
+
+        return trace
+    elif not in_request:
+        finish_trace()
+
+    sampled = random.random() < sample_rate
+
+    if in_request:
+        _local.request_sampled = sampled
+
+    if not sampled:
+        return None
+
+    trace = _local.trace = RequestTrace(_trace_inputs(bender_assets, http_get_params))
+    return trace
+
+def _trace_inputs(bender_assets, http_get_params):
+    from asset_bender.bundling import FORCE_BUILD_PARAM_PREFIX
+
+    return {
+        'host': bender_assets.host_project_name,
+        'bundles': list(bender_assets.included_bundle_paths),
+        'params': dict([(name, value) for name, value in http_get_params.items()
+                        if name == 'hsDebug' or name.startswith(FORCE_BUILD_PARAM_PREFIX)]),
+        'debug': bender_assets.is_debug,
+        'daemon': bender_assets.use_local_daemon,
+        'forced': bender_assets.forced_build_version_by_project,
+    }
+
+def finish_trace():
+    '''
+    Writes this thread's trace (if there is one) and ends the request started by
+    begin_request, returns the trace
+    '''
+    trace = current_trace()
+    _local.in_request = False
+
+    if trace is None:
+        return None
+
+    _local.trace = None
+    _write_trace(trace, get_config())
+    return trace
+
+def trace_event(kind, *values):
+    trace = current_trace()
+
+    if trace is not None:
+        trace.add(kind, *values)
+
+def propagate_trace(func):
+    '''
+    Wraps func so that calls from other threads (the executor pools) are recorded in this
+    thread's trace. Returns func as is if there isn't a trace.
+    '''
+    trace = current_trace()
+
+    if trace is None:
+        return func
+
+    def call_with_trace(*args, **kwargs):
+        previous_trace = current_trace()
+        _local.trace = trace
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.trace = previous_trace
+
+    return call_with_trace
+
+def _write_trace(trace, config):
+    '''
+    Never raises, a failed write shouldn't break the request
+    '''
+    try:
+        line = json.dumps(trace.as_dict(), separators=(',', ':'), sort_keys=True, default=str) + '\n'
+
+        with _write_lock:
+            if os.path.isfile(config.trace_path) and os.path.getsize(config.trace_path) >= config.trace_max_bytes:
+                return
+
+            directory = os.path.dirname(config.trace_path)
+
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+
+            # A single append, so the lines of different processes don't interleave
+            fd = os.open(config.trace_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    except Exception as e:
+        logger.warning("Couldn't write the Asset Bender trace to %s: %s" % (config.trace_path, e))
+
+def load_traces(path):
+    '''
+    Returns the traces in the file at path (skipping lines that aren't valid, like a
+    partially written last line)
+    '''
+    traces = []
+
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                trace = json.loads(line)
+            except ValueError:
+                continue
+
+            if isinstance(trace, dict) and trace.get('v') == TRACE_FORMAT_VERSION:
+                traces.append(trace)
+
+    return traces
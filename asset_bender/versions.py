@@ -0,0 +1,166 @@
+import re
+
+
+build_name_regex = re.compile(r'^(?:static-)?(\d+(?:\.\d+)*)$')
+
+# Don't let the intern tables grow forever in a long running process
+MAX_INTERNED_VERSIONS = 10000
+
+
+class BuildVersion(object):
+    """
+    A parsed build name, like "static-1.4.123". Instances are interned (use
+    `BuildVersion.parse`) and are totally ordered by all of their numeric parts, so:
+
+    >>> BuildVersion.parse('static-1.10') > BuildVersion.parse('static-1.9')
+    True
+    >>> BuildVersion.parse('static-1.4.2') > BuildVersion.parse('static-1.4.1')
+    True
+    """
+    __slots__ = ('name', 'parts')
+
+    _interned = {}
+
+    def __init__(self, name, parts):
+        self.name = name
+        self.parts = parts
+
+    @classmethod
+    def parse(cls, name):
+        '''
+        Returns the BuildVersion for name, raises a ValueError if it isn't a build name
+        '''
+        version = cls._interned.get(name)
+
+        if version is None:
+            match = build_name_regex.match(name.strip())
+
+            if not match:
+                raise ValueError("Invalid build name: %s" % name)
+
+            version = cls(name, tuple([int(part) for part in match.group(1).split('.')]))
+
+            if len(cls._interned) >= MAX_INTERNED_VERSIONS:
+                cls._interned.clear()
+
+            version = cls._interned.setdefault(name, version)
+
+        return version
+
+    def __eq__(self, other):
+        return isinstance(other, BuildVersion) and self.parts == other.parts
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __lt__(self, other):
+        return self.parts < other.parts
+
+    def __le__(self, other):
+        return self.parts <= other.parts
+
+    def __gt__(self, other):
+        return self.parts > other.parts
+
+    def __ge__(self, other):
+        return self.parts >= other.parts
+
+    def __hash__(self):
+        return hash(self.parts)
+
+    def __reduce__(self):
+        return (BuildVersion.parse, (self.name,))
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return "BuildVersion(%r)" % self.name
+
+
+class VersionPointer(object):
+    """
+    A parsed version from static_conf.json or a forceBuildFor-<project> param. Either:
+
+        - a specific build ("static-4.59")
+        - a major version ("3"), which points at "latest-version-3"
+        - a named pointer ("current", "edge", ...)
+
+    Instances are interned (use `VersionPointer.parse`).
+    """
+    __slots__ = ('value', 'kind', 'build', 'pointer_name')
+
+    SPECIFIC_BUILD = 'build'
+    MAJOR_VERSION = 'major'
+    NAMED_POINTER = 'pointer'
+
+    _interned = {}
+
+    def __init__(self, value, kind, build, pointer_name):
+        self.value = value
+        self.kind = kind
+        self.build = build
+        self.pointer_name = pointer_name
+
+    @classmethod
+    def parse(cls, value):
+        pointer = cls._interned.get(value)
+
+        if pointer is None:
+            pointer = cls._build(value)
+
+            if len(cls._interned) >= MAX_INTERNED_VERSIONS:
+                cls._interned.clear()
+
+            pointer = cls._interned.setdefault(value, pointer)
+
+        return pointer
+
+    @classmethod
+    def _build(cls, value):
+        string_value = str(value)
+
+        if is_specific_build_name(value):
+            return cls(value, cls.SPECIFIC_BUILD, BuildVersion.parse(value), None)
+        elif string_value.isdigit():
+            return cls(value, cls.MAJOR_VERSION, None, 'latest-version-%s' % string_value)
+        else:
+            return cls(value, cls.NAMED_POINTER, None, string_value)
+
+    @property
+    def is_specific_build(self):
+        return self.kind == self.SPECIFIC_BUILD
+
+    def __repr__(self):
+        return "VersionPointer(%r)" % (self.value,)
+
+
+def is_specific_build_name(build_name):
+    return isinstance(build_name, basestring) and build_name.startswith('static-')
+
+def maximum_build_name(*build_names):
+    '''
+    Returns the highest of the passed build names (ignoring empty ones), or None
+    if they are all empty
+    '''
+    versions = [BuildVersion.parse(name) for name in build_names if name]
+
+    if versions:
+        return max(versions).name
+
+def resolve_maximum_versions(candidates_by_project):
+    '''
+    The resolution engine: takes a dict of project name -> a sequence of candidate build names
+    (eg. the version pointer, the prebuilt version and the frozen at deploy version) and
+    returns a dict of project name -> the highest candidate. Projects without any
+    candidates are left out.
+    '''
+    resolved = {}
+
+    for project_name, candidates in candidates_by_project.items():
+        build_name = maximum_build_name(*candidates)
+
+        if build_name:
+            resolved[project_name] = build_name
+
+    return resolved
@@ -0,0 +1,85 @@
+import logging
+import urllib
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from django.http import HttpResponse, HttpResponseBadRequest
+
+from asset_bender.bundling import BenderAssets, CSS_EXTENSIONS, JS_EXTENSIONS, _find_extension
+from asset_bender.http import fetch_ab_url_with_retries
+from asset_bender.metrics import registry
+from asset_bender.snapshots import build_dependency_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def combo_handler(request):
+    '''
+    A reference combo handler (for local development and the daemon) that concatenates
+    the files listed in the query string. Eg:
+
+        /combo?my_project/static-1.2/js/a.js&my_project/static-1.2/js/b.js
+
+    Point BENDER_COMBO_URL_TEMPLATE at wherever you mount this view, such as "/bender/combo?%(paths)s".
+
+    Since the concatenated css is served from a different path, stylesheets that use
+    relative url()s won't work when combined (use absolute urls in those).
+    '''
+    paths = [urllib.unquote(param) for param in request.META.get('QUERY_STRING', '').split('&') if param and '=' not in param]
+
+    if not paths:
+        return HttpResponseBadRequest("No paths to combine", content_type='text/plain')
+
+    extensions = set([_find_extension(path.split('?')[0], also_search_folder_name=False) for path in paths])
+
+    if extensions <= set(JS_EXTENSIONS):
+        content_type, separator = 'application/javascript', '\n;\n'
+    elif extensions <= set(CSS_EXTENSIONS):
+        content_type, separator = 'text/css', '\n'
+    else:
+        return HttpResponseBadRequest("Can only combine all js or all css files", content_type='text/plain')
+
+    for path in paths:
+        if '..' in path.split('/') or path.startswith('/'):
+            # Not echoed back, the paths come straight from the query string
+            return HttpResponseBadRequest("Invalid path", content_type='text/plain')
+
+    bender_assets = BenderAssets(exclude_default_bundles=True)
+    scheme = 'http' if bender_assets.use_local_daemon else 'https'
+    domain = bender_assets.get_domain()
+
+    contents = []
+
+    for path in paths:
+        result = fetch_ab_url_with_retries('%s://%s/%s' % (scheme, domain, path), request_type='combo')
+        contents.append(result.content)
+
+    return HttpResponse(separator.join(contents), content_type=content_type)
+
+
+def metrics_handler(request):
+    '''
+    Exposes the Asset Bender metrics (fetch latencies, retries and errors, cache hits and
+    misses, scaffold builds) in the Prometheus text format. Mount it in your urls (and
+    probably restrict it to internal traffic).
+    '''
+    return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def snapshot_handler(request):
+    '''
+    The dependency version snapshot for the deploy script (call it on QA). Returns the versions
+    as json, or with ?diff=true the versions and what changed compared to the frozen snapshot and
+    prebuilt_recursive_static_conf.json (see asset_bender.snapshots). Add &format=text for a
+    readable diff.
+    '''
+    snapshot = build_dependency_snapshot()
+
+    if request.GET.get('diff') not in ('true', '1'):
+        return HttpResponse(json.dumps(snapshot.versions, sort_keys=True), content_type='application/json')
+    elif request.GET.get('format') == 'text':
+        return HttpResponse(snapshot.format_diff() + '\n', content_type='text/plain; charset=utf-8')
+    else:
+        return HttpResponse(json.dumps(snapshot.as_dict(), sort_keys=True), content_type='application/json')